@@ -1,4 +1,6 @@
+import asyncio
 import logging
+import os
 
 from a2a.server.agent_execution import AgentExecutor, RequestContext
 from a2a.server.events import EventQueue
@@ -10,7 +12,6 @@ from a2a.types import (
     Task,
     TaskState,
     TextPart,
-    UnsupportedOperationError,
 )
 from a2a.utils import (
     new_agent_text_message,
@@ -24,11 +25,18 @@ from brestagent import BrestExpertAgent
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Tasks run at once by this server, and how long a new task waits for a slot
+MAX_CONCURRENT_TASKS = int(os.getenv('AGENT_MAX_CONCURRENT_TASKS', '8'))
+QUEUE_TIMEOUT = float(os.getenv('AGENT_QUEUE_TIMEOUT', '10'))
+
 
 class BrestAgentExecutor(AgentExecutor):
 
     def __init__(self):
         self.agent = BrestExpertAgent()
+        self._slots = asyncio.Semaphore(MAX_CONCURRENT_TASKS)
+        # task id -> asyncio task executing it, for cancel()
+        self._running: dict[str, asyncio.Task] = {}
 
     async def execute(
         self,
@@ -45,6 +53,22 @@ class BrestAgentExecutor(AgentExecutor):
             task = new_task(context.message)
             event_queue.enqueue_event(task)
         updater = TaskUpdater(event_queue, task.id, task.contextId)
+        try:
+            await asyncio.wait_for(self._slots.acquire(), QUEUE_TIMEOUT)
+        except TimeoutError:
+            logger.warning(f'Rejecting task {task.id}: {MAX_CONCURRENT_TASKS} tasks already running')
+            updater.update_status(
+                TaskState.rejected,
+                new_agent_text_message(
+                    'The agent is busy, please retry in a moment.',
+                    task.contextId,
+                    task.id,
+                ),
+                final=True,
+            )
+            return
+
+        self._running[task.id] = asyncio.current_task()
         try:
             async for item in self.agent.stream(query, task.contextId):
                 is_task_complete = item['is_task_complete']
@@ -78,9 +102,16 @@ class BrestAgentExecutor(AgentExecutor):
                     updater.complete()
                     break
 
+        except asyncio.CancelledError:
+            logger.info(f'Task {task.id} cancelled')
+            updater.update_status(TaskState.canceled, final=True)
+            raise
         except Exception as e:
             logger.error(f'An error occurred while streaming the response: {e}')
             raise ServerError(error=InternalError()) from e
+        finally:
+            self._running.pop(task.id, None)
+            self._slots.release()
 
     def _validate_request(self, context: RequestContext) -> bool:
         return False
@@ -88,4 +119,12 @@ class BrestAgentExecutor(AgentExecutor):
     async def cancel(
         self, request: RequestContext, event_queue: EventQueue
     ) -> Task | None:
-        raise ServerError(error=UnsupportedOperationError())
\ No newline at end of file
+        running = self._running.get(request.task_id)
+        if running is None or running.done():
+            # Nothing in flight in this process: only record the new state
+            TaskUpdater(event_queue, request.task_id, request.context_id).update_status(TaskState.canceled, final=True)
+            return None
+        # Interrupts the LLM call or the pending tool calls, execute() publishes the canceled state
+        running.cancel()
+        await asyncio.wait({running})
+        return None
\ No newline at end of file
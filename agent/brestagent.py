@@ -1,24 +1,31 @@
+import json
 import logging
 import asyncio
+import os
+import time
 
 from collections.abc import AsyncIterable
 from typing import Any, Literal
 
-from langchain_core.messages import AIMessage, ToolMessage
+from langchain_core.messages import AIMessage, AIMessageChunk, ToolMessage
 from langchain_core.runnables.config import (
     RunnableConfig,
 )
 from langchain_anthropic import ChatAnthropic
 from pydantic import BaseModel
 
-from langgraph.checkpoint.memory import MemorySaver
 from langgraph.prebuilt import create_react_agent  # type: ignore
-from langchain_mcp_adapters.client import MultiServerMCPClient
 
-logger = logging.getLogger(__name__)
+from checkpointer import create_checkpointer
+from mcp_pool import TOOL_CACHE_KEY, TaskToolCache, get_pool
 
-memory = MemorySaver()
+logger = logging.getLogger(__name__)
 
+# Answer tokens are sent in batches of at most this many characters or seconds
+STREAM_FLUSH_CHARS = 200
+STREAM_FLUSH_SECONDS = 0.1
+# Tool results are summarized to this many characters in status updates
+TOOL_OUTPUT_CHARS = int(os.getenv('AGENT_TOOL_OUTPUT_CHARS', '300'))
 
 class ResponseFormat(BaseModel):
     """Respond to the user in this format."""
@@ -43,55 +50,77 @@ class BrestExpertAgent:
     )
 
     async def get_tools(self):
-        # Get and return tools from MCP server
-        client = MultiServerMCPClient(
-            {
-                "brest": {
-                    "command": "python",
-                    "args": ["src/server.py", "stdio"],
-                    "transport": "stdio",
-                },
-            }
-        )
-        tools = await client.get_tools()
-        return tools
-   
+        # Tools backed by the shared, persistent MCP session pool
+        return await get_pool().get_tools()
+
     def __init__(self):
         self.model = ChatAnthropic(model='claude-3-5-sonnet-20241022')
-        tools=asyncio.run(self.get_tools())
-        self.agent = create_react_agent(self.model, tools, checkpointer=memory,prompt=self.SYSTEM_INSTRUCTION,response_format=ResponseFormat,)
+        self.agent = None
+        self.checkpointer = None
+        self._agent_lock = asyncio.Lock()
+
+    async def _get_agent(self):
+        # Built lazily in the running event loop, once per process
+        async with self._agent_lock:
+            if self.agent is None:
+                tools = await self.get_tools()
+                # Bounded in memory by default, see checkpointer.py
+                self.checkpointer = await create_checkpointer()
+                self.agent = create_react_agent(self.model, tools, checkpointer=self.checkpointer,prompt=self.SYSTEM_INSTRUCTION,response_format=ResponseFormat,)
+        return self.agent
 
-            
     async def stream(
         self, query: str, sessionId: str
     ) -> AsyncIterable[dict[str, Any]]:
         inputs: dict[str, Any] = {'messages': [('user', query)]}
-        config: RunnableConfig = {'configurable': {'thread_id': sessionId}}
-        async for item in self.agent.astream(inputs, config, stream_mode='values'):
-            message = item['messages'][-1]
-            if (
-                isinstance(message, AIMessage)
-                and message.tool_calls
-                and len(message.tool_calls) > 0
-            ):
-                yield {
-                    'is_task_complete': False,
-                    'require_user_input': False,
-                    'content': str(message),
-                }
-            elif isinstance(message, ToolMessage):
-                yield {
-                    'is_task_complete': False,
-                    'require_user_input': False,
-                    'content': str(message),
-                }
-
-        yield self.get_agent_response(config)
-
-    def get_agent_response(self, config: RunnableConfig) -> dict[str, Any]:
-        current_state = self.agent.get_state(config)
+        # Identical tool calls within this task are served once
+        tool_cache = TaskToolCache()
+        config: RunnableConfig = {'configurable': {'thread_id': sessionId, TOOL_CACHE_KEY: tool_cache}}
+        agent = await self._get_agent()
+        structured_response = None
+        tokens = _TokenBuffer()
+        try:
+            # Token chunks and per-node deltas, instead of the whole state at every step
+            async for mode, chunk in agent.astream(inputs, config, stream_mode=['messages', 'updates']):
+                if mode == 'messages':
+                    message, metadata = chunk
+                    # The structured response call only restates the answer
+                    if isinstance(message, AIMessageChunk) and metadata.get('langgraph_node') == 'agent':
+                        text = tokens.add(_text(message.content))
+                        if text:
+                            yield self._working(text)
+                    continue
+
+                text = tokens.flush()
+                if text:
+                    yield self._working(text)
+                for update in chunk.values():
+                    if not isinstance(update, dict):
+                        continue
+                    structured_response = update.get('structured_response', structured_response)
+                    for message in update.get('messages', []):
+                        if isinstance(message, AIMessage) and message.tool_calls:
+                            yield self._working('\n'.join(
+                                f"Calling {call['name']}({json.dumps(call['args'], ensure_ascii=False)})"
+                                for call in message.tool_calls
+                            ))
+                        elif isinstance(message, ToolMessage):
+                            yield self._working(_summarize_tool_output(message))
+        finally:
+            # Cancelled or failed task: stop its tool calls still in flight
+            tool_cache.cancel()
+
+        logger.info(f'Task {sessionId}: {tool_cache.calls} tool calls, {tool_cache.hits} memoized')
+        yield self.get_agent_response(structured_response)
+
+    def _working(self, content: str) -> dict[str, Any]:
+        return {
+            'is_task_complete': False,
+            'require_user_input': False,
+            'content': content,
+        }
 
-        structured_response = current_state.values.get('structured_response')
+    def get_agent_response(self, structured_response: Any) -> dict[str, Any]:
         if structured_response and isinstance(
             structured_response, ResponseFormat
         ):
@@ -115,3 +144,57 @@ class BrestExpertAgent:
         }
 
     SUPPORTED_CONTENT_TYPES = ['text', 'text/plain']
+
+
+class _TokenBuffer:
+    """Coalesces answer tokens: the first one is sent at once, then in batches."""
+
+    def __init__(self):
+        self.parts: list[str] = []
+        self.size = 0
+        self.flushed_at = 0.0
+
+    def add(self, text: str) -> str:
+        if text:
+            self.parts.append(text)
+            self.size += len(text)
+        if self.size >= STREAM_FLUSH_CHARS or (self.parts and time.monotonic() - self.flushed_at >= STREAM_FLUSH_SECONDS):
+            return self.flush()
+        return ''
+
+    def flush(self) -> str:
+        text = ''.join(self.parts)
+        self.parts.clear()
+        self.size = 0
+        self.flushed_at = time.monotonic()
+        return text
+
+
+def _text(content: Any) -> str:
+    """Text of a message content: a string, or a list of strings and content blocks."""
+    if isinstance(content, str):
+        return content
+    return ''.join(
+        block if isinstance(block, str) else block.get('text', '')
+        for block in content
+        if isinstance(block, str) or block.get('type') == 'text'
+    )
+
+
+def _summarize_tool_output(message: ToolMessage) -> str:
+    """Short description of a tool result: the full payload stays in the conversation state."""
+    parts = message.content if isinstance(message.content, list) else [message.content]
+    # One text per list item, then the freshness block of the Brest server
+    texts = [text for text in (_text([part]) for part in parts) if not text.startswith('{"freshness"')]
+    payload: Any = texts
+    if len(texts) == 1:
+        try:
+            payload = json.loads(texts[0])
+        except ValueError:
+            payload = None
+    if isinstance(payload, dict) and isinstance(payload.get('data'), list):
+        payload = payload['data']
+    text = '\n'.join(texts)
+    size = f'{len(payload)} results' if isinstance(payload, list) else f'{len(text)} characters'
+    preview = text if len(text) <= TOOL_OUTPUT_CHARS else text[:TOOL_OUTPUT_CHARS] + '…'
+    return f'{message.name or "tool"} returned {size}: {preview}'
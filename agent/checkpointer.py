@@ -0,0 +1,228 @@
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Sequence
+from typing import Any, Optional
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import BaseCheckpointSaver, ChannelVersions, Checkpoint, CheckpointMetadata, CheckpointTuple
+from langgraph.checkpoint.memory import InMemorySaver
+
+logger = logging.getLogger(__name__)
+
+
+class _ThreadUsage:
+    """Serialized bytes and storage keys held for one conversation."""
+
+    __slots__ = ('bytes', 'last_used', 'blob_keys', 'write_keys', 'versions')
+
+    def __init__(self):
+        self.bytes = 0
+        self.last_used = time.monotonic()
+        self.blob_keys: set[tuple] = set()
+        self.write_keys: set[tuple] = set()
+        # checkpoint_ns -> {checkpoint_id: channel_versions}
+        self.versions: dict[str, dict[str, ChannelVersions]] = {}
+
+
+class BoundedMemorySaver(InMemorySaver):
+    """In-memory checkpointer with LRU/TTL eviction and a memory cap.
+
+    Conversations idle for more than `ttl` seconds are dropped, then the least
+    recently used ones while there are more than `max_threads` of them or their
+    serialized checkpoints exceed `max_bytes`. Only the last `history`
+    checkpoints of a conversation are kept: the agent resumes from the latest
+    one, older ones would only serve time travel.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_threads: int = 1000,
+        max_bytes: int = 256 * 1024 * 1024,
+        ttl: float = 6 * 3600,
+        history: int = 1,
+        **kwargs: Any,
+    ):
+        super().__init__(**kwargs)
+        self.max_threads = max_threads
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.history = max(1, history)
+        self.total_bytes = 0
+        self.evictions = 0
+        # Least recently used first
+        self._threads: OrderedDict[str, _ThreadUsage] = OrderedDict()
+        self._lock = threading.RLock()
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        thread_id = config['configurable']['thread_id']
+        with self._lock:
+            self._expire()
+            if thread_id not in self._threads:
+                # Unknown or evicted: nothing stored, and no empty entry left behind
+                return None
+            self._touch(thread_id)
+            checkpoint = super().get_tuple(config)
+            if checkpoint is not None:
+                # Reads go through a defaultdict: drop the empty writes entries they create
+                for read_config in (checkpoint.config, checkpoint.parent_config):
+                    if read_config:
+                        configurable = read_config['configurable']
+                        key = (thread_id, configurable.get('checkpoint_ns', ''), configurable['checkpoint_id'])
+                        if not self.writes.get(key, True):
+                            self.writes.pop(key)
+            return checkpoint
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        thread_id = config['configurable']['thread_id']
+        checkpoint_ns = config['configurable']['checkpoint_ns']
+        with self._lock:
+            next_config = super().put(config, checkpoint, metadata, new_versions)
+            usage = self._touch(thread_id)
+            added = _entry_size(self.storage[thread_id][checkpoint_ns][checkpoint['id']])
+            for channel, version in new_versions.items():
+                key = (thread_id, checkpoint_ns, channel, version)
+                if key not in usage.blob_keys:
+                    usage.blob_keys.add(key)
+                    added += _entry_size(self.blobs[key])
+            self._account(usage, added)
+            usage.versions.setdefault(checkpoint_ns, {})[checkpoint['id']] = dict(checkpoint['channel_versions'])
+            self._trim_history(thread_id, checkpoint_ns, usage)
+            self._evict(keep=thread_id)
+            return next_config
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = '',
+    ) -> None:
+        thread_id = config['configurable']['thread_id']
+        outer_key = (thread_id, config['configurable'].get('checkpoint_ns', ''), config['configurable']['checkpoint_id'])
+        with self._lock:
+            before = _entry_size(self.writes.get(outer_key, {}))
+            super().put_writes(config, writes, task_id, task_path)
+            usage = self._touch(thread_id)
+            usage.write_keys.add(outer_key)
+            self._account(usage, _entry_size(self.writes.get(outer_key, {})) - before)
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._lock:
+            self._drop(thread_id)
+
+    def _touch(self, thread_id: str) -> _ThreadUsage:
+        usage = self._threads.get(thread_id)
+        if usage is None:
+            usage = self._threads[thread_id] = _ThreadUsage()
+        else:
+            usage.last_used = time.monotonic()
+            self._threads.move_to_end(thread_id)
+        return usage
+
+    def _account(self, usage: _ThreadUsage, delta: int) -> None:
+        usage.bytes += delta
+        self.total_bytes += delta
+
+    def _trim_history(self, thread_id: str, checkpoint_ns: str, usage: _ThreadUsage) -> None:
+        checkpoints = self.storage[thread_id][checkpoint_ns]
+        versions = usage.versions[checkpoint_ns]
+        if len(checkpoints) <= self.history:
+            return
+        # Checkpoint ids are time-ordered and inserted in order
+        for checkpoint_id in list(checkpoints)[: -self.history]:
+            self._account(usage, -_entry_size(checkpoints.pop(checkpoint_id)))
+            versions.pop(checkpoint_id, None)
+        kept = set(checkpoints)
+        for key in [key for key in usage.write_keys if key[1] == checkpoint_ns and key[2] not in kept]:
+            usage.write_keys.discard(key)
+            self._account(usage, -_entry_size(self.writes.pop(key, {})))
+        referenced = {(channel, version) for channel_versions in versions.values() for channel, version in channel_versions.items()}
+        for key in [key for key in usage.blob_keys if key[1] == checkpoint_ns and (key[2], key[3]) not in referenced]:
+            usage.blob_keys.discard(key)
+            self._account(usage, -_entry_size(self.blobs.pop(key, None)))
+
+    def _expire(self) -> None:
+        deadline = time.monotonic() - self.ttl
+        while self._threads:
+            thread_id, usage = next(iter(self._threads.items()))
+            if usage.last_used > deadline:
+                break
+            self._drop(thread_id)
+
+    def _evict(self, keep: str) -> None:
+        self._expire()
+        while len(self._threads) > self.max_threads or self.total_bytes > self.max_bytes:
+            thread_id = next(iter(self._threads))
+            if thread_id == keep:
+                # A single conversation above the cap is kept until it goes idle
+                break
+            self._drop(thread_id)
+
+    def _drop(self, thread_id: str) -> None:
+        usage = self._threads.pop(thread_id, None)
+        if usage is None:
+            return
+        self.storage.pop(thread_id, None)
+        for key in usage.write_keys:
+            self.writes.pop(key, None)
+        for key in usage.blob_keys:
+            self.blobs.pop(key, None)
+        self.total_bytes -= usage.bytes
+        self.evictions += 1
+        logger.debug(f'Evicted conversation {thread_id} ({usage.bytes} bytes)')
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {'conversations': len(self._threads), 'bytes': self.total_bytes, 'evictions': self.evictions}
+
+
+def _entry_size(value: Any) -> int:
+    """Serialized payload bytes of a storage, blob or writes entry."""
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    if isinstance(value, dict):
+        return sum(_entry_size(item) for item in value.values())
+    if isinstance(value, tuple):
+        return sum(_entry_size(item) for item in value)
+    return 0
+
+
+async def create_checkpointer() -> BaseCheckpointSaver:
+    """Checkpointer selected by AGENT_CHECKPOINTER (`memory` or `sqlite`).
+
+    The SQLite store keeps conversations on disk across restarts, in
+    AGENT_CHECKPOINT_DB. It needs the optional `sqlite` extra
+    (langgraph-checkpoint-sqlite and aiosqlite) and must be created in the
+    running event loop.
+    """
+    backend = os.getenv('AGENT_CHECKPOINTER', 'memory')
+    if backend == 'sqlite':
+        try:
+            import aiosqlite
+            from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+        except ImportError as e:
+            raise RuntimeError(
+                "AGENT_CHECKPOINTER=sqlite requires the 'sqlite' extra: "
+                "uv sync --extra sqlite, or pip install 'brest-mcp[sqlite]'"
+            ) from e
+        path = os.getenv('AGENT_CHECKPOINT_DB', 'agent_checkpoints.sqlite')
+        logger.info(f'Storing conversations in {path}')
+        return AsyncSqliteSaver(await aiosqlite.connect(path))
+    if backend != 'memory':
+        raise ValueError(f'Unknown AGENT_CHECKPOINTER {backend!r}, expected memory or sqlite')
+    return BoundedMemorySaver(
+        max_threads=int(os.getenv('AGENT_MAX_CONVERSATIONS', '1000')),
+        max_bytes=int(float(os.getenv('AGENT_CHECKPOINT_MAX_MB', '256')) * 1024 * 1024),
+        ttl=float(os.getenv('AGENT_CONVERSATION_TTL', str(6 * 3600))),
+        history=int(os.getenv('AGENT_CHECKPOINT_HISTORY', '1')),
+    )
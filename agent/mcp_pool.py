@@ -0,0 +1,281 @@
+import asyncio
+import json
+import logging
+import os
+import sys
+from datetime import timedelta
+from typing import Any
+
+import anyio
+from langchain_core.runnables.config import ensure_config
+from langchain_core.tools import BaseTool, StructuredTool, ToolException
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.sse import sse_client
+from mcp.client.stdio import stdio_client
+from mcp.types import CallToolResult, TextContent, Tool
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SERVER_URL = 'http://localhost:3001/sse'
+SERVER_SCRIPT = os.path.join(os.path.dirname(__file__), '..', 'src', 'server.py')
+# RunnableConfig `configurable` key holding the TaskToolCache of the running task
+TOOL_CACHE_KEY = '__brest_tool_cache'
+# Errors meaning the session is gone rather than the call failed
+_CONNECTION_ERRORS = (ConnectionError, OSError, anyio.ClosedResourceError, anyio.BrokenResourceError)
+
+
+class _PooledSession:
+    """One long-lived MCP session.
+
+    The transport context managers use anyio task groups, which must be entered
+    and exited by the same task: a dedicated task owns the connection and the
+    callers only send requests on the initialized session.
+    """
+
+    def __init__(self, url: str, request_timeout: float, server_script: str = SERVER_SCRIPT):
+        self.url = url
+        self.request_timeout = request_timeout
+        self.server_script = server_script
+        self.session: ClientSession | None = None
+        self._ready = asyncio.Event()
+        self._closing = asyncio.Event()
+        self._error: BaseException | None = None
+        self._task: asyncio.Task | None = None
+
+    @property
+    def alive(self) -> bool:
+        return self.session is not None and not self._task.done()
+
+    async def open(self) -> None:
+        self._task = asyncio.create_task(self._run())
+        await self._ready.wait()
+        if self.session is None:
+            raise ConnectionError(f'Unable to connect to MCP server {self.url}') from self._error
+
+    async def _run(self) -> None:
+        try:
+            async with self._transport() as (read, write):
+                async with ClientSession(
+                    read, write, read_timeout_seconds=timedelta(seconds=self.request_timeout)
+                ) as session:
+                    await session.initialize()
+                    self.session = session
+                    self._ready.set()
+                    await self._closing.wait()
+        except Exception as e:
+            self._error = e
+            logger.warning(f'MCP session to {self.url} closed: {e!r}')
+        finally:
+            self.session = None
+            self._ready.set()
+
+    def _transport(self):
+        if self.url == 'stdio':
+            # Inherit the agent environment (feed URLs, cache settings)
+            params = StdioServerParameters(command=sys.executable, args=[self.server_script, 'stdio'], env=dict(os.environ))
+            return stdio_client(params)
+        return sse_client(self.url, timeout=self.request_timeout)
+
+    async def close(self) -> None:
+        self._closing.set()
+        if self._task:
+            await self._task
+
+
+class MCPSessionPool:
+    """Persistent, reconnecting MCP sessions shared by every conversation.
+
+    `url` is the SSE endpoint of a running server, or `stdio` to spawn a single
+    long-lived `server_script` subprocess: a stdio pool holds one session, so
+    that its calls share one server process and its feed caches. Tool schemas
+    are listed once and cached; a session that drops is reopened and the call
+    retried once (all Brest tools are read-only).
+    """
+
+    def __init__(self, url: str | None = None, size: int = 4, request_timeout: float = 30.0, server_script: str = SERVER_SCRIPT):
+        self.url = url or os.getenv('MCP_SERVER_URL', DEFAULT_SERVER_URL)
+        # One server process per session: stdio sessions would each poll the feeds
+        self.size = 1 if self.url == 'stdio' else size
+        self.request_timeout = request_timeout
+        self.server_script = server_script
+        self._idle: asyncio.Queue[_PooledSession] | None = None
+        # Sessions checked out by a running call, closed along with the idle ones
+        self._busy: set[_PooledSession] = set()
+        self._tools: list[Tool] | None = None
+        self._lock = asyncio.Lock()
+
+    async def start(self) -> None:
+        async with self._lock:
+            if self._idle is not None:
+                return
+            # LIFO: reuse the last connected session, open more only under concurrency
+            idle: asyncio.Queue[_PooledSession] = asyncio.LifoQueue()
+            for _ in range(self.size):
+                # Sessions are connected lazily, on first use
+                idle.put_nowait(_PooledSession(self.url, self.request_timeout, self.server_script))
+            self._idle = idle
+
+    async def _acquire(self) -> _PooledSession:
+        await self.start()
+        idle = self._idle
+        pooled = await idle.get()
+        if not pooled.alive and idle is self._idle:
+            pooled = _PooledSession(self.url, self.request_timeout, self.server_script)
+            try:
+                await pooled.open()
+            except BaseException:
+                idle.put_nowait(pooled)
+                raise
+        if idle is not self._idle:
+            # Pool closed while waiting: pass the closed session on to the next waiter
+            await pooled.close()
+            idle.put_nowait(pooled)
+            raise ConnectionError('MCP session pool closed')
+        self._busy.add(pooled)
+        return pooled
+
+    async def _release(self, pooled: _PooledSession) -> None:
+        if pooled in self._busy:
+            self._busy.discard(pooled)
+            self._idle.put_nowait(pooled)
+        else:
+            # Checked out when the pool was closed
+            await pooled.close()
+
+    async def call_tool(self, name: str, arguments: dict[str, Any]) -> CallToolResult:
+        for attempt in (1, 2):
+            pooled = await self._acquire()
+            try:
+                return await pooled.session.call_tool(name, arguments)
+            except Exception as e:
+                if pooled.alive and not isinstance(e, _CONNECTION_ERRORS):
+                    raise
+                logger.warning(f'MCP call {name} failed on a dropped session (attempt {attempt}): {e!r}')
+                await pooled.close()
+                if attempt == 2 or pooled not in self._busy:
+                    raise
+            finally:
+                await self._release(pooled)
+
+    async def list_tools(self) -> list[Tool]:
+        if self._tools is None:
+            pooled = await self._acquire()
+            try:
+                self._tools = (await pooled.session.list_tools()).tools
+            finally:
+                await self._release(pooled)
+        return self._tools
+
+    async def get_tools(self) -> list[BaseTool]:
+        """LangChain tools backed by the pool, built from the cached schemas."""
+        return [self._to_langchain(tool) for tool in await self.list_tools()]
+
+    def _to_langchain(self, tool: Tool) -> BaseTool:
+        async def call(**arguments: Any):
+            cache = ensure_config().get('configurable', {}).get(TOOL_CACHE_KEY)
+            if cache is None:
+                return _convert_result(await self.call_tool(tool.name, arguments))
+            return _convert_result(await cache.call(tool.name, arguments, self.call_tool))
+
+        return StructuredTool(
+            name=tool.name,
+            description=tool.description or '',
+            args_schema=tool.inputSchema,
+            coroutine=call,
+            response_format='content_and_artifact',
+        )
+
+    async def close(self) -> None:
+        """Closes idle and checked-out sessions; calls waiting for a session fail."""
+        idle, self._idle = self._idle, None
+        if idle is None:
+            return
+        sessions = list(self._busy)
+        self._busy.clear()
+        while not idle.empty():
+            sessions.append(idle.get_nowait())
+        for pooled in sessions:
+            await pooled.close()
+        # Wake up the callers blocked on the closed queue
+        for pooled in sessions:
+            idle.put_nowait(pooled)
+
+
+class TaskToolCache:
+    """Memoizes identical tool calls within one agent task.
+
+    The server reports the version of every feed a tool read (`freshness`
+    block). A memoized result is reused until a later result in the same task
+    shows that one of its feeds has moved to a newer version. Identical calls
+    issued concurrently, e.g. twice in one model turn, share a single request.
+    Requests still pending when the task ends are cancelled with `cancel()`.
+    """
+
+    def __init__(self):
+        self._entries: dict[tuple, tuple[asyncio.Future, dict]] = {}
+        self._versions: dict[str, int] = {}
+        self._pending: set[asyncio.Future] = set()
+        self.calls = 0
+        self.hits = 0
+
+    async def call(self, name: str, arguments: dict[str, Any], call_tool) -> CallToolResult:
+        self.calls += 1
+        key = (name, json.dumps(arguments, sort_keys=True))
+        entry = self._entries.get(key)
+        if entry is not None and self._is_current(entry[1]):
+            self.hits += 1
+            return await asyncio.shield(entry[0])
+        future = asyncio.ensure_future(call_tool(name, arguments))
+        feeds: dict[str, int] = {}
+        self._entries[key] = (future, feeds)
+        self._pending.add(future)
+        future.add_done_callback(self._pending.discard)
+        try:
+            result = await asyncio.shield(future)
+        except BaseException:
+            self._entries.pop(key, None)
+            raise
+        if result.isError:
+            self._entries.pop(key, None)
+            return result
+        feeds.update(_feed_versions(result))
+        for feed, version in feeds.items():
+            self._versions[feed] = max(version, self._versions.get(feed, version))
+        return result
+
+    def cancel(self) -> None:
+        for future in list(self._pending):
+            future.cancel()
+
+    def _is_current(self, feeds: dict[str, int]) -> bool:
+        return all(self._versions.get(feed, version) == version for feed, version in feeds.items())
+
+
+def _feed_versions(result: CallToolResult) -> dict[str, int]:
+    """Feed versions from the trailing freshness block of a Brest tool result."""
+    for content in reversed(result.content):
+        if isinstance(content, TextContent) and content.text.startswith('{"freshness"'):
+            freshness = json.loads(content.text)['freshness']
+            return {feed: info['version'] for feed, info in freshness.items() if info.get('version') is not None}
+    return {}
+
+
+def _convert_result(result: CallToolResult) -> tuple[str | list[str], list | None]:
+    """Same content/artifact split as langchain_mcp_adapters."""
+    texts = [content.text for content in result.content if isinstance(content, TextContent)]
+    others = [content for content in result.content if not isinstance(content, TextContent)]
+    text: str | list[str] = texts[0] if len(texts) == 1 else texts or ''
+    if result.isError:
+        raise ToolException(text)
+    return text, others or None
+
+
+_pools: dict[str, MCPSessionPool] = {}
+
+
+def get_pool(url: str | None = None) -> MCPSessionPool:
+    """Process-wide pool for a server URL."""
+    url = url or os.getenv('MCP_SERVER_URL', DEFAULT_SERVER_URL)
+    if url not in _pools:
+        _pools[url] = MCPSessionPool(url)
+    return _pools[url]
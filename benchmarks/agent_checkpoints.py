@@ -0,0 +1,134 @@
+"""Test d'endurance du checkpointer des conversations de l'agent A2A.
+
+Rejoue des milliers de conversations synthétiques (messages utilisateur,
+appels d'outils et résultats de taille réaliste) sur un graphe LangGraph sans
+LLM, avec le checkpointer de l'agent. Une fraction des tours reprend une
+conversation existante. On relève à intervalles réguliers la RSS du processus,
+la mémoire des checkpoints, les évictions et la latence des tours repris.
+
+Usage :
+    uv run python benchmarks/agent_checkpoints.py                       # BoundedMemorySaver
+    uv run python benchmarks/agent_checkpoints.py --backend memorysaver # référence non bornée
+    uv run python benchmarks/agent_checkpoints.py --conversations 20000 --max-mb 64
+"""
+
+import argparse
+import asyncio
+import random
+import resource
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Annotated, TypedDict
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.graph import StateGraph
+from langgraph.graph.message import add_messages
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "agent"))
+
+from checkpointer import BoundedMemorySaver
+
+
+class State(TypedDict):
+    messages: Annotated[list, add_messages]
+
+
+def build_graph(checkpointer):
+    """Un tour d'agent : appel d'outil puis réponse, chacun checkpointé."""
+
+    def call_tool(state: State):
+        call_id = f"call_{random.getrandbits(32):x}"
+        return {
+            "messages": [
+                AIMessage(
+                    "",
+                    tool_calls=[{"name": "get_vehicles", "args": {}, "id": call_id}],
+                ),
+                # Résultat d'outil de quelques Ko, comme un get_vehicles filtré
+                ToolMessage("x" * random.randint(2_000, 8_000), tool_call_id=call_id),
+            ]
+        }
+
+    def answer(state: State):
+        return {"messages": [AIMessage("Le bus 12 arrive dans 4 minutes.")]}
+
+    graph = StateGraph(State)
+    graph.add_node("call_tool", call_tool)
+    graph.add_node("answer", answer)
+    graph.add_edge("__start__", "call_tool")
+    graph.add_edge("call_tool", "answer")
+    return graph.compile(checkpointer=checkpointer)
+
+
+def rss_mb() -> float:
+    """RSS courante (Linux), pic de RSS sinon."""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * resource.getpagesize() / 2**20
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--backend", choices=("bounded", "memorysaver"), default="bounded"
+    )
+    parser.add_argument("--conversations", type=int, default=5000)
+    parser.add_argument(
+        "--resume-rate", type=float, default=0.3, help="part des tours repris"
+    )
+    parser.add_argument("--max-conversations", type=int, default=1000)
+    parser.add_argument("--max-mb", type=float, default=32)
+    parser.add_argument("--report-every", type=int, default=1000)
+    args = parser.parse_args()
+
+    if args.backend == "bounded":
+        checkpointer = BoundedMemorySaver(
+            max_threads=args.max_conversations,
+            max_bytes=int(args.max_mb * 2**20),
+        )
+    else:
+        checkpointer = MemorySaver()
+    graph = build_graph(checkpointer)
+    random.seed(0)
+
+    started = 0
+    resumed = []
+    print(f"{'turns':>7} {'rss MB':>8} {'stored MB':>10} {'evictions':>10} {'resume p50':>11}")
+    for turn in range(1, args.conversations + 1):
+        if started and random.random() < args.resume_rate:
+            # Reprise d'une conversation récente (les plus actives restent chaudes)
+            thread_id = str(max(0, started - 1 - int(random.expovariate(1 / 50))))
+            begin = time.perf_counter()
+            await graph.ainvoke(
+                {"messages": [HumanMessage("Et le suivant ?")]},
+                {"configurable": {"thread_id": thread_id}},
+            )
+            resumed.append(time.perf_counter() - begin)
+        else:
+            thread_id = str(started)
+            started += 1
+            await graph.ainvoke(
+                {"messages": [HumanMessage("Quand passe le prochain bus 12 ?")]},
+                {"configurable": {"thread_id": thread_id}},
+            )
+        if turn % args.report_every == 0:
+            if isinstance(checkpointer, BoundedMemorySaver):
+                stats = checkpointer.stats()
+                stored, evictions = stats["bytes"] / 2**20, stats["evictions"]
+            else:
+                stored, evictions = float("nan"), 0
+            p50 = statistics.median(resumed) * 1000 if resumed else float("nan")
+            print(
+                f"{turn:>7} {rss_mb():>8.1f} {stored:>10.1f} {evictions:>10}"
+                f" {p50:>8.2f} ms"
+            )
+            resumed.clear()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,298 @@
+"""Benchmarks des parseurs GTFS-RT et des outils MCP du serveur.
+
+Chaque cas est mesuré sur les captures de `benchmarks/fixtures` (bibus, star,
+tub) puis sur des montées en charge synthétiques (×10, ×100 entités). On relève
+la latence par appel, le pic mémoire et la mémoire retenue par le résultat,
+puis on compare à la référence enregistrée dans `benchmarks/baseline.json`.
+
+Usage :
+    uv run python benchmarks/bench.py                  # mesure + comparaison
+    uv run python benchmarks/bench.py --save-baseline  # met à jour la référence
+    uv run python benchmarks/bench.py --check          # code retour 1 si régression
+    uv run python benchmarks/bench.py --networks bibus --scales 1 10 -k parse
+"""
+
+import argparse
+import asyncio
+import gc
+import json
+import logging
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from functools import partial
+from pathlib import Path
+
+from google.protobuf import __version__ as protobuf_version
+from google.transit import gtfs_realtime_pb2
+
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH_DIR.parent))
+
+from src import search, server
+
+FIXTURES_DIR = BENCH_DIR / "fixtures"
+BASELINE_PATH = BENCH_DIR / "baseline.json"
+FEED_TYPES = ("vehicle_positions", "trip_updates", "service_alerts")
+# Les outils sont des coroutines : une boucle unique pour toute la session
+LOOP = asyncio.new_event_loop()
+
+
+def load_fixture(network: str) -> dict[str, bytes]:
+    """Charge les captures brutes d'un réseau."""
+    return {
+        feed_type: (FIXTURES_DIR / network / f"{feed_type}.pb").read_bytes()
+        for feed_type in FEED_TYPES
+    }
+
+
+def decode(payload: bytes) -> gtfs_realtime_pb2.FeedMessage:
+    feed = gtfs_realtime_pb2.FeedMessage()
+    feed.ParseFromString(payload)
+    return feed
+
+
+def scale_feed(
+    feed: gtfs_realtime_pb2.FeedMessage, factor: int
+) -> gtfs_realtime_pb2.FeedMessage:
+    """Duplique les entités d'un flux en rendant leurs identifiants uniques."""
+    scaled = gtfs_realtime_pb2.FeedMessage()
+    scaled.CopyFrom(feed)
+    for copy in range(1, factor):
+        suffix = f"~{copy}"
+        for entity in feed.entity:
+            clone = scaled.entity.add()
+            clone.CopyFrom(entity)
+            clone.id += suffix
+            if clone.HasField("vehicle"):
+                clone.vehicle.vehicle.id += suffix
+                clone.vehicle.trip.trip_id += suffix
+            if clone.HasField("trip_update"):
+                clone.trip_update.trip.trip_id += suffix
+                clone.trip_update.vehicle.id += suffix
+    return scaled
+
+
+def prime_cache(payloads: dict[str, bytes]) -> dict[str, gtfs_realtime_pb2.FeedMessage]:
+    """Installe les flux dans le cache du serveur pour court-circuiter le réseau."""
+    # Un cas ×100 peut durer plus que l'intervalle de rafraîchissement
+    server.REFRESH_INTERVAL = float("inf")
+    server.POLLER.default_interval = float("inf")
+    feeds = {}
+    for feed_type, payload in payloads.items():
+        feed = decode(payload)
+        server._cache[feed_type].update(
+            {"data": feed, "timestamp": time.time(), "last_update": "benchmark"}
+        )
+        feeds[feed_type] = feed
+    return feeds
+
+
+def awaited(coroutine_fn, *args):
+    """Appel synchrone d'un outil asynchrone, sur la boucle du benchmark."""
+    return lambda: LOOP.run_until_complete(coroutine_fn(*args))
+
+
+def cold(fn):
+    """Appel après invalidation des résultats dérivés mémorisés par version de flux."""
+
+    def call():
+        for cache in server._cache.values():
+            cache.pop("derived", None)
+        return fn()
+
+    return call
+
+
+def busiest_route(feeds: dict) -> str:
+    """Ligne ayant le plus de véhicules, pour les outils filtrés par ligne."""
+    counts = {}
+    for entity in feeds["vehicle_positions"].entity:
+        route_id = entity.vehicle.trip.route_id
+        counts[route_id] = counts.get(route_id, 0) + 1
+    return max(counts, key=counts.get)
+
+
+def build_cases(payloads: dict[str, bytes], feeds: dict) -> dict:
+    """Associe à chaque nom de cas un appel sans argument."""
+    route_id = busiest_route(feeds)
+    last_vehicle = feeds["vehicle_positions"].entity[-1].id
+    last_trip = feeds["trip_updates"].entity[-1].trip_update.trip.trip_id
+    alerts_index = search.index_alerts(feeds["service_alerts"])
+    cases = {}
+    for feed_type in FEED_TYPES:
+        cases[f"decode.{feed_type}"] = partial(decode, payloads[feed_type])
+    cases.update(
+        {
+            "parse.vehicle_positions": partial(
+                server._parse_vehicle_positions, feeds["vehicle_positions"]
+            ),
+            "parse.trip_updates": partial(
+                server._parse_trip_updates, feeds["trip_updates"]
+            ),
+            "parse.service_alerts": partial(
+                server._parse_service_alerts, feeds["service_alerts"]
+            ),
+            "network_statistics": awaited(server._get_network_statistics),
+            "tool.get_vehicles": awaited(server.get_vehicle_positions),
+            "tool.get_vehicle": awaited(server.get_vehicle, last_vehicle),
+            "tool.get_trip_update": awaited(server.get_trip_update, last_trip),
+            "tool.get_trip_updates": awaited(server.get_trip_updates),
+            "tool.get_service_alerts": awaited(server.get_service_alerts),
+            "tool.find_vehicles_by_route": awaited(
+                server.find_vehicles_by_route, route_id
+            ),
+            "tool.find_alerts_by_route": awaited(server.find_alerts_by_route, route_id),
+            "tool.get_route_delays": awaited(server.get_route_delays, route_id),
+            "tool.find_trips_by_route": awaited(server.find_trips_by_route, route_id),
+            "resource.route": awaited(server.route_resource, route_id),
+            "resource.network_stats": awaited(server.network_stats_resource),
+            "search.index_alerts": partial(
+                search.index_alerts, feeds["service_alerts"]
+            ),
+            "search.query": partial(alerts_index.search, "travaux déviation ligne"),
+        }
+    )
+    # Premier appel après un changement de version : parsing complet dans le pool
+    cases["network_statistics.cold"] = cold(cases["network_statistics"])
+    cases["tool.get_vehicles.cold"] = cold(cases["tool.get_vehicles"])
+    return cases
+
+
+def measure_time(fn, budget: float) -> dict:
+    """Répète l'appel jusqu'à épuiser le budget (au moins 3 échantillons)."""
+    fn()
+    samples = []
+    deadline = time.perf_counter() + budget
+    while len(samples) < 3 or time.perf_counter() < deadline:
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+        if samples[0] > budget:
+            break
+    return {
+        "median_ms": statistics.median(samples) * 1000,
+        "min_ms": min(samples) * 1000,
+        "runs": len(samples),
+    }
+
+
+def measure_memory(fn) -> dict:
+    """Pic mémoire pendant l'appel et mémoire retenue par son résultat.
+
+    Les allocations internes de protobuf (upb, en C) échappent à tracemalloc :
+    les cas `decode.*` ne mesurent donc que la latence de façon fiable.
+    """
+    gc.collect()
+    blocks_before = sys.getallocatedblocks()
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    result = fn()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    blocks = sys.getallocatedblocks() - blocks_before
+    del result
+    return {
+        "peak_kib": (peak - before) / 1024,
+        "retained_kib": (current - before) / 1024,
+        "retained_blocks": blocks,
+    }
+
+
+def run(networks: list[str], scales: list[int], pattern: str, budget: float) -> dict:
+    results = {}
+    for network in networks:
+        base = {t: decode(p) for t, p in load_fixture(network).items()}
+        for scale in scales:
+            payloads = {
+                t: scale_feed(feed, scale).SerializeToString()
+                for t, feed in base.items()
+            }
+            feeds = prime_cache(payloads)
+            for name, fn in build_cases(payloads, feeds).items():
+                if pattern and pattern not in name:
+                    continue
+                key = f"{network}/x{scale}/{name}"
+                results[key] = {**measure_time(fn, budget), **measure_memory(fn)}
+                print(
+                    f"{key:<50} {results[key]['median_ms']:>10.3f} ms"
+                    f" {results[key]['peak_kib']:>12.1f} KiB peak",
+                    flush=True,
+                )
+    return results
+
+
+def compare(results: dict, baseline: dict, time_tol: float, mem_tol: float) -> list:
+    """Liste les cas dont la latence ou le pic mémoire dépasse la référence."""
+    regressions = []
+    print(f"\n{'case':<50} {'time':>8} {'peak':>8}")
+    for key, current in results.items():
+        reference = baseline.get(key)
+        if not reference:
+            continue
+        time_ratio = current["median_ms"] / max(reference["median_ms"], 1e-6)
+        mem_ratio = (current["peak_kib"] + 64) / (reference["peak_kib"] + 64)
+        flag = ""
+        if time_ratio > 1 + time_tol or mem_ratio > 1 + mem_tol:
+            flag = "  REGRESSION"
+            regressions.append(key)
+        print(f"{key:<50} {time_ratio:>7.2f}x {mem_ratio:>7.2f}x{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--networks", nargs="+", default=["bibus", "star", "tub"])
+    parser.add_argument("--scales", nargs="+", type=int, default=[1, 10, 100])
+    parser.add_argument("-k", dest="pattern", default="", help="filtre sur le nom")
+    parser.add_argument(
+        "--budget", type=float, default=0.5, help="secondes de mesure par cas"
+    )
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--output", type=Path, help="écrit les résultats en JSON")
+    parser.add_argument("--check", action="store_true")
+    parser.add_argument("--time-tolerance", type=float, default=0.25)
+    parser.add_argument("--memory-tolerance", type=float, default=0.10)
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    results = run(args.networks, args.scales, args.pattern, args.budget)
+    LOOP.run_until_complete(server._close_http_session())
+    report = {
+        "meta": {
+            "date": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "protobuf": protobuf_version,
+        },
+        "results": results,
+    }
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2))
+
+    if args.save_baseline:
+        previous = {}
+        if args.baseline.exists():
+            previous = json.loads(args.baseline.read_text())["results"]
+        report["results"] = {**previous, **results}
+        args.baseline.write_text(json.dumps(report, indent=2, sort_keys=True) + "\n")
+        print(f"\nBaseline saved to {args.baseline}")
+        return
+
+    if not args.baseline.exists():
+        print(f"\nNo baseline at {args.baseline}, run with --save-baseline first.")
+        return
+    baseline = json.loads(args.baseline.read_text())["results"]
+    regressions = compare(results, baseline, args.time_tolerance, args.memory_tolerance)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) against baseline")
+        if args.check:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""Coût de mise à jour des intervalles (headways) par capture `vehicle_positions`.
+
+Part des captures de `benchmarks/fixtures` et de leur GTFS statique synthétique
+(`gtfs_static.zip`) : chaque véhicule est placé sur le tracé de sa course, puis
+avance à sa vitesse d'une capture à l'autre (30 s). On mesure la construction
+de l'index des tracés, puis le temps de `HeadwayEngine.update` par capture,
+lorsque toute la flotte a bougé et lorsque seule une fraction a émis une
+nouvelle position. `--scale` multiplie la flotte (courses inconnues du GTFS
+statique, rattachées au tracé de leur ligne et sens).
+
+Usage :
+    uv run python benchmarks/headway_updates.py                  # flotte STAR complète
+    uv run python benchmarks/headway_updates.py --network bibus --scale 10
+"""
+
+import argparse
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+from google.transit import gtfs_realtime_pb2
+
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH_DIR.parent / "src"))
+
+from headways import HeadwayEngine, ShapeIndex
+
+FIXTURES_DIR = BENCH_DIR / "fixtures"
+SNAPSHOT_INTERVAL = 30
+
+
+def build_fleet(index: ShapeIndex, feed, scale: int, rng: random.Random) -> list:
+    """Véhicules de la capture (×`scale`) : tracé, abscisse de départ, vitesse."""
+    fleet = []
+    for copy in range(scale):
+        for entity in feed.entity:
+            trip = entity.vehicle.trip
+            shape_id = index.shape_for(trip.trip_id, trip.route_id, trip.direction_id)
+            length = index.shapes[shape_id].length
+            fleet.append(
+                {
+                    "id": f"{entity.id}-{copy}" if copy else entity.id,
+                    "trip_id": f"{trip.trip_id}-{copy}" if copy else trip.trip_id,
+                    "route_id": trip.route_id,
+                    "direction_id": trip.direction_id,
+                    "shape_id": shape_id,
+                    "distance": rng.uniform(0, length),
+                    "speed": rng.uniform(3, 9),
+                }
+            )
+    return fleet
+
+
+def snapshot(index: ShapeIndex, fleet: list, timestamp: int):
+    feed = gtfs_realtime_pb2.FeedMessage()
+    feed.header.gtfs_realtime_version = "2.0"
+    feed.header.timestamp = timestamp
+    for vehicle in fleet:
+        entity = feed.entity.add()
+        entity.id = vehicle["id"]
+        vp = entity.vehicle
+        vp.trip.trip_id = vehicle["trip_id"]
+        vp.trip.route_id = vehicle["route_id"]
+        vp.trip.direction_id = vehicle["direction_id"]
+        vp.vehicle.id = vehicle["id"]
+        shape = index.shapes[vehicle["shape_id"]]
+        lat, lon = index.to_degrees(*shape.point_at(vehicle["distance"]))
+        vp.position.latitude = lat
+        vp.position.longitude = lon
+        vp.timestamp = vehicle.get("timestamp", timestamp)
+    return feed
+
+
+def measure(engine, feeds) -> list[float]:
+    durations = []
+    for feed in feeds:
+        started = time.perf_counter()
+        engine.update(feed)
+        durations.append(time.perf_counter() - started)
+    return durations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--network", default="star")
+    parser.add_argument("--scale", type=int, default=1)
+    parser.add_argument("--snapshots", type=int, default=40)
+    parser.add_argument(
+        "--moved", type=float, default=0.3, help="part de la flotte qui a bougé"
+    )
+    args = parser.parse_args()
+    rng = random.Random(0)
+
+    content = (FIXTURES_DIR / args.network / "gtfs_static.zip").read_bytes()
+    started = time.perf_counter()
+    index = ShapeIndex.from_zip(content)
+    index_ms = (time.perf_counter() - started) * 1000
+    points = sum(len(shape.xs) for shape in index.shapes.values())
+    print(
+        f"{args.network}: {len(index.shapes)} shapes, {points} points,"
+        f" index built in {index_ms:.1f} ms"
+    )
+
+    feed = gtfs_realtime_pb2.FeedMessage()
+    feed.ParseFromString(
+        (FIXTURES_DIR / args.network / "vehicle_positions.pb").read_bytes()
+    )
+    fleet = build_fleet(index, feed, args.scale, rng)
+    timestamp = feed.header.timestamp
+
+    def advance(share: float) -> list:
+        nonlocal timestamp
+        timestamp += SNAPSHOT_INTERVAL
+        feeds = []
+        for _ in range(args.snapshots):
+            for vehicle in fleet:
+                if rng.random() < share:
+                    vehicle["distance"] += vehicle["speed"] * SNAPSHOT_INTERVAL
+                    vehicle["timestamp"] = timestamp
+            feeds.append(snapshot(index, fleet, timestamp))
+            timestamp += SNAPSHOT_INTERVAL
+        return feeds
+
+    engine = HeadwayEngine(index)
+    cold = measure(engine, [snapshot(index, fleet, timestamp)])[0]
+    print(f"{len(fleet)} vehicles, first snapshot: {cold * 1000:.1f} ms")
+    print(f"{'moved':>6} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8}")
+    for share in (1.0, args.moved, 0.0):
+        durations = sorted(d * 1000 for d in measure(engine, advance(share)))
+        p95 = durations[int(0.95 * (len(durations) - 1))]
+        print(
+            f"{share:>6.0%} {statistics.median(durations):>8.2f} {p95:>8.2f}"
+            f" {durations[-1]:>8.2f}"
+        )
+    print(f"bunching pairs after the run: {len(engine.bunching())}")
+
+
+if __name__ == "__main__":
+    main()
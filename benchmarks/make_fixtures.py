@@ -0,0 +1,288 @@
+"""Génère les flux GTFS-RT de référence utilisés par les benchmarks.
+
+Les captures sont synthétiques mais déterministes : même graine, mêmes octets.
+Un GTFS statique minimal (`gtfs_static.zip` : lignes, courses et tracés) les
+accompagne ; chaque tracé passe par les véhicules de sa ligne et de son sens.
+Leur volumétrie (véhicules, lignes, arrêts, alertes) reprend l'ordre de
+grandeur observé sur les proxys transport.data.gouv.fr de chaque réseau.
+
+Usage :
+    uv run python benchmarks/make_fixtures.py
+"""
+
+import csv
+import io
+import math
+import random
+import zipfile
+from pathlib import Path
+
+from google.transit import gtfs_realtime_pb2
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+
+# Horodatage figé des captures (2025-10-13 08:00:00 UTC)
+HEADER_TIMESTAMP = 1760342400
+
+# Volumétrie et centre géographique approximatifs de chaque réseau
+NETWORKS = {
+    "bibus": {
+        "seed": 29200,
+        "center": (48.3904, -4.4861),
+        "vehicles": 140,
+        "routes": 28,
+        "stops": 1100,
+        "alerts": 12,
+    },
+    "star": {
+        "seed": 35000,
+        "center": (48.1113, -1.6800),
+        "vehicles": 520,
+        "routes": 110,
+        "stops": 3400,
+        "alerts": 35,
+    },
+    "tub": {
+        "seed": 22000,
+        "center": (48.5136, -2.7603),
+        "vehicles": 55,
+        "routes": 16,
+        "stops": 650,
+        "alerts": 6,
+    },
+}
+
+ALERT_TEXTS = [
+    (
+        "Travaux rue de Siam",
+        "En raison de travaux, les arrêts Siam et Liberté ne sont pas desservis.",
+    ),
+    (
+        "Déviation Recouvrance",
+        "La ligne est déviée par le pont de Recouvrance jusqu'à nouvel ordre.",
+    ),
+    (
+        "Manifestation centre-ville",
+        "Perturbations prévues entre 14h et 18h, place de la Liberté.",
+    ),
+    ("Arrêt déplacé", "L'arrêt Jaurès est provisoirement déplacé de 50 mètres."),
+    (
+        "Conditions météorologiques",
+        "Tempête : circulation ralentie sur l'ensemble du réseau.",
+    ),
+    ("Service réduit", "Fréquence réduite pendant les vacances scolaires."),
+    ("Incident technique", "Un incident technique perturbe la circulation du tramway."),
+    ("Grève", "Mouvement social : seules les lignes principales sont assurées."),
+]
+
+
+def _route_ids(count: int) -> list[str]:
+    ids = ["A", "B", "C"] if count > 20 else ["A"]
+    ids += [str(n) for n in range(1, count - len(ids) + 1)]
+    return ids
+
+
+def _vehicle_positions(rng: random.Random, spec: dict, trips: list[tuple]) -> bytes:
+    feed = gtfs_realtime_pb2.FeedMessage()
+    feed.header.gtfs_realtime_version = "2.0"
+    feed.header.incrementality = gtfs_realtime_pb2.FeedHeader.FULL_DATASET
+    feed.header.timestamp = HEADER_TIMESTAMP
+    lat0, lon0 = spec["center"]
+    for vehicle_id, trip_id, route_id, start_time, direction in trips:
+        entity = feed.entity.add()
+        entity.id = vehicle_id
+        vp = entity.vehicle
+        vp.trip.trip_id = trip_id
+        vp.trip.route_id = route_id
+        vp.trip.direction_id = direction
+        vp.trip.start_time = start_time
+        vp.trip.start_date = "20251013"
+        vp.vehicle.id = vehicle_id
+        vp.vehicle.label = vehicle_id
+        vp.position.latitude = lat0 + rng.uniform(-0.06, 0.06)
+        vp.position.longitude = lon0 + rng.uniform(-0.09, 0.09)
+        vp.position.bearing = rng.uniform(0, 360)
+        vp.position.speed = rng.uniform(0, 14)
+        vp.current_stop_sequence = rng.randint(1, 30)
+        vp.stop_id = str(rng.randint(1, spec["stops"]))
+        vp.current_status = rng.choice((0, 1, 2))
+        vp.timestamp = HEADER_TIMESTAMP - rng.randint(0, 45)
+    return feed.SerializeToString()
+
+
+def _trip_updates(rng: random.Random, spec: dict, trips: list[tuple]) -> bytes:
+    feed = gtfs_realtime_pb2.FeedMessage()
+    feed.header.gtfs_realtime_version = "2.0"
+    feed.header.incrementality = gtfs_realtime_pb2.FeedHeader.FULL_DATASET
+    feed.header.timestamp = HEADER_TIMESTAMP
+    for vehicle_id, trip_id, route_id, start_time, direction in trips:
+        entity = feed.entity.add()
+        entity.id = trip_id
+        tu = entity.trip_update
+        tu.trip.trip_id = trip_id
+        tu.trip.route_id = route_id
+        tu.trip.direction_id = direction
+        tu.trip.start_time = start_time
+        tu.trip.start_date = "20251013"
+        tu.vehicle.id = vehicle_id
+        delay = rng.randint(-60, 240)
+        eta = HEADER_TIMESTAMP + rng.randint(30, 120)
+        first_sequence = rng.randint(1, 15)
+        for offset in range(rng.randint(6, 24)):
+            delay = max(-120, delay + rng.randint(-20, 30))
+            eta += rng.randint(60, 150)
+            stu = tu.stop_time_update.add()
+            stu.stop_sequence = first_sequence + offset
+            stu.stop_id = str(rng.randint(1, spec["stops"]))
+            stu.arrival.delay = delay
+            stu.arrival.time = eta
+            stu.departure.delay = delay
+            stu.departure.time = eta + 20
+    return feed.SerializeToString()
+
+
+def _service_alerts(rng: random.Random, spec: dict, routes: list[str]) -> bytes:
+    feed = gtfs_realtime_pb2.FeedMessage()
+    feed.header.gtfs_realtime_version = "2.0"
+    feed.header.incrementality = gtfs_realtime_pb2.FeedHeader.FULL_DATASET
+    feed.header.timestamp = HEADER_TIMESTAMP
+    for n in range(spec["alerts"]):
+        entity = feed.entity.add()
+        entity.id = f"alert-{n + 1}"
+        alert = entity.alert
+        period = alert.active_period.add()
+        period.start = HEADER_TIMESTAMP - rng.randint(3600, 7 * 86400)
+        period.end = HEADER_TIMESTAMP + rng.randint(3600, 14 * 86400)
+        for route_id in rng.sample(routes, rng.randint(1, 3)):
+            alert.informed_entity.add().route_id = route_id
+        if rng.random() < 0.5:
+            alert.informed_entity.add().stop_id = str(rng.randint(1, spec["stops"]))
+        alert.cause = rng.randint(1, 12)
+        alert.effect = rng.randint(1, 9)
+        header, description = rng.choice(ALERT_TEXTS)
+        alert.header_text.translation.add(text=header, language="fr")
+        alert.description_text.translation.add(text=description, language="fr")
+        if rng.random() < 0.3:
+            alert.header_text.translation.add(text="Service disruption", language="en")
+    return feed.SerializeToString()
+
+
+def _densify(points: list[tuple], step: float) -> list[tuple]:
+    """Intercale des points tous les `step` degrés environ entre les sommets."""
+    dense = [points[0]]
+    for (lat0, lon0), (lat1, lon1) in zip(points, points[1:]):
+        count = max(1, int(math.hypot(lat1 - lat0, lon1 - lon0) / step))
+        dense += [
+            (lat0 + (lat1 - lat0) * k / count, lon0 + (lon1 - lon0) * k / count)
+            for k in range(1, count + 1)
+        ]
+    return dense
+
+
+def _static_gtfs(spec: dict, routes: list[str], vehicle_positions: bytes) -> bytes:
+    """GTFS statique réduit : un tracé par ligne et par sens, passant par les
+    positions des véhicules de la capture, prolongé de part et d'autre."""
+    rng = random.Random(spec["seed"] + 1)
+    feed = gtfs_realtime_pb2.FeedMessage()
+    feed.ParseFromString(vehicle_positions)
+    stops: dict[tuple, list] = {}
+    trips = []
+    for entity in feed.entity:
+        trip = entity.vehicle.trip
+        key = (trip.route_id, trip.direction_id)
+        position = entity.vehicle.position
+        stops.setdefault(key, []).append((position.latitude, position.longitude))
+        trips.append((trip.route_id, trip.trip_id, trip.direction_id))
+
+    lat0 = spec["center"][0]
+    shapes = []
+    for (route_id, direction), points in sorted(stops.items()):
+        # D'ouest en est à l'aller, d'est en ouest au retour
+        points = sorted(points, key=lambda point: point[1], reverse=bool(direction))
+        extension = -0.01 if direction else 0.01
+        start = (lat0 + rng.uniform(-0.06, 0.06), points[0][1] - extension)
+        end = (lat0 + rng.uniform(-0.06, 0.06), points[-1][1] + extension)
+        shape_id = f"{route_id}-{direction}"
+        shapes += [
+            (shape_id, lat, lon, sequence)
+            for sequence, (lat, lon) in enumerate(
+                _densify([start, *points, end], 0.0008), 1
+            )
+        ]
+
+    def table(header: tuple, rows) -> bytes:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator="\n")
+        writer.writerow(header)
+        writer.writerows(rows)
+        return buffer.getvalue().encode()
+
+    files = {
+        "routes.txt": table(
+            ("route_id", "route_short_name", "route_type"),
+            ((route_id, route_id, 3) for route_id in routes),
+        ),
+        "trips.txt": table(
+            ("route_id", "service_id", "trip_id", "direction_id", "shape_id"),
+            (
+                (route_id, "semaine", trip_id, direction, f"{route_id}-{direction}")
+                for route_id, trip_id, direction in trips
+            ),
+        ),
+        "shapes.txt": table(
+            ("shape_id", "shape_pt_lat", "shape_pt_lon", "shape_pt_sequence"),
+            (
+                (shape_id, f"{lat:.6f}", f"{lon:.6f}", sequence)
+                for shape_id, lat, lon, sequence in shapes
+            ),
+        ),
+    }
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, payload in files.items():
+            # Date figée : archive identique d'une génération à l'autre
+            info = zipfile.ZipInfo(name, date_time=(2025, 10, 13, 8, 0, 0))
+            info.compress_type = zipfile.ZIP_DEFLATED
+            archive.writestr(info, payload)
+    return buffer.getvalue()
+
+
+def generate(network: str, spec: dict) -> dict[str, bytes]:
+    """Construit les trois flux GTFS-RT et le GTFS statique d'un réseau."""
+    rng = random.Random(spec["seed"])
+    routes = _route_ids(spec["routes"])
+    trips = []
+    for n in range(spec["vehicles"]):
+        route_id = routes[n % len(routes)]
+        hour, minute = rng.randint(5, 22), rng.choice(range(0, 60, 5))
+        trips.append(
+            (
+                str(100 + n),
+                f"{network}-{route_id}-{n:05d}",
+                route_id,
+                f"{hour:02d}:{minute:02d}:00",
+                n % 2,
+            )
+        )
+    vehicle_positions = _vehicle_positions(rng, spec, trips)
+    return {
+        "vehicle_positions": vehicle_positions,
+        "trip_updates": _trip_updates(rng, spec, trips),
+        "service_alerts": _service_alerts(rng, spec, routes),
+        "gtfs_static": _static_gtfs(spec, routes, vehicle_positions),
+    }
+
+
+def main():
+    for network, spec in NETWORKS.items():
+        target = FIXTURES_DIR / network
+        target.mkdir(parents=True, exist_ok=True)
+        for feed_type, payload in generate(network, spec).items():
+            suffix = ".zip" if feed_type == "gtfs_static" else ".pb"
+            path = target / f"{feed_type}{suffix}"
+            path.write_bytes(payload)
+            print(f"{path.relative_to(FIXTURES_DIR.parent)}: {len(payload)} bytes")
+
+
+if __name__ == "__main__":
+    main()
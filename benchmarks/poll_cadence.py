@@ -0,0 +1,154 @@
+"""Requêtes amont et fraîcheur des données : cadence fixe contre cadence adaptative.
+
+Simule une journée en temps virtuel pour trois réseaux GTFS-RT, l'agenda et la
+météo. Chaque flux amont publie une nouvelle capture à sa propre période (avec
+une gigue de ±10 %), disponible quelques secondes après son horodatage. La
+nuit, les flux de positions ne contiennent plus aucun véhicule. On compare
+l'intervalle fixe `GTFS_REFRESH_INTERVAL` au `PollScheduler` : nombre de
+requêtes, délai entre la disponibilité d'une capture et sa récupération, et
+captures jamais récupérées (remplacées avant la requête suivante).
+
+Usage :
+    uv run python benchmarks/poll_cadence.py
+    uv run python benchmarks/poll_cadence.py --budget 20 --hours 6
+"""
+
+import argparse
+import heapq
+import random
+import statistics
+import sys
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH_DIR.parent / "src"))
+
+from polling import PollScheduler
+
+# Flux simulés : période de publication, délai de disponibilité, horodatage fourni
+FEEDS = {
+    "vehicle_positions": (30, 4, True),
+    "trip_updates": (60, 6, True),
+    "service_alerts": (300, 10, True),
+}
+NETWORK_FEEDS = {
+    "bibus": {
+        **FEEDS,
+        "open_agenda": (3600, 0, False),
+        "weather_infoclimat": (3 * 3600, 0, False),
+    },
+    "star": FEEDS,
+    "tub": FEEDS,
+}
+# Heures sans véhicule
+NIGHT = (1, 5)
+
+
+class Upstream:
+    """Captures publiées par un flux : horodatage et instant de disponibilité."""
+
+    def __init__(self, period: float, lag: float, hours: float, rng: random.Random):
+        self.lag = lag
+        self.times = []
+        t = rng.uniform(0, period)
+        while t < hours * 3600:
+            self.times.append(t)
+            t += period * rng.uniform(0.9, 1.1)
+
+    def latest(self, now: float) -> int:
+        """Indice de la dernière capture disponible à `now` (-1 si aucune)."""
+        low, high = 0, len(self.times)
+        while low < high:
+            middle = (low + high) // 2
+            if self.times[middle] + self.lag <= now:
+                low = middle + 1
+            else:
+                high = middle
+        return low - 1
+
+
+def night(now: float) -> bool:
+    return NIGHT[0] <= (now / 3600) % 24 < NIGHT[1]
+
+
+def simulate(policy: str, hours: float, interval: float, budget: float, seed: int):
+    rng = random.Random(seed)
+    clock = [0.0]
+    if policy == "fixed":
+        scheduler = PollScheduler(
+            interval, interval, interval, 0, budget, lambda: clock[0]
+        )
+    else:
+        scheduler = PollScheduler(interval, budget=budget, clock=lambda: clock[0])
+    upstreams = {
+        (network, feed_type): Upstream(period, lag, hours, rng)
+        for network, feeds in NETWORK_FEEDS.items()
+        for feed_type, (period, lag, _) in feeds.items()
+    }
+    fetched = {key: -1 for key in upstreams}
+    delays, requests = [], 0
+    queue = [(0.0, key) for key in upstreams]
+    heapq.heapify(queue)
+    end = hours * 3600
+    while queue:
+        now, key = heapq.heappop(queue)
+        if now >= end:
+            continue
+        clock[0] = now
+        if not scheduler.acquire():
+            heapq.heappush(queue, (now + max(scheduler.token_delay(), 0.1), key))
+            continue
+        requests += 1
+        network, feed_type = key
+        upstream = upstreams[key]
+        latest = upstream.latest(now)
+        changed = latest != fetched[key] and latest >= 0
+        has_timestamp = NETWORK_FEEDS[network][feed_type][2]
+        source = None
+        if changed:
+            delays.append(now - upstream.times[latest] - upstream.lag)
+            fetched[key] = latest
+            if has_timestamp:
+                source = upstream.times[latest]
+            if feed_type == "vehicle_positions":
+                scheduler.set_idle(network, night(now))
+        delay = scheduler.observe(
+            network, feed_type, changed, source, now=now, night=has_timestamp
+        )
+        heapq.heappush(queue, (now + delay, key))
+    published = sum(len(upstream.times) for upstream in upstreams.values())
+    return {
+        "requests": requests,
+        "fetched": len(delays),
+        "missed": published - len(delays),
+        "published": published,
+        "delay_p50": statistics.median(delays),
+        "delay_p95": statistics.quantiles(delays, n=20)[-1],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--hours", type=float, default=24)
+    parser.add_argument("--interval", type=float, default=30)
+    parser.add_argument(
+        "--budget", type=float, default=0, help="requêtes par minute (0 : illimité)"
+    )
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    print(
+        f"{'policy':<10} {'requests':>9} {'fetched':>8} {'missed':>7} "
+        f"{'delay p50':>10} {'delay p95':>10}"
+    )
+    for policy in ("fixed", "adaptive"):
+        result = simulate(policy, args.hours, args.interval, args.budget, args.seed)
+        print(
+            f"{policy:<10} {result['requests']:>9} {result['fetched']:>8} "
+            f"{result['missed']:>7} {result['delay_p50']:>9.1f}s "
+            f"{result['delay_p95']:>9.1f}s"
+        )
+
+
+if __name__ == "__main__":
+    main()
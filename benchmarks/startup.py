@@ -0,0 +1,127 @@
+"""Temps de démarrage du serveur MCP lancé en sous-processus stdio.
+
+Reproduit le chemin des clients (agent A2A, tools/client.py,
+tools/client_langgraph.py) : lancement de `src/server.py stdio`, handshake
+MCP, liste des outils puis premier `get_vehicles`. Un premier lancement à
+froid (cache disque vide) alimente le cache de démarrage, les suivants
+mesurent le démarrage à chaud.
+
+Usage :
+    uv run python benchmarks/startup.py                      # 1 froid + 5 chauds
+    uv run python benchmarks/startup.py --budget-ms 1500     # code retour 1 si dépassé
+    uv run python benchmarks/startup.py --imports 15         # imports les plus coûteux
+    FEED_REPLAY_URL=http://localhost:8765 uv run python benchmarks/startup.py
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.stdio import stdio_client
+
+ROOT = Path(__file__).resolve().parent.parent
+SERVER = ROOT / "src" / "server.py"
+
+
+async def start_once(env: dict) -> dict:
+    """Durées cumulées depuis le lancement du processus, en millisecondes."""
+    params = StdioServerParameters(
+        command=sys.executable, args=[str(SERVER), "stdio"], env=env, cwd=str(ROOT)
+    )
+    marks = {}
+    started = time.perf_counter()
+    with open(os.devnull, "w") as devnull:
+        async with stdio_client(params, errlog=devnull) as (read, write):
+            async with ClientSession(read, write) as session:
+                await session.initialize()
+                marks["initialize"] = time.perf_counter() - started
+                await session.list_tools()
+                marks["list_tools"] = time.perf_counter() - started
+                result = await session.call_tool("get_vehicles", {})
+                marks["get_vehicles"] = time.perf_counter() - started
+    vehicles = json.loads(result.content[0].text).get("data", [])
+    freshness = json.loads(result.content[-1].text).get("freshness", {})
+    return {
+        **{name: value * 1000 for name, value in marks.items()},
+        "vehicles": len(vehicles),
+        "age_s": next(iter(freshness.values()), {}).get("ageSeconds"),
+    }
+
+
+def print_run(label: str, run: dict) -> None:
+    print(
+        f"{label:<8} initialize {run['initialize']:>7.0f} ms"
+        f"  list_tools {run['list_tools']:>7.0f} ms"
+        f"  get_vehicles {run['get_vehicles']:>7.0f} ms"
+        f"  ({run['vehicles']} vehicles, data age {run['age_s']} s)"
+    )
+
+
+def print_imports(limit: int) -> None:
+    """Modules dont l'import cumulé est le plus long (python -X importtime)."""
+    output = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import server"],
+        cwd=SERVER.parent,
+        capture_output=True,
+        text=True,
+    ).stderr
+    rows = []
+    for line in output.splitlines()[1:]:
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative, module = line.split("|")
+        # Seuls les imports directs du serveur (un niveau d'indentation)
+        if module.startswith("   ") and not module.startswith("    "):
+            rows.append((int(cumulative) / 1000, module.strip()))
+    print(f"\n{'module':<48} {'cumulative':>10}")
+    for duration, module in sorted(rows, reverse=True)[:limit]:
+        print(f"{module:<48} {duration:>7.1f} ms")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5, help="lancements à chaud")
+    parser.add_argument(
+        "--budget-ms",
+        type=float,
+        help="médiane maximale du premier get_vehicles à chaud",
+    )
+    parser.add_argument("--imports", type=int, default=0, metavar="N")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="brest-mcp-warm-") as warm_dir:
+        env = {**os.environ, "MCP_WARM_CACHE_DIR": warm_dir, "LOG_LEVEL": "WARNING"}
+        print_run("cold", await start_once(env))
+        warm = []
+        for _ in range(args.runs):
+            warm.append(await start_once(env))
+            print_run("warm", warm[-1])
+
+    medians = {
+        name: statistics.median(run[name] for run in warm)
+        for name in ("initialize", "list_tools", "get_vehicles")
+    }
+    print(
+        "\nmedian   "
+        + "  ".join(f"{name} {value:.0f} ms" for name, value in medians.items())
+    )
+    if args.imports:
+        print_imports(args.imports)
+    if args.budget_ms and medians["get_vehicles"] > args.budget_ms:
+        print(
+            f"\nStartup budget exceeded: {medians['get_vehicles']:.0f} ms"
+            f" > {args.budget_ms:.0f} ms"
+        )
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
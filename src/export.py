@@ -0,0 +1,401 @@
+"""Export en colonnes des captures GTFS-RT : NDJSON par blocs, Arrow IPC, Parquet.
+
+Les colonnes sont extraites en une passe sur les messages protobuf, sans
+dictionnaire intermédiaire par entité : listes de valeurs pour les chaînes et
+champs optionnels, `array` typés pour les nombres toujours présents (transmis
+à Arrow sans copie). Les formats binaires reposent sur `pyarrow`, dépendance
+optionnelle importée à la demande.
+
+Les captures historiques sont lues dans un dossier enregistré par
+`tools/feed_recorder.py` (voir `History`).
+"""
+
+import bisect
+import json
+import os
+from array import array
+from json.encoder import encode_basestring
+from operator import add
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from google.transit import gtfs_realtime_pb2
+
+FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "arrow": "application/vnd.apache.arrow.stream",
+    "parquet": "application/vnd.apache.parquet",
+}
+# Lignes par bloc NDJSON, lot Arrow ou groupe de lignes Parquet
+CHUNK_ROWS = 5000
+
+# Colonnes exportées par flux : (nom, type Arrow)
+VEHICLE_COLUMNS = (
+    ("vehicle_id", "string"),
+    ("trip_id", "string"),
+    ("route_id", "string"),
+    ("direction_id", "int32"),
+    ("start_date", "string"),
+    ("latitude", "float64"),
+    ("longitude", "float64"),
+    ("bearing", "float32"),
+    ("speed", "float32"),
+    ("current_status", "int32"),
+    ("stop_id", "string"),
+    ("timestamp", "int64"),
+)
+# Une ligne par stop_time_update
+TRIP_UPDATE_COLUMNS = (
+    ("trip_id", "string"),
+    ("route_id", "string"),
+    ("direction_id", "int32"),
+    ("start_date", "string"),
+    ("vehicle_id", "string"),
+    ("stop_sequence", "int32"),
+    ("stop_id", "string"),
+    ("arrival_delay", "int32"),
+    ("arrival_time", "int64"),
+    ("departure_delay", "int32"),
+    ("departure_time", "int64"),
+    ("schedule_relationship", "int32"),
+)
+ALERT_COLUMNS = (
+    ("alert_id", "string"),
+    ("cause", "int32"),
+    ("effect", "int32"),
+    ("start", "int64"),
+    ("end", "int64"),
+    ("route_ids", "string"),
+    ("stop_ids", "string"),
+    ("header_text", "string"),
+    ("description_text", "string"),
+)
+
+Columns = Dict[str, Sequence]
+
+
+def vehicle_columns(feed: gtfs_realtime_pb2.FeedMessage) -> Columns:
+    columns: Columns = {name: [] for name, _ in VEHICLE_COLUMNS}
+    columns.update(latitude=array("d"), longitude=array("d"), timestamp=array("q"))
+    vehicle_id, trip_id, route_id = (
+        columns["vehicle_id"],
+        columns["trip_id"],
+        columns["route_id"],
+    )
+    direction_id, start_date = columns["direction_id"], columns["start_date"]
+    latitude, longitude = columns["latitude"], columns["longitude"]
+    bearing, speed = columns["bearing"], columns["speed"]
+    current_status, stop_id = columns["current_status"], columns["stop_id"]
+    timestamp = columns["timestamp"]
+    for entity in feed.entity:
+        if not entity.HasField("vehicle"):
+            continue
+        vp = entity.vehicle
+        trip = vp.trip
+        position = vp.position
+        vehicle_id.append(entity.id or vp.vehicle.id)
+        trip_id.append(trip.trip_id or None)
+        route_id.append(trip.route_id or None)
+        direction_id.append(
+            trip.direction_id if trip.HasField("direction_id") else None
+        )
+        start_date.append(trip.start_date or None)
+        latitude.append(position.latitude)
+        longitude.append(position.longitude)
+        bearing.append(position.bearing if position.HasField("bearing") else None)
+        speed.append(position.speed if position.HasField("speed") else None)
+        current_status.append(
+            vp.current_status if vp.HasField("current_status") else None
+        )
+        stop_id.append(vp.stop_id or None)
+        timestamp.append(vp.timestamp or feed.header.timestamp)
+    return columns
+
+
+def trip_update_columns(feed: gtfs_realtime_pb2.FeedMessage) -> Columns:
+    columns = {name: [] for name, _ in TRIP_UPDATE_COLUMNS}
+    trip_id, route_id, direction_id = (
+        columns["trip_id"],
+        columns["route_id"],
+        columns["direction_id"],
+    )
+    start_date, vehicle_id = columns["start_date"], columns["vehicle_id"]
+    stop_sequence, stop_id = columns["stop_sequence"], columns["stop_id"]
+    arrival_delay, arrival_time = columns["arrival_delay"], columns["arrival_time"]
+    departure_delay = columns["departure_delay"]
+    departure_time = columns["departure_time"]
+    relationship = columns["schedule_relationship"]
+    for entity in feed.entity:
+        if not entity.HasField("trip_update"):
+            continue
+        tu = entity.trip_update
+        trip = tu.trip
+        direction = trip.direction_id if trip.HasField("direction_id") else None
+        vehicle = tu.vehicle.id or None
+        updates = tu.stop_time_update
+        count = len(updates)
+        # Champs de la course répétés sur chacune de ses lignes
+        trip_id.extend([trip.trip_id] * count)
+        route_id.extend([trip.route_id or None] * count)
+        direction_id.extend([direction] * count)
+        start_date.extend([trip.start_date or None] * count)
+        vehicle_id.extend([vehicle] * count)
+        for stu in updates:
+            arrival, departure = stu.arrival, stu.departure
+            has_arrival = stu.HasField("arrival")
+            has_departure = stu.HasField("departure")
+            stop_sequence.append(
+                stu.stop_sequence if stu.HasField("stop_sequence") else None
+            )
+            stop_id.append(stu.stop_id or None)
+            arrival_delay.append(
+                arrival.delay if has_arrival and arrival.HasField("delay") else None
+            )
+            arrival_time.append(
+                arrival.time if has_arrival and arrival.HasField("time") else None
+            )
+            departure_delay.append(
+                departure.delay
+                if has_departure and departure.HasField("delay")
+                else None
+            )
+            departure_time.append(
+                departure.time if has_departure and departure.HasField("time") else None
+            )
+            relationship.append(stu.schedule_relationship)
+    return columns
+
+
+def alert_columns(feed: gtfs_realtime_pb2.FeedMessage) -> Columns:
+    columns = {name: [] for name, _ in ALERT_COLUMNS}
+    for entity in feed.entity:
+        if not entity.HasField("alert"):
+            continue
+        alert = entity.alert
+        period = alert.active_period[0] if alert.active_period else None
+        informed = alert.informed_entity
+        columns["alert_id"].append(entity.id)
+        columns["cause"].append(alert.cause if alert.HasField("cause") else None)
+        columns["effect"].append(alert.effect if alert.HasField("effect") else None)
+        columns["start"].append((period.start or None) if period else None)
+        columns["end"].append((period.end or None) if period else None)
+        columns["route_ids"].append(
+            ",".join(item.route_id for item in informed if item.route_id) or None
+        )
+        columns["stop_ids"].append(
+            ",".join(item.stop_id for item in informed if item.stop_id) or None
+        )
+        columns["header_text"].append(_translation(alert.header_text))
+        columns["description_text"].append(_translation(alert.description_text))
+    return columns
+
+
+def _translation(text) -> Optional[str]:
+    """Traduction française si elle existe, la première sinon."""
+    for translation in text.translation:
+        if translation.language == "fr":
+            return translation.text
+    return text.translation[0].text if text.translation else None
+
+
+# Extraction et schéma de chaque flux exportable
+EXTRACTORS: Dict[str, Tuple[Callable[..., Columns], tuple]] = {
+    "vehicle_positions": (vehicle_columns, VEHICLE_COLUMNS),
+    "trip_updates": (trip_update_columns, TRIP_UPDATE_COLUMNS),
+    "service_alerts": (alert_columns, ALERT_COLUMNS),
+}
+
+
+def row_count(columns: Columns) -> int:
+    return len(next(iter(columns.values()))) if columns else 0
+
+
+def ndjson_chunks(
+    columns: Columns, schema: tuple, chunk_rows: int = CHUNK_ROWS
+) -> Iterator[bytes]:
+    """Une ligne JSON par entité, par blocs de `chunk_rows` lignes.
+
+    Chaque colonne est encodée d'un bloc selon son type, puis les lignes sont
+    assemblées par concaténation, sans dictionnaire par ligne."""
+    names = [name for name, _ in schema]
+    prefixes = [f'"{name}":' for name in names]
+    encoders = [_ENCODERS.get(type_name, _encode_int) for _, type_name in schema]
+    total = row_count(columns)
+    for start in range(0, total, chunk_rows):
+        stop = min(start + chunk_rows, total)
+        encoded = [
+            list(map(encode, columns[name][start:stop]))
+            for name, encode in zip(names, encoders)
+        ]
+        yield "".join(
+            "{" + ",".join(map(add, prefixes, row)) + "}\n" for row in zip(*encoded)
+        ).encode()
+
+
+def _encode_string(value) -> str:
+    return "null" if value is None else encode_basestring(value)
+
+
+def _encode_float(value) -> str:
+    # Décimales parasites des float32 : 12.3 et non 12.300000190734863
+    return "null" if value is None else repr(round(value, 6))
+
+
+def _encode_int(value) -> str:
+    return "null" if value is None else str(value)
+
+
+_ENCODERS = {
+    "string": _encode_string,
+    "float32": _encode_float,
+    "float64": _encode_float,
+}
+
+
+def arrow_table(columns: Columns, schema: tuple):
+    """Table Arrow construite directement depuis les colonnes (pyarrow requis)."""
+    pa = _pyarrow()
+    arrays = []
+    for name, type_name in schema:
+        values = columns[name]
+        arrow_type = getattr(pa, type_name)()
+        if isinstance(values, array):
+            # Tampon du tableau Python partagé tel quel, sans copie ni valeurs nulles
+            arrays.append(
+                pa.Array.from_buffers(
+                    arrow_type, len(values), [None, pa.py_buffer(values)]
+                )
+            )
+        else:
+            arrays.append(pa.array(values, type=arrow_type))
+    return pa.Table.from_arrays(arrays, names=[name for name, _ in schema])
+
+
+def arrow_chunks(
+    columns: Columns, schema: tuple, chunk_rows: int = CHUNK_ROWS
+) -> Iterator[bytes]:
+    """Flux Arrow IPC, un lot d'enregistrements par bloc."""
+    pa = _pyarrow()
+    table = arrow_table(columns, schema)
+    sink = _Sink()
+    with pa.ipc.new_stream(pa.PythonFile(sink, mode="w"), table.schema) as writer:
+        for batch in table.to_batches(max_chunksize=chunk_rows):
+            writer.write_batch(batch)
+            yield sink.drain()
+    yield sink.drain()
+
+
+def parquet_chunks(
+    columns: Columns, schema: tuple, chunk_rows: int = CHUNK_ROWS
+) -> Iterator[bytes]:
+    """Fichier Parquet, un groupe de lignes par bloc (le pied de fichier en dernier)."""
+    pa = _pyarrow()
+    import pyarrow.parquet as pq
+
+    table = arrow_table(columns, schema)
+    sink = _Sink()
+    with pq.ParquetWriter(
+        pa.PythonFile(sink, mode="w"), table.schema, compression="zstd"
+    ) as writer:
+        for start in range(0, max(table.num_rows, 1), chunk_rows):
+            writer.write_table(table.slice(start, chunk_rows))
+            yield sink.drain()
+    yield sink.drain()
+
+
+def encode_chunks(
+    columns: Columns, schema: tuple, output: str, chunk_rows: int = CHUNK_ROWS
+) -> Iterator[bytes]:
+    """Blocs encodés au format demandé (une clé de `FORMATS`)."""
+    if output == "ndjson":
+        return ndjson_chunks(columns, schema, chunk_rows)
+    if output == "arrow":
+        return arrow_chunks(columns, schema, chunk_rows)
+    if output == "parquet":
+        return parquet_chunks(columns, schema, chunk_rows)
+    raise ValueError(
+        f"Unknown export format {output!r}, expected one of {', '.join(FORMATS)}"
+    )
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+    except ImportError as e:
+        raise RuntimeError(
+            "Arrow and Parquet exports require pyarrow: install the 'export' extra "
+            "(uv sync --extra export, or pip install 'brest-mcp[export]')"
+        ) from e
+    return pyarrow
+
+
+class _Sink:
+    """Fichier en écriture seule dont on récupère le contenu au fil de l'eau."""
+
+    closed = False
+
+    def __init__(self):
+        self._parts: List[bytes] = []
+        self._position = 0
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._parts.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def writable(self) -> bool:
+        return True
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts.clear()
+        return data
+
+
+class History:
+    """Captures enregistrées par `tools/feed_recorder.py` : la réponse d'un flux
+    à une date donnée (la dernière capture réussie antérieure)."""
+
+    def __init__(self, directory: str):
+        self.directory = Path(directory)
+        self._signature = None
+        self._captures: Dict[Tuple[str, str], Tuple[List[float], List[str]]] = {}
+
+    def lookup(
+        self, network: str, feed_type: str, at: float
+    ) -> Optional[Tuple[float, bytes]]:
+        self._load()
+        times, files = self._captures.get((network, feed_type), ([], []))
+        position = bisect.bisect_right(times, at)
+        if not position:
+            return None
+        return times[position - 1], (self.directory / files[position - 1]).read_bytes()
+
+    def _load(self) -> None:
+        index = self.directory / "index.jsonl"
+        stat = os.stat(index)
+        signature = (stat.st_mtime_ns, stat.st_size)
+        if signature == self._signature:
+            return
+        entries: Dict[Tuple[str, str], List[Tuple[float, str]]] = {}
+        with open(index) as lines:
+            for line in lines:
+                entry = json.loads(line)
+                if entry.get("status") == 200 and entry.get("file"):
+                    key = (entry["network"], entry["feed_type"])
+                    entries.setdefault(key, []).append((entry["t"], entry["file"]))
+        self._captures = {}
+        for key, captures in entries.items():
+            captures.sort()
+            self._captures[key] = ([t for t, _ in captures], [f for _, f in captures])
+        self._signature = signature
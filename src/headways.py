@@ -0,0 +1,487 @@
+"""Intervalles entre véhicules (headways) et détection des trains de bus.
+
+Les tracés GTFS (`shapes.txt`) sont projetés une fois en mètres, avec le tableau
+des distances cumulées le long de chaque tracé et une grille des segments. À
+chaque capture `vehicle_positions`, seuls les véhicules qui ont bougé sont
+projetés sur le tracé de leur course (abscisse curviligne), et seules les
+lignes concernées sont réordonnées : l'écart entre deux véhicules consécutifs
+donne l'intervalle en mètres, puis en secondes à la vitesse observée sur la
+ligne. Deux véhicules bien plus proches que l'intervalle médian de la ligne
+forment un train de bus (bunching).
+"""
+
+import bisect
+import csv
+import io
+import math
+import statistics
+import threading
+import zipfile
+from array import array
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+# Mètres par degré de latitude (rayon terrestre moyen)
+METERS_PER_DEGREE = 6371008.8 * math.pi / 180
+# Côté des cellules de la grille des segments, en mètres
+CELL_SIZE = 250.0
+# Segments examinés après la dernière position connue d'un véhicule
+HINT_WINDOW = 8
+# Écart maximal au tracé pour accepter la projection proche de la position précédente
+SNAP_DISTANCE = 60.0
+# Vitesse commerciale supposée tant qu'aucune progression n'a été observée (m/s)
+DEFAULT_SPEED = 5.0
+MAX_SPEED = 30.0
+# Train de bus : écart inférieur à BUNCHING_RATIO fois l'intervalle médian de la
+# ligne, ou à BUNCHING_DISTANCE mètres
+BUNCHING_RATIO = 0.25
+BUNCHING_DISTANCE = 150.0
+# Les véhicules en régulation aux terminus ne forment pas de train de bus
+TERMINUS_MARGIN = 300.0
+
+
+class Shape:
+    """Tracé projeté en mètres, avec distances cumulées et grille des segments."""
+
+    __slots__ = ("shape_id", "xs", "ys", "distances", "length", "_grid")
+
+    def __init__(self, shape_id: str, xs: array, ys: array):
+        self.shape_id = shape_id
+        self.xs = xs
+        self.ys = ys
+        self.distances = array("d", [0.0])
+        total = 0.0
+        for i in range(1, len(xs)):
+            total += math.hypot(xs[i] - xs[i - 1], ys[i] - ys[i - 1])
+            self.distances.append(total)
+        self.length = total
+        self._grid: Dict[Tuple[int, int], List[int]] = {}
+        for i in range(len(xs) - 1):
+            x0, x1 = sorted((xs[i], xs[i + 1]))
+            y0, y1 = sorted((ys[i], ys[i + 1]))
+            for cx in range(int(x0 // CELL_SIZE), int(x1 // CELL_SIZE) + 1):
+                for cy in range(int(y0 // CELL_SIZE), int(y1 // CELL_SIZE) + 1):
+                    self._grid.setdefault((cx, cy), []).append(i)
+
+    def project(
+        self, x: float, y: float, hint: Optional[int] = None
+    ) -> Tuple[float, float, int]:
+        """Projette un point (en mètres) sur le tracé.
+
+        Retourne l'abscisse curviligne, l'écart au tracé et l'indice du segment.
+        `hint`, le segment de la position précédente du véhicule, est examiné en
+        premier : il lève l'ambiguïté des tracés qui repassent par la même rue.
+        """
+        segments = len(self.xs) - 1
+        if segments < 1:
+            return 0.0, math.hypot(x - self.xs[0], y - self.ys[0]), 0
+        if hint is not None:
+            window = range(max(0, hint - 1), min(segments, hint + HINT_WINDOW))
+            best = self._nearest(x, y, window)
+            if best[1] <= SNAP_DISTANCE:
+                return best
+        cx, cy = int(x // CELL_SIZE), int(y // CELL_SIZE)
+        candidates = set()
+        for i in (cx - 1, cx, cx + 1):
+            for j in (cy - 1, cy, cy + 1):
+                candidates.update(self._grid.get((i, j), ()))
+        best = self._nearest(x, y, candidates) if candidates else None
+        # Hors des cellules voisines, un segment est à plus de CELL_SIZE du point
+        if best is None or best[1] > CELL_SIZE:
+            best = self._nearest(x, y, range(segments))
+        return best
+
+    def point_at(self, distance: float) -> Tuple[float, float]:
+        """Point du tracé (en mètres) à l'abscisse curviligne `distance`."""
+        xs, ys, distances = self.xs, self.ys, self.distances
+        if len(xs) < 2:
+            return xs[0], ys[0]
+        distance = min(max(distance, 0.0), self.length)
+        i = min(bisect.bisect_right(distances, distance) - 1, len(xs) - 2)
+        span = distances[i + 1] - distances[i]
+        t = (distance - distances[i]) / span if span else 0.0
+        return xs[i] + t * (xs[i + 1] - xs[i]), ys[i] + t * (ys[i + 1] - ys[i])
+
+    def _nearest(
+        self, x: float, y: float, segments: Iterable[int]
+    ) -> Tuple[float, float, int]:
+        xs, ys, distances = self.xs, self.ys, self.distances
+        best_d2, best_along, best_i = math.inf, 0.0, 0
+        for i in segments:
+            x0, y0 = xs[i], ys[i]
+            dx, dy = xs[i + 1] - x0, ys[i + 1] - y0
+            norm2 = dx * dx + dy * dy
+            t = ((x - x0) * dx + (y - y0) * dy) / norm2 if norm2 else 0.0
+            t = 0.0 if t < 0.0 else 1.0 if t > 1.0 else t
+            ex, ey = x0 + t * dx - x, y0 + t * dy - y
+            d2 = ex * ex + ey * ey
+            if d2 < best_d2:
+                best_d2, best_i = d2, i
+                best_along = distances[i] + t * (distances[i + 1] - distances[i])
+        return best_along, math.sqrt(best_d2), best_i
+
+
+class ShapeIndex:
+    """Tracés d'un GTFS statique et tracé de chaque course, ou à défaut de chaque
+    ligne et sens (tracé le plus fréquent parmi leurs courses)."""
+
+    def __init__(
+        self,
+        shapes: Dict[str, Shape],
+        trip_shapes: Dict[str, str],
+        route_shapes: Dict[Tuple[str, int], str],
+        cos_lat: float,
+    ):
+        self.shapes = shapes
+        self.trip_shapes = trip_shapes
+        self.route_shapes = route_shapes
+        self.cos_lat = cos_lat
+
+    @classmethod
+    def from_zip(cls, content: bytes) -> "ShapeIndex":
+        """Construit l'index depuis le ZIP GTFS (`shapes.txt` et `trips.txt`)."""
+        with zipfile.ZipFile(io.BytesIO(content)) as archive:
+            names = set(archive.namelist())
+            if "shapes.txt" not in names:
+                return cls({}, {}, {}, 1.0)
+            points: Dict[str, List[Tuple[int, float, float]]] = {}
+            for row in _read_csv(archive, "shapes.txt"):
+                points.setdefault(row["shape_id"], []).append(
+                    (
+                        int(row["shape_pt_sequence"]),
+                        float(row["shape_pt_lat"]),
+                        float(row["shape_pt_lon"]),
+                    )
+                )
+            trips = (
+                list(_read_csv(archive, "trips.txt")) if "trips.txt" in names else []
+            )
+
+        # Projection équirectangulaire locale : un seul cosinus pour tout le réseau
+        latitudes = [lat for shape in points.values() for _, lat, _ in shape]
+        cos_lat = (
+            math.cos(math.radians(statistics.fmean(latitudes))) if latitudes else 1.0
+        )
+        shapes = {}
+        for shape_id, shape_points in points.items():
+            shape_points.sort()
+            shapes[shape_id] = Shape(
+                shape_id,
+                array(
+                    "d",
+                    (lon * METERS_PER_DEGREE * cos_lat for _, _, lon in shape_points),
+                ),
+                array("d", (lat * METERS_PER_DEGREE for _, lat, _ in shape_points)),
+            )
+
+        trip_shapes = {}
+        counts: Dict[Tuple[str, int], Dict[str, int]] = {}
+        for trip in trips:
+            shape_id = trip.get("shape_id")
+            if shape_id not in shapes:
+                continue
+            trip_shapes[trip["trip_id"]] = shape_id
+            key = (trip["route_id"], int(trip.get("direction_id") or 0))
+            by_shape = counts.setdefault(key, {})
+            by_shape[shape_id] = by_shape.get(shape_id, 0) + 1
+        route_shapes = {
+            key: max(by_shape, key=by_shape.get) for key, by_shape in counts.items()
+        }
+        return cls(shapes, trip_shapes, route_shapes, cos_lat)
+
+    def shape_for(
+        self, trip_id: str, route_id: str, direction_id: int
+    ) -> Optional[str]:
+        shape_id = self.trip_shapes.get(trip_id)
+        if shape_id is None:
+            shape_id = self.route_shapes.get((route_id, direction_id))
+        return shape_id
+
+    def to_meters(self, latitude: float, longitude: float) -> Tuple[float, float]:
+        return (
+            longitude * METERS_PER_DEGREE * self.cos_lat,
+            latitude * METERS_PER_DEGREE,
+        )
+
+    def to_degrees(self, x: float, y: float) -> Tuple[float, float]:
+        return y / METERS_PER_DEGREE, x / (METERS_PER_DEGREE * self.cos_lat)
+
+
+def _read_csv(archive: zipfile.ZipFile, name: str) -> Iterable[Dict[str, str]]:
+    with archive.open(name) as raw:
+        # utf-8-sig : certains exports GTFS commencent par un BOM
+        yield from csv.DictReader(io.TextIOWrapper(raw, encoding="utf-8-sig"))
+
+
+class _Vehicle:
+    """Dernière position connue d'un véhicule sur son tracé."""
+
+    __slots__ = (
+        "key",
+        "trip_id",
+        "observed",
+        "distance",
+        "segment",
+        "timestamp",
+        "speed",
+    )
+
+    def __init__(self, key: Tuple[str, int, str], trip_id: str):
+        self.key = key
+        self.trip_id = trip_id
+        self.observed: Optional[tuple] = None
+        self.distance = 0.0
+        self.segment: Optional[int] = None
+        self.timestamp = 0
+        self.speed: Optional[float] = None
+
+
+class _Published(NamedTuple):
+    """État servi aux lectures, figé à la fin de chaque `update`."""
+
+    # route_id -> {(route_id, direction_id, shape_id): intervalles calculés}
+    routes: Dict[str, Dict[Tuple[str, int, str], Dict]]
+    bunching: List[Dict]
+    # vehicle_id -> (shape_id, distance, vitesse, horodatage)
+    positions: Dict[str, tuple]
+
+
+_EMPTY = _Published({}, [], {})
+
+
+class HeadwayEngine:
+    """Intervalles par ligne, sens et tracé, mis à jour capture après capture.
+
+    `update` est appelé avec chaque nouvelle capture `vehicle_positions` et peut
+    tourner dans le pool CPU : il prépare un nouvel état sans toucher au
+    précédent, puis le publie d'une seule affectation. Les lectures (`route`,
+    `bunching`, `locate`) servent le dernier état publié sans verrou et ne
+    bloquent donc jamais la boucle asyncio pendant une mise à jour.
+    """
+
+    def __init__(
+        self,
+        shapes: ShapeIndex,
+        bunching_ratio: float = BUNCHING_RATIO,
+        bunching_distance: float = BUNCHING_DISTANCE,
+    ):
+        self.shapes = shapes
+        self.bunching_ratio = bunching_ratio
+        self.bunching_distance = bunching_distance
+        self.snapshots = 0
+        self._vehicles: Dict[str, _Vehicle] = {}
+        self._members: Dict[Tuple[str, int, str], set] = {}
+        self._published = _EMPTY
+        # Les états des véhicules ne sont modifiés que par une capture à la fois
+        self._updating = threading.Lock()
+
+    def update(self, feed) -> Dict[str, int]:
+        """Intègre une capture GTFS-RT ; retourne le nombre de véhicules projetés
+        et de lignes recalculées."""
+        with self._updating:
+            self.snapshots += 1
+            published = self._published
+            positions = dict(published.positions)
+            dirty = set()
+            seen = set()
+            projected = 0
+            for entity in feed.entity:
+                if not entity.HasField("vehicle"):
+                    continue
+                vp = entity.vehicle
+                if not vp.HasField("position") or not vp.trip.route_id:
+                    continue
+                vehicle_id = entity.id or vp.vehicle.id
+                trip = vp.trip
+                shape_id = self.shapes.shape_for(
+                    trip.trip_id, trip.route_id, trip.direction_id
+                )
+                if shape_id is None:
+                    continue
+                seen.add(vehicle_id)
+                key = (trip.route_id, trip.direction_id, shape_id)
+                position = vp.position
+                observed = (
+                    key,
+                    trip.trip_id,
+                    vp.timestamp,
+                    position.latitude,
+                    position.longitude,
+                )
+                state = self._vehicles.get(vehicle_id)
+                if state is not None and state.observed == observed:
+                    continue
+                if state is None or state.key != key or state.trip_id != trip.trip_id:
+                    if state is not None:
+                        self._leave(vehicle_id, state, dirty)
+                    state = self._vehicles[vehicle_id] = _Vehicle(key, trip.trip_id)
+                    self._members.setdefault(key, set()).add(vehicle_id)
+                self._move(state, observed, vp, feed.header.timestamp)
+                positions[vehicle_id] = (
+                    shape_id,
+                    state.distance,
+                    state.speed,
+                    state.timestamp,
+                )
+                projected += 1
+                dirty.add(key)
+
+            for vehicle_id in [v for v in self._vehicles if v not in seen]:
+                self._leave(vehicle_id, self._vehicles.pop(vehicle_id), dirty)
+                positions.pop(vehicle_id, None)
+            # Seules les lignes modifiées sont recopiées ; les autres sont partagées
+            # avec l'état précédent, qui n'est plus jamais modifié
+            routes = dict(published.routes)
+            copied = set()
+            for key in dirty:
+                if key[0] not in copied:
+                    routes[key[0]] = dict(routes.get(key[0], {}))
+                    copied.add(key[0])
+                self._recompute(key, routes)
+            bunching = (
+                published.bunching
+                if not dirty
+                else [
+                    {
+                        "route_id": item["route_id"],
+                        "direction_id": item["direction_id"],
+                        **headway,
+                        "medianHeadwaySeconds": item["medianHeadwaySeconds"],
+                    }
+                    for by_route in routes.values()
+                    for item in by_route.values()
+                    if item["bunched"]
+                    for headway in item["headways"]
+                    if headway["bunched"]
+                ]
+            )
+            self._published = _Published(routes, bunching, positions)
+            return {"projected": projected, "routes": len(dirty)}
+
+    def _move(self, state: _Vehicle, observed: tuple, vp, feed_timestamp: int) -> None:
+        shape = self.shapes.shapes[state.key[2]]
+        x, y = self.shapes.to_meters(vp.position.latitude, vp.position.longitude)
+        distance, _, segment = shape.project(x, y, state.segment)
+        timestamp = vp.timestamp or feed_timestamp
+        if state.observed is not None and timestamp > state.timestamp:
+            speed = (distance - state.distance) / (timestamp - state.timestamp)
+            if 0.0 <= speed <= MAX_SPEED:
+                state.speed = (
+                    speed if state.speed is None else (state.speed + speed) / 2
+                )
+        elif state.speed is None and vp.position.HasField("speed"):
+            state.speed = min(vp.position.speed, MAX_SPEED)
+        state.observed = observed
+        state.distance = distance
+        state.segment = segment
+        state.timestamp = timestamp
+
+    def _leave(self, vehicle_id: str, state: _Vehicle, dirty: set) -> None:
+        members = self._members.get(state.key)
+        if members is not None:
+            members.discard(vehicle_id)
+        dirty.add(state.key)
+
+    def _recompute(self, key: Tuple[str, int, str], routes: Dict) -> None:
+        """Intervalles d'une ligne dans `routes`, le nouvel état en préparation."""
+        route_id, direction_id, shape_id = key
+        members = self._members.get(key)
+        by_route = routes[route_id]
+        if not members:
+            self._members.pop(key, None)
+            by_route.pop(key, None)
+            if not by_route:
+                del routes[route_id]
+            return
+
+        # Du véhicule le plus avancé au dernier parti
+        vehicles = sorted(
+            ((self._vehicles[v], v) for v in members),
+            key=lambda item: item[0].distance,
+            reverse=True,
+        )
+        speeds = [state.speed for state, _ in vehicles if state.speed]
+        speed = statistics.fmean(speeds) if speeds else DEFAULT_SPEED
+        length = self.shapes.shapes[shape_id].length
+        gaps = [
+            leader.distance - follower.distance
+            for (leader, _), (follower, _) in zip(vehicles, vehicles[1:])
+        ]
+        median_gap = statistics.median(gaps) if gaps else None
+
+        headways = []
+        bunched = 0
+        for (leader, leader_id), (follower, follower_id), gap in zip(
+            vehicles, vehicles[1:], gaps
+        ):
+            in_service = (
+                follower.distance > TERMINUS_MARGIN
+                and leader.distance < length - TERMINUS_MARGIN
+            )
+            is_bunched = in_service and (
+                gap < self.bunching_distance
+                or (len(gaps) > 1 and gap < self.bunching_ratio * median_gap)
+            )
+            bunched += is_bunched
+            headways.append(
+                {
+                    "vehicle_id": follower_id,
+                    "leader_id": leader_id,
+                    "gapMeters": round(gap),
+                    "headwaySeconds": round(gap / speed),
+                    "bunched": is_bunched,
+                }
+            )
+
+        by_route[key] = {
+            "route_id": route_id,
+            "direction_id": direction_id,
+            "shape_id": shape_id,
+            "vehicles": [
+                {
+                    "vehicle_id": vehicle_id,
+                    "trip_id": state.trip_id,
+                    "distance": round(state.distance),
+                    "speed": round(state.speed, 1) if state.speed is not None else None,
+                    "timestamp": state.timestamp,
+                }
+                for state, vehicle_id in vehicles
+            ],
+            "headways": headways,
+            "medianHeadwaySeconds": round(median_gap / speed)
+            if median_gap is not None
+            else None,
+            "speed": round(speed, 1),
+            "shapeLength": round(length),
+            "bunched": bunched,
+        }
+
+    def locate(self, vehicle_id: str, at: float, horizon: float) -> Optional[Dict]:
+        """Position du véhicule à l'instant `at`, avancée le long de son tracé à
+        sa vitesse observée depuis la dernière capture (au plus `horizon` s)."""
+        position = self._published.positions.get(vehicle_id)
+        if position is None:
+            return None
+        shape_id, distance, speed, timestamp = position
+        shape = self.shapes.shapes[shape_id]
+        elapsed = min(max(0.0, at - timestamp), horizon)
+        distance = min(distance + (speed or 0.0) * elapsed, shape.length)
+        latitude, longitude = self.shapes.to_degrees(*shape.point_at(distance))
+        return {
+            "latitude": round(latitude, 6),
+            "longitude": round(longitude, 6),
+            "distance": round(distance),
+            "shape_id": shape.shape_id,
+            "speed": speed,
+            "elapsed": elapsed,
+        }
+
+    def route(self, route_id: str) -> List[Dict]:
+        """Intervalles d'une ligne, un élément par sens (et variante de tracé)."""
+        return sorted(
+            self._published.routes.get(route_id, {}).values(),
+            key=lambda item: (item["direction_id"], item["shape_id"]),
+        )
+
+    def bunching(self) -> List[Dict]:
+        """Paires de véhicules en train de bus, toutes lignes confondues."""
+        return list(self._published.bunching)
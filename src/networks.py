@@ -0,0 +1,170 @@
+"""Registre des réseaux GTFS-RT, chargé depuis un fichier de configuration.
+
+Le registre peut décrire des dizaines de réseaux (tous ceux de
+transport.data.gouv.fr), mais seuls ceux interrogés récemment sont actifs : un
+réseau s'active à sa première requête et, sans requête pendant `idle_ttl`
+secondes, redevient inactif. Le serveur libère alors ses caches, index et
+états de rafraîchissement. Les ressources consommées suivent ainsi le nombre de
+réseaux actifs, pas le nombre de réseaux configurés.
+
+Format TOML (ou JSON équivalent, `{"networks": {...}}`) :
+
+    [networks.bibus]
+    name = "Bibus (Brest)"
+    region = "bretagne"
+    vehicle_positions = "https://proxy.transport.data.gouv.fr/resource/..."
+    trip_updates = "https://..."
+    service_alerts = "https://..."
+"""
+
+import json
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+FEED_TYPES = (
+    "vehicle_positions",
+    "trip_updates",
+    "service_alerts",
+    "gtfs_static",
+    "open_agenda",
+    "weather_infoclimat",
+)
+METADATA = ("name", "region")
+
+
+def load(path: str, idle_ttl: float = 1800.0) -> "NetworkRegistry":
+    """Registre décrit par un fichier .toml ou .json."""
+    path = Path(path)
+    if path.suffix == ".json":
+        config = json.loads(path.read_text(encoding="utf-8"))
+    else:
+        import tomllib  # import différé : inutile sans fichier de configuration
+
+        with open(path, "rb") as config_file:
+            config = tomllib.load(config_file)
+    networks = config.get("networks")
+    if not isinstance(networks, dict) or not networks:
+        raise ValueError(f"No [networks] table in {path}")
+    return NetworkRegistry(networks, idle_ttl)
+
+
+class NetworkRegistry:
+    """Réseaux configurés, activité récente et mémoire occupée par réseau."""
+
+    def __init__(self, networks: Dict[str, Dict], idle_ttl: float = 1800.0):
+        self.idle_ttl = idle_ttl
+        # réseau -> flux -> URL (NETWORK_URLS du serveur)
+        self.urls: Dict[str, Dict[str, str]] = {}
+        self.metadata: Dict[str, Dict[str, str]] = {}
+        for network, entry in networks.items():
+            unknown = set(entry) - set(FEED_TYPES) - set(METADATA)
+            if unknown:
+                raise ValueError(
+                    f"Unknown keys for network {network}: {', '.join(sorted(unknown))}"
+                )
+            self.urls[network] = {
+                feed_type: entry[feed_type]
+                for feed_type in FEED_TYPES
+                if entry.get(feed_type)
+            }
+            self.metadata[network] = {
+                key: entry[key] for key in METADATA if key in entry
+            }
+        # Réseaux toujours actifs (réseau par défaut)
+        self.pinned: set = set()
+        self._last_used: Dict[str, float] = {}
+        # réseau -> flux -> octets des réponses amont en cache
+        self._memory: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def __contains__(self, network: str) -> bool:
+        return network in self.urls
+
+    def __len__(self) -> int:
+        return len(self.urls)
+
+    def touch(self, network: str, now: Optional[float] = None) -> None:
+        """Note une requête sur le réseau (qui devient ou reste actif)."""
+        now = time.time() if now is None else now
+        if self._last_used.get(network, 0.0) < now:
+            self._last_used[network] = now
+
+    def is_active(self, network: str, now: Optional[float] = None) -> bool:
+        if network in self.pinned:
+            return True
+        now = time.time() if now is None else now
+        return now - self._last_used.get(network, float("-inf")) < self.idle_ttl
+
+    def active(self, now: Optional[float] = None) -> List[str]:
+        """Réseaux configurés actifs, réseaux épinglés compris."""
+        now = time.time() if now is None else now
+        return [network for network in self.urls if self.is_active(network, now)]
+
+    def idle(self, now: Optional[float] = None) -> List[str]:
+        """Réseaux qui ont été actifs et dont l'état peut être libéré."""
+        now = time.time() if now is None else now
+        tracked = set(self._last_used) | set(self._memory)
+        return [network for network in tracked if not self.is_active(network, now)]
+
+    def release(self, network: str) -> None:
+        """Oublie l'activité et la mémoire d'un réseau libéré par le serveur."""
+        with self._lock:
+            self._last_used.pop(network, None)
+            self._memory.pop(network, None)
+
+    def account(self, network: str, feed_type: str, size: int) -> None:
+        """Taille de la dernière réponse amont conservée pour ce flux."""
+        with self._lock:
+            self._memory.setdefault(network, {})[feed_type] = size
+
+    def memory(self, network: str) -> int:
+        return sum(self._memory.get(network, {}).values())
+
+    def total_memory(self) -> int:
+        with self._lock:
+            return sum(sum(feeds.values()) for feeds in self._memory.values())
+
+    def over_budget(self, budget: int, keep: Optional[str] = None) -> List[str]:
+        """Réseaux à libérer, du moins récemment utilisé au plus récent, pour
+        revenir sous `budget` octets (jamais les réseaux épinglés ni `keep`)."""
+        total = self.total_memory()
+        if not budget or total <= budget:
+            return []
+        victims = []
+        candidates = sorted(
+            (network for network in self._memory if network not in self.pinned),
+            key=lambda network: self._last_used.get(network, 0.0),
+        )
+        for network in candidates:
+            if total <= budget:
+                break
+            if network == keep:
+                continue
+            victims.append(network)
+            total -= self.memory(network)
+        return victims
+
+    def in_region(self, region: Optional[str]) -> List[str]:
+        """Réseaux d'une région (tous si `region` est vide)."""
+        if not region:
+            return list(self.urls)
+        return [
+            network
+            for network, metadata in self.metadata.items()
+            if metadata.get("region") == region
+        ]
+
+    def describe(self, network: str, now: Optional[float] = None) -> Dict:
+        now = time.time() if now is None else now
+        last_used = self._last_used.get(network)
+        return {
+            "id": network,
+            "name": self.metadata[network].get("name", network),
+            "region": self.metadata[network].get("region"),
+            "urls": self.urls[network],
+            "active": self.is_active(network, now),
+            "idleSeconds": round(now - last_used, 1) if last_used else None,
+            "memoryBytes": self.memory(network),
+        }
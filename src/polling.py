@@ -0,0 +1,203 @@
+"""Cadence d'interrogation adaptative des flux amont.
+
+Chaque flux a son propre rythme de mise à jour : environ 30 secondes pour les
+positions des véhicules, quelques minutes pour les alertes, une heure ou plus
+pour la météo et l'agenda. Plutôt qu'un intervalle unique, `PollScheduler`
+apprend la période de chaque flux à partir de l'horodatage de la source
+(FeedHeader.timestamp, Last-Modified, ou à défaut l'instant où un changement a
+été constaté) et du délai habituel entre cet horodatage et la disponibilité de
+la réponse. La requête suivante est placée juste après la prochaine mise à jour
+attendue.
+
+Une réponse inchangée alors qu'une mise à jour était attendue (source en
+retard) déclenche de nouveaux essais rapprochés puis de plus en plus espacés.
+Un réseau qui ne signale plus aucun véhicule (la nuit) n'est interrogé qu'à
+`night_interval`. Enfin, un seau à jetons borne le nombre total de requêtes par
+minute, tous réseaux confondus.
+"""
+
+import threading
+import time
+from typing import Dict, Optional
+
+# Poids d'une nouvelle mesure dans les moyennes glissantes
+SMOOTHING = 0.3
+# Facteur d'espacement des essais successifs sans changement
+BACKOFF = 1.5
+# Marge après l'instant de mise à jour attendu (s)
+MARGIN = 1.0
+# Remontée lente du délai de publication estimé (enveloppe basse)
+LAG_RECOVERY = 0.05
+# Requêtes par période pour un flux sans horodatage de capture
+UNTIMED_POLLS = 4
+
+
+class FeedCadence:
+    """Rythme observé d'un flux : période et délai de publication."""
+
+    def __init__(self):
+        self.period: Optional[float] = None
+        self.lag = 0.0
+        self.source: Optional[float] = None
+        self.timestamped = False
+        self.polled: Optional[float] = None
+        self.misses = 0
+        self.interval: Optional[float] = None
+
+    def observe(self, now: float, changed: bool, source: Optional[float]) -> None:
+        """Intègre une réponse ; `source` est l'horodatage de la capture amont."""
+        polled, self.polled = self.polled, now
+        if not changed:
+            self.misses += 1
+            return
+        self.misses = 0
+        self.timestamped = source is not None
+        if source is None:
+            # Sans horodatage, la mise à jour a eu lieu depuis la requête précédente
+            source = now if polled is None else (polled + now) / 2
+        else:
+            # Une réponse arrive toujours après sa publication : le délai réel est
+            # la borne basse des écarts observés, qui remonte lentement (négatif si
+            # l'horloge de la source est en avance sur la nôtre)
+            sample = now - source
+            if self.period is None or sample < self.lag:
+                self.lag = sample
+            else:
+                self.lag += LAG_RECOVERY * (sample - self.lag)
+        if self.source is not None and source > self.source:
+            delta = source - self.source
+            if self.period is not None and delta > 1.5 * self.period:
+                # Mises à jour intermédiaires manquées : période = fraction de l'écart
+                delta /= round(delta / self.period)
+            self.period = delta if self.period is None else _smooth(self.period, delta)
+        self.source = source
+
+
+class PollScheduler:
+    """Instant de la prochaine requête de chaque flux et budget global de requêtes."""
+
+    def __init__(
+        self,
+        default_interval: float = 30.0,
+        min_interval: float = 5.0,
+        max_interval: float = 900.0,
+        night_interval: float = 300.0,
+        budget: float = 0.0,
+        clock=time.monotonic,
+    ):
+        """`budget` : requêtes par minute tous flux confondus (0 : illimité)."""
+        self.default_interval = default_interval
+        self.min_interval = min_interval
+        self.max_interval = max(max_interval, min_interval)
+        self.night_interval = night_interval
+        self.budget = budget
+        self._feeds: Dict[tuple, FeedCadence] = {}
+        self._idle: Dict[str, bool] = {}
+        self._clock = clock
+        self._tokens = budget
+        self._refilled = clock()
+        self._lock = threading.Lock()
+
+    def observe(
+        self,
+        network: str,
+        feed_type: str,
+        changed: bool,
+        source: Optional[float] = None,
+        now: Optional[float] = None,
+        night: bool = False,
+    ) -> float:
+        """Intègre une réponse du flux et retourne le délai avant la suivante.
+
+        `night` : le flux est mis en veille lorsque son réseau est inactif."""
+        now = time.time() if now is None else now
+        with self._lock:
+            cadence = self._feeds.setdefault((network, feed_type), FeedCadence())
+            cadence.observe(now, changed, source)
+            interval = self._next_interval(cadence, now)
+            if night and self._idle.get(network):
+                interval = max(interval, self.night_interval)
+            cadence.interval = interval
+            return interval
+
+    def interval(self, network: str, feed_type: str) -> float:
+        """Délai entre la dernière réponse du flux et la requête suivante."""
+        cadence = self._feeds.get((network, feed_type))
+        if cadence is None or cadence.interval is None:
+            return self.default_interval
+        return cadence.interval
+
+    def set_idle(self, network: str, idle: bool) -> None:
+        """Réseau sans véhicule signalé (nuit, interruption de service)."""
+        self._idle[network] = idle
+
+    def is_idle(self, network: str) -> bool:
+        return self._idle.get(network, False)
+
+    def forget(self, network: str) -> None:
+        """Oublie la cadence apprise des flux d'un réseau libéré."""
+        with self._lock:
+            for key in [key for key in self._feeds if key[0] == network]:
+                del self._feeds[key]
+            self._idle.pop(network, None)
+
+    def acquire(self, force: bool = False) -> bool:
+        """Prélève un jeton du budget global ; `force` prélève même à découvert
+        (cache vide, la requête ne peut pas être différée)."""
+        if not self.budget:
+            return True
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(
+                self.budget, self._tokens + (now - self._refilled) * self.budget / 60
+            )
+            self._refilled = now
+            if self._tokens < 1 and not force:
+                return False
+            self._tokens -= 1
+            return True
+
+    def token_delay(self) -> float:
+        """Secondes avant qu'un jeton soit disponible (0 sans budget)."""
+        if not self.budget:
+            return 0.0
+        with self._lock:
+            missing = (
+                1 - self._tokens - (self._clock() - self._refilled) * (self.budget / 60)
+            )
+            return max(0.0, missing * 60 / self.budget)
+
+    def snapshot(self, network: str, feed_type: str) -> Dict:
+        """Cadence apprise du flux, pour les vues de santé."""
+        cadence = self._feeds.get((network, feed_type))
+        return {
+            "pollIntervalSeconds": round(self.interval(network, feed_type), 1),
+            "periodSeconds": round(cadence.period, 1)
+            if cadence and cadence.period is not None
+            else None,
+            "lagSeconds": round(cadence.lag, 1) if cadence else None,
+            "idle": self.is_idle(network),
+        }
+
+    def _next_interval(self, cadence: FeedCadence, now: float) -> float:
+        if cadence.period is None:
+            # Période inconnue : intervalle par défaut, espacé tant que rien ne change
+            interval = self.default_interval * BACKOFF**cadence.misses
+        elif not cadence.timestamped:
+            # Instant de publication inconnu : plusieurs requêtes par période
+            interval = cadence.period / UNTIMED_POLLS
+        else:
+            expected = cadence.source + cadence.period + cadence.lag + MARGIN - now
+            if expected > 0:
+                interval = expected
+            else:
+                # Mise à jour en retard : essais rapprochés, jamais plus d'une période
+                interval = min(
+                    cadence.period,
+                    self.min_interval * BACKOFF ** max(0, cadence.misses - 1),
+                )
+        return min(self.max_interval, max(self.min_interval, interval))
+
+
+def _smooth(average: float, sample: float) -> float:
+    return average + SMOOTHING * (sample - average)
@@ -0,0 +1,252 @@
+"""Positions interpolées et heures d'arrivée prévues entre deux rafraîchissements.
+
+Les flux GTFS-RT ne changent que toutes les 30 secondes environ. Entre deux
+captures, la position d'un véhicule est avancée le long de son tracé à sa
+vitesse observée (voir `headways.HeadwayEngine.locate`), ou à défaut selon son
+cap et sa vitesse déclarés. Les heures d'arrivée des trip_updates sont
+corrigées de la tendance récente du retard de chaque course : une course qui
+perd 10 secondes par minute continuera probablement à en perdre jusqu'aux
+arrêts suivants.
+
+Tout est calculé en une passe à chaque capture, puis servi par simple
+consultation de dictionnaires, par véhicule, par course et par arrêt.
+"""
+
+import bisect
+import math
+import threading
+from collections import deque
+from typing import Dict, List, Optional
+
+try:
+    from .headways import METERS_PER_DEGREE
+except ImportError:  # exécuté directement : python src/server.py
+    from headways import METERS_PER_DEGREE
+
+# Captures conservées par course pour estimer la tendance du retard
+DELAY_HISTORY = 5
+# Durée minimale couverte par l'historique avant d'extrapoler une tendance (s)
+MIN_TREND_SPAN = 20
+# Tendance maximale retenue, en secondes de retard par seconde écoulée
+MAX_TREND = 0.5
+# Horizon au-delà duquel la tendance n'est plus extrapolée (s) : une tendance
+# estimée sur quelques captures ne dit rien du retard dans une heure
+MAX_DRIFT_HORIZON = 300.0
+# Correction maximale d'une heure d'arrivée par la tendance (s)
+MAX_DRIFT = 120.0
+# Au-delà, la position n'est plus extrapolée : le véhicule a pu s'arrêter
+MAX_EXTRAPOLATION = 90.0
+
+
+class ArrivalPredictor:
+    """Prévisions d'un réseau, mises à jour par `update_vehicles` et
+    `update_trips` à chaque capture (thread-safe, appelées depuis le pool CPU)."""
+
+    def __init__(self, history: int = DELAY_HISTORY):
+        self.history = history
+        # vehicle_id -> dernière position déclarée
+        self._vehicles: Dict[str, Dict] = {}
+        # trip_id -> [(horodatage, retard)], arrivées prévues, véhicule
+        self._delays: Dict[str, deque] = {}
+        self._trips: Dict[str, Dict] = {}
+        # stop_id -> arrivées prévues, triées par heure
+        self._stops: Dict[str, List[Dict]] = {}
+        self._lock = threading.Lock()
+        # Les historiques de retard ne sont modifiés que par une capture à la fois
+        self._updating = threading.Lock()
+
+    def update_vehicles(self, feed) -> int:
+        """Intègre une capture vehicle_positions."""
+        vehicles = {}
+        for entity in feed.entity:
+            if not entity.HasField("vehicle"):
+                continue
+            vp = entity.vehicle
+            if not vp.HasField("position"):
+                continue
+            position = vp.position
+            vehicles[entity.id or vp.vehicle.id] = {
+                "trip_id": vp.trip.trip_id or None,
+                "route_id": vp.trip.route_id or None,
+                "latitude": position.latitude,
+                "longitude": position.longitude,
+                "bearing": position.bearing if position.HasField("bearing") else None,
+                "speed": position.speed if position.HasField("speed") else None,
+                "timestamp": vp.timestamp or feed.header.timestamp,
+            }
+        with self._lock:
+            self._vehicles = vehicles
+        return len(vehicles)
+
+    def update_trips(self, feed) -> int:
+        """Intègre une capture trip_updates : tendance du retard de chaque course,
+        puis heures d'arrivée corrigées, indexées par course et par arrêt."""
+        with self._updating:
+            return self._update_trips(feed)
+
+    def _update_trips(self, feed) -> int:
+        trips = {}
+        stops: Dict[str, List[Dict]] = {}
+        delays = self._delays
+        seen = set()
+        for entity in feed.entity:
+            if not entity.HasField("trip_update"):
+                continue
+            tu = entity.trip_update
+            trip_id = tu.trip.trip_id
+            if not trip_id:
+                continue
+            seen.add(trip_id)
+            observed_at = tu.timestamp or feed.header.timestamp
+            current = _current_delay(tu)
+            samples = delays.get(trip_id)
+            if samples is None:
+                samples = delays[trip_id] = deque(maxlen=self.history)
+            if current is not None and (not samples or observed_at > samples[-1][0]):
+                samples.append((observed_at, current))
+            trend = _trend(samples)
+
+            vehicle_id = tu.vehicle.id or None
+            arrivals = []
+            for stu in tu.stop_time_update:
+                event = stu.arrival if stu.HasField("arrival") else stu.departure
+                timed = event.HasField("time")
+                if not timed and not event.HasField("delay"):
+                    continue
+                # Le retard dérive encore d'ici le passage à l'arrêt ; sans heure
+                # absolue (retard seul), l'horizon est inconnu et rien n'est extrapolé
+                drift = _drift(trend, event.time - observed_at) if timed else 0.0
+                arrival = {
+                    "stop_id": stu.stop_id,
+                    "stop_sequence": stu.stop_sequence,
+                    "trip_id": trip_id,
+                    "route_id": tu.trip.route_id,
+                    "vehicle_id": vehicle_id,
+                    "reported_arrival": event.time if timed else None,
+                    "predicted_arrival": round(event.time + drift) if timed else None,
+                    "delay": round(event.delay + drift)
+                    if event.HasField("delay")
+                    else None,
+                }
+                arrivals.append(arrival)
+                # L'index par arrêt est trié par heure : seules les arrivées datées
+                if timed:
+                    stops.setdefault(stu.stop_id, []).append(arrival)
+            trips[trip_id] = {
+                "route_id": tu.trip.route_id,
+                "vehicle_id": vehicle_id,
+                "delay": current,
+                "delayTrend": round(trend, 3),
+                "arrivals": arrivals,
+            }
+
+        for arrivals in stops.values():
+            arrivals.sort(key=lambda arrival: arrival["predicted_arrival"])
+        with self._lock:
+            self._delays = {trip_id: delays[trip_id] for trip_id in seen}
+            self._trips = trips
+            self._stops = stops
+        return len(trips)
+
+    def vehicle(self, vehicle_id: str, now: float, engine=None) -> Optional[Dict]:
+        """Position estimée à `now` et prochaines arrivées d'un véhicule.
+
+        `engine`, le moteur d'intervalles du réseau, fournit la progression le
+        long du tracé ; sans tracé, la position suit le cap et la vitesse
+        déclarés."""
+        with self._lock:
+            last = self._vehicles.get(vehicle_id)
+            trip = self._trips.get(last["trip_id"]) if last else None
+        if last is None:
+            return None
+        located = engine.locate(vehicle_id, now, MAX_EXTRAPOLATION) if engine else None
+        if located is not None:
+            method = "shape"
+            elapsed = located["elapsed"]
+            latitude, longitude = located["latitude"], located["longitude"]
+        else:
+            elapsed = min(max(0.0, now - last["timestamp"]), MAX_EXTRAPOLATION)
+            latitude, longitude, moved = _dead_reckoning(last, elapsed)
+            method = "heading" if moved else "last_position"
+        return {
+            "vehicle_id": vehicle_id,
+            "trip_id": last["trip_id"],
+            "route_id": last["route_id"],
+            "latitude": latitude,
+            "longitude": longitude,
+            "method": method,
+            "lastPosition": {
+                "latitude": last["latitude"],
+                "longitude": last["longitude"],
+                "timestamp": last["timestamp"],
+            },
+            "ageSeconds": round(max(0.0, now - last["timestamp"]), 1),
+            "extrapolatedSeconds": round(elapsed, 1),
+            "delay": trip["delay"] if trip else None,
+            "delayTrend": trip["delayTrend"] if trip else None,
+            "nextArrivals": _upcoming(trip["arrivals"], now) if trip else [],
+        }
+
+    def stop(self, stop_id: str, now: float, limit: int = 10) -> List[Dict]:
+        """Prochaines arrivées prévues à un arrêt, de la plus proche à la plus
+        lointaine."""
+        with self._lock:
+            arrivals = self._stops.get(stop_id, [])
+        start = bisect.bisect_left(
+            arrivals, now, key=lambda arrival: arrival["predicted_arrival"]
+        )
+        return arrivals[start : start + max(limit, 0)]
+
+
+def _current_delay(tu) -> Optional[int]:
+    """Retard au prochain arrêt de la course (premier stop_time_update renseigné)."""
+    for stu in tu.stop_time_update:
+        for event in (stu.arrival, stu.departure):
+            if event.HasField("delay"):
+                return event.delay
+    if tu.HasField("delay"):
+        return tu.delay
+    return None
+
+
+def _trend(samples: deque) -> float:
+    """Pente (moindres carrés) du retard en fonction du temps, bornée."""
+    if len(samples) < 2 or samples[-1][0] - samples[0][0] < MIN_TREND_SPAN:
+        return 0.0
+    mean_t = sum(t for t, _ in samples) / len(samples)
+    mean_d = sum(d for _, d in samples) / len(samples)
+    variance = sum((t - mean_t) ** 2 for t, _ in samples)
+    slope = sum((t - mean_t) * (d - mean_d) for t, d in samples) / variance
+    return max(-MAX_TREND, min(MAX_TREND, slope))
+
+
+def _drift(trend: float, horizon: float) -> float:
+    """Dérive du retard d'ici un passage dans `horizon` secondes, bornée."""
+    drift = trend * min(max(0.0, horizon), MAX_DRIFT_HORIZON)
+    return max(-MAX_DRIFT, min(MAX_DRIFT, drift))
+
+
+def _dead_reckoning(last: Dict, elapsed: float) -> tuple:
+    """Position avancée de `elapsed` secondes selon le cap et la vitesse déclarés."""
+    latitude, longitude = last["latitude"], last["longitude"]
+    moved = bool(elapsed and last["speed"] and last["bearing"] is not None)
+    if moved:
+        travelled = last["speed"] * elapsed
+        heading = math.radians(last["bearing"])
+        latitude += travelled * math.cos(heading) / METERS_PER_DEGREE
+        longitude += (
+            travelled
+            * math.sin(heading)
+            / (METERS_PER_DEGREE * math.cos(math.radians(last["latitude"])))
+        )
+    return round(latitude, 6), round(longitude, 6), moved
+
+
+def _upcoming(arrivals: List[Dict], now: float) -> List[Dict]:
+    """Arrivées à venir ; celles sans heure (retard seul) sont conservées, le flux
+    ne listant que les arrêts restants."""
+    return [
+        arrival
+        for arrival in arrivals
+        if arrival["predicted_arrival"] is None or arrival["predicted_arrival"] >= now
+    ]
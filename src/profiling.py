@@ -0,0 +1,134 @@
+"""Profilage à la demande des invocations MCP (outils et ressources).
+
+Une fraction configurable des invocations est échantillonnée et les
+statistiques sont agrégées par cible (`tool:<nom>`, `resource:<gabarit>`).
+Désactivé, le coût se limite à une comparaison par invocation.
+
+Seuls les traitements que l'invocation confie au pool CPU (décodage, parsing,
+index) passent sous cProfile, dans le thread qui les exécute. Le code exécuté
+sur la boucle asyncio n'est pas profilé : pendant un `await`, la boucle fait
+aussi avancer les invocations des autres sessions, qui seraient comptées à tort.
+Un seul traitement est profilé à la fois ; ceux qui s'exécutent en parallèle
+(lecture de plusieurs réseaux) ne sont que partiellement couverts.
+"""
+
+import cProfile
+import functools
+import io
+import logging
+import pstats
+import random
+import re
+import threading
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Dict, Optional
+
+_DISABLED = nullcontext()
+# Cible de l'invocation échantillonnée en cours (None hors échantillon)
+_sampled: ContextVar[Optional[str]] = ContextVar("profiled_target", default=None)
+
+
+class Profiler:
+    """Échantillonne des invocations sous cProfile et agrège leurs statistiques."""
+
+    def __init__(self, rate: float = 0.0, dump_dir: Optional[str] = None):
+        self.rate = rate
+        self.dump_dir = dump_dir
+        self._stats: Dict[str, pstats.Stats] = {}
+        self._samples: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        # cProfile ne supporte qu'un profileur actif à la fois par interpréteur
+        self._running = threading.Lock()
+
+    def sample(self, target: str):
+        """Contexte marquant l'invocation comme échantillonnée si elle est tirée
+        au sort : les traitements confiés à `wrap` pendant le bloc sont profilés."""
+        if self.rate <= 0 or random.random() >= self.rate:
+            return _DISABLED
+        return self._sampling(target)
+
+    def wrap(self, func):
+        """`func`, profilée à son exécution si elle est préparée pendant une
+        invocation échantillonnée (à appeler sur la boucle, avant l'envoi au pool)."""
+        target = _sampled.get()
+        if target is None:
+            return func
+
+        @functools.wraps(func)
+        def profiled(*args, **kwargs):
+            with self._profiled(target):
+                return func(*args, **kwargs)
+
+        return profiled
+
+    @contextmanager
+    def _sampling(self, target: str):
+        with self._lock:
+            self._samples[target] = self._samples.get(target, 0) + 1
+        token = _sampled.set(target)
+        try:
+            yield
+        finally:
+            _sampled.reset(token)
+
+    @contextmanager
+    def _profiled(self, target: str):
+        if not self._running.acquire(blocking=False):
+            yield
+            return
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+            try:
+                yield
+            finally:
+                profiler.disable()
+        finally:
+            self._running.release()
+            self._record(target, profiler)
+
+    def _record(self, target: str, profiler: cProfile.Profile) -> None:
+        with self._lock:
+            if target in self._stats:
+                self._stats[target].add(profiler)
+            else:
+                self._stats[target] = pstats.Stats(profiler)
+
+    def summary(self) -> Dict[str, int]:
+        """Nombre d'invocations échantillonnées par cible."""
+        with self._lock:
+            return dict(self._samples)
+
+    def report(
+        self, target: Optional[str] = None, limit: int = 20, sort: str = "cumulative"
+    ) -> str:
+        """Rapport texte des fonctions les plus coûteuses, par cible."""
+        output = io.StringIO()
+        with self._lock:
+            for name, stats in sorted(self._stats.items()):
+                if target and name != target:
+                    continue
+                output.write(f"=== {name} ({self._samples.get(name, 0)} samples)\n")
+                stats.stream = output
+                stats.sort_stats(sort).print_stats(limit)
+        return output.getvalue() or "No profile collected yet.\n"
+
+    def dump(self, dump_dir: Optional[str] = None) -> list:
+        """Écrit un fichier .prof par cible (lisible par pstats ou snakeviz)."""
+        directory = Path(dump_dir or self.dump_dir or ".")
+        directory.mkdir(parents=True, exist_ok=True)
+        paths = []
+        with self._lock:
+            for name, stats in self._stats.items():
+                path = directory / (re.sub(r"[^\w.-]+", "_", name).strip("_") + ".prof")
+                stats.dump_stats(path)
+                paths.append(str(path))
+        logging.info(f"Dumped {len(paths)} profiles to {directory}")
+        return paths
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stats.clear()
+            self._samples.clear()
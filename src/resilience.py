@@ -0,0 +1,64 @@
+"""Disjoncteur par flux amont avec backoff exponentiel.
+
+Après `failure_threshold` échecs consécutifs, le disjoncteur s'ouvre : plus
+aucune requête n'est tentée avant l'expiration d'un délai qui double à chaque
+nouvel échec (plafonné à `max_delay`). Une seule requête d'essai est ensuite
+autorisée ; son succès referme le disjoncteur.
+"""
+
+import random
+import threading
+import time
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """État d'un flux amont : fermé (sain), ouvert (en pause) ou semi-ouvert (essai)."""
+
+    def __init__(
+        self,
+        failure_threshold: int = 3,
+        base_delay: float = 5.0,
+        max_delay: float = 300.0,
+    ):
+        self.failure_threshold = failure_threshold
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.state = CLOSED
+        self.failures = 0
+        self.open_until = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Indique si une requête amont peut être tentée maintenant."""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and time.monotonic() >= self.open_until:
+                self.state = HALF_OPEN
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = CLOSED
+            self.failures = 0
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                exponent = max(0, self.failures - self.failure_threshold)
+                delay = min(self.max_delay, self.base_delay * 2**exponent)
+                # Gigue pour désynchroniser les essais des différents flux
+                self.open_until = time.monotonic() + delay * random.uniform(0.8, 1.2)
+                self.state = OPEN
+
+    def retry_in(self) -> float:
+        """Secondes avant le prochain essai autorisé (0 si fermé)."""
+        if self.state != OPEN:
+            return 0.0
+        return max(0.0, self.open_until - time.monotonic())
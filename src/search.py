@@ -0,0 +1,253 @@
+"""Index plein texte des alertes de service et des événements Open Agenda.
+
+Les textes sont normalisés avant indexation : minuscules, accents retirés
+(« Déviée » et « deviee » se confondent), mots vides français écartés, puis
+racinisation légère (pluriels, féminins et suffixes courants : « travaux » et
+« travail », « déviation » et « dévié » partagent la même racine). La requête
+subit le même traitement, si bien que la recherche ne dépend ni des accents ni
+des flexions.
+
+Un index inversé est construit une fois par capture des flux, avec toutes les
+traductions des alertes, et classe les documents par BM25 pondéré par champ
+(un titre compte plus qu'une description).
+"""
+
+import bisect
+import functools
+import math
+import re
+import unicodedata
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Paramètres BM25
+K1 = 1.2
+B = 0.75
+# Poids des champs dans la fréquence d'un terme
+ALERT_FIELDS = {"header": 3.0, "description": 1.0}
+EVENT_FIELDS = {"title": 3.0, "location": 2.0, "description": 1.0}
+# Un terme inconnu de l'index est complété par préfixe (« recouv » -> « recouvrance »)
+MIN_PREFIX = 3
+MAX_EXPANSIONS = 20
+
+STOPWORDS = frozenset(
+    """
+    a au aux avec c ce ces cet cette d dans de des du elle en est et il ils j
+    l la le les leur leurs lui m ma mais me mes moi mon n ne nos notre nous on
+    ou par pas pour qu que qui s sa se ses son sont sur t ta te tes toi ton tu
+    un une vos votre vous y
+    the of and to in is for at by
+    """.split()
+)
+
+# Suffixes retirés par la racinisation, du plus long au plus court (sans accents)
+SUFFIXES = (
+    "issements",
+    "issement",
+    "atrices",
+    "ements",
+    "ations",
+    "ateurs",
+    "atrice",
+    "ement",
+    "ation",
+    "ateur",
+    "euses",
+    "iques",
+    "euse",
+    "ique",
+    "eux",
+    "ees",
+    "ee",
+    "es",
+    "er",
+    "ez",
+    "e",
+)
+# Longueur minimale d'une racine
+MIN_STEM = 3
+
+_LIGATURES = str.maketrans({"œ": "oe", "æ": "ae", "ß": "ss", "’": "'"})
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def fold(text: str) -> str:
+    """Minuscules sans accents ni ligatures."""
+    decomposed = unicodedata.normalize("NFKD", text.lower().translate(_LIGATURES))
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def stem(word: str) -> str:
+    """Racine d'un mot déjà normalisé par `fold`."""
+    if word.isdigit() or len(word) <= MIN_STEM:
+        return word
+    if word.endswith("s") and not word.endswith("ss"):
+        word = word[:-1]
+    # travail / travaux, journal / journaux
+    for ending in ("aux", "ail", "au", "al"):
+        if word.endswith(ending) and len(word) - len(ending) >= MIN_STEM:
+            return word[: -len(ending)] + "a"
+    # sportif / sportive
+    if word.endswith("if"):
+        return word[:-1] + "v"
+    for suffix in SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= MIN_STEM:
+            return word[: -len(suffix)]
+    return word
+
+
+def analyze(text: Optional[str]) -> Tuple[str, ...]:
+    """Termes indexés d'un texte : mots normalisés, hors mots vides, racinisés."""
+    if not text:
+        return ()
+    return _analyze(text)
+
+
+# Les textes d'alertes varient peu d'une capture à l'autre : chaque texte n'est
+# analysé qu'une fois pour les reconstructions successives de l'index
+@functools.lru_cache(maxsize=4096)
+def _analyze(text: str) -> Tuple[str, ...]:
+    return tuple(
+        stem(word) for word in _WORD.findall(fold(text)) if word not in STOPWORDS
+    )
+
+
+class SearchIndex:
+    """Index inversé d'un ensemble de documents, classés par BM25."""
+
+    def __init__(self, documents: Iterable[Tuple[Dict, Dict[str, List[str]]]], weights):
+        """`documents` : paires (résumé renvoyé tel quel, textes par champ)."""
+        self._documents: List[Dict] = []
+        self._lengths: List[float] = []
+        self._postings: Dict[str, Dict[int, float]] = {}
+        for summary, fields in documents:
+            doc = len(self._documents)
+            length = 0.0
+            for field, texts in fields.items():
+                weight = weights[field]
+                for text in texts:
+                    for term in analyze(text):
+                        postings = self._postings.setdefault(term, {})
+                        postings[doc] = postings.get(doc, 0.0) + weight
+                        length += weight
+            self._documents.append(summary)
+            self._lengths.append(length)
+        self._average = sum(self._lengths) / len(self._lengths) if self._lengths else 0
+        self._vocabulary = sorted(self._postings)
+        count = len(self._documents)
+        self._idf = {
+            term: math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for term, postings in self._postings.items()
+        }
+
+    def __len__(self) -> int:
+        return len(self._documents)
+
+    def search(self, query: str, limit: int = 10) -> List[Dict]:
+        """Documents contenant au moins un terme de la requête : d'abord ceux qui
+        en contiennent le plus, puis par score décroissant."""
+        terms = list(dict.fromkeys(analyze(query)))
+        scores: Dict[int, float] = {}
+        matched: Dict[int, List[str]] = {}
+        for term in terms:
+            for candidate in self._expand(term):
+                idf = self._idf[candidate]
+                for doc, frequency in self._postings[candidate].items():
+                    norm = K1 * (1 - B + B * self._lengths[doc] / self._average)
+                    scores[doc] = scores.get(doc, 0.0) + idf * frequency * (K1 + 1) / (
+                        frequency + norm
+                    )
+                    terms_found = matched.setdefault(doc, [])
+                    if not terms_found or terms_found[-1] != term:
+                        terms_found.append(term)
+        ranked = sorted(scores, key=lambda doc: (-len(matched[doc]), -scores[doc]))
+        return [
+            dict(
+                self._documents[doc], score=round(scores[doc], 3), matched=matched[doc]
+            )
+            for doc in ranked[: max(limit, 0)]
+        ]
+
+    def _expand(self, term: str) -> List[str]:
+        """Le terme lui-même s'il est indexé, sinon les termes qu'il préfixe."""
+        if term in self._postings:
+            return [term]
+        if len(term) < MIN_PREFIX:
+            return []
+        start = bisect.bisect_left(self._vocabulary, term)
+        expansions = []
+        for candidate in self._vocabulary[start : start + MAX_EXPANSIONS]:
+            if not candidate.startswith(term):
+                break
+            expansions.append(candidate)
+        return expansions
+
+
+def index_alerts(feed) -> SearchIndex:
+    """Index d'une capture service_alerts (en-têtes et descriptions, toutes
+    traductions)."""
+    documents = []
+    for entity in feed.entity:
+        if not entity.HasField("alert"):
+            continue
+        alert = entity.alert
+        headers = [t.text for t in alert.header_text.translation]
+        descriptions = [t.text for t in alert.description_text.translation]
+        summary = {
+            "type": "alert",
+            "id": entity.id,
+            "header": _preferred(alert.header_text.translation),
+            "description": _preferred(alert.description_text.translation),
+            "routes": sorted(
+                {ie.route_id for ie in alert.informed_entity if ie.route_id}
+            ),
+        }
+        documents.append((summary, {"header": headers, "description": descriptions}))
+    return SearchIndex(documents, ALERT_FIELDS)
+
+
+def index_events(data) -> SearchIndex:
+    """Index d'une réponse Open Agenda (titres, descriptions et lieux, toutes
+    langues)."""
+    events = data.get("events", []) if isinstance(data, dict) else data or []
+    documents = []
+    for event in events:
+        title = event.get("title") or {}
+        description = event.get("description") or {}
+        location = event.get("location") or {}
+        timings = event.get("timings") or [{}]
+        summary = {
+            "type": "event",
+            "id": event.get("uid"),
+            "title": _language(title),
+            "location": location.get("name"),
+            "start_time": timings[0].get("begin"),
+            "end_time": timings[0].get("end"),
+        }
+        fields = {
+            "title": _texts(title),
+            "description": _texts(description),
+            "location": [location.get("name"), location.get("address")],
+        }
+        documents.append((summary, fields))
+    return SearchIndex(documents, EVENT_FIELDS)
+
+
+def _preferred(translations) -> Optional[str]:
+    """Traduction française si elle existe, sinon la première."""
+    for translation in translations:
+        if translation.language.lower().startswith("fr"):
+            return translation.text
+    return translations[0].text if translations else None
+
+
+def _language(texts) -> Optional[str]:
+    """Texte Open Agenda en français si disponible (champs multilingues)."""
+    if isinstance(texts, dict):
+        return texts.get("fr") or next(iter(texts.values()), None)
+    return texts
+
+
+def _texts(texts) -> List[str]:
+    if isinstance(texts, dict):
+        return [text for text in texts.values() if isinstance(text, str)]
+    return [texts] if isinstance(texts, str) else []
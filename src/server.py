@@ -1,13 +1,46 @@
 import os
+import json
+import asyncio
+import hashlib
+import email.utils
+import subprocess
 from dotenv import load_dotenv
-import requests
+from google.protobuf.message import DecodeError
 from google.transit import gtfs_realtime_pb2
 from mcp.server import FastMCP
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import TYPE_CHECKING, Dict, List, Optional
 import time
 import sys
+import atexit
+import contextlib
 import logging
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
+from mcp.server.lowlevel.helper_types import ReadResourceContents
+from mcp.types import TextContent
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse, StreamingResponse
+
+try:
+    from .metrics import REGISTRY
+    from .profiling import Profiler
+    from .resilience import CircuitBreaker, OPEN
+    from . import export, headways, networks, polling, predictions, search, snapshots
+except ImportError:  # exécuté directement : python src/server.py
+    from metrics import REGISTRY
+    from profiling import Profiler
+    from resilience import CircuitBreaker, OPEN
+    import export
+    import headways
+    import networks
+    import polling
+    import predictions
+    import search
+    import snapshots
+
+if TYPE_CHECKING:
+    import aiohttp
 
 # Charger les variables d'environnement depuis le fichier .env
 load_dotenv()
@@ -20,6 +53,52 @@ REFRESH_INTERVAL = int(os.getenv("GTFS_REFRESH_INTERVAL", "30"))
 HOST = os.getenv("MCP_HOST", "localhost")
 PORT = int(os.getenv("MCP_PORT", "3001"))
 NETWORK = os.getenv("NETWORK", "bibus")
+# Registre des réseaux : fichier TOML ou JSON (réseaux bretons intégrés par
+# défaut), région des outils régionaux ("" = tous les réseaux), inactivité avant
+# libération d'un réseau, mémoire des réponses en cache (Mo, 0 = illimitée)
+NETWORKS_FILE = os.getenv("MCP_NETWORKS_FILE")
+REGION = os.getenv("MCP_REGION", "bretagne")
+NETWORK_IDLE_TTL = float(os.getenv("MCP_NETWORK_IDLE_TTL", "1800"))
+NETWORK_MEMORY_MB = float(os.getenv("MCP_NETWORK_MEMORY_MB", "0"))
+# Requêtes amont simultanées, tous réseaux confondus
+FETCH_CONCURRENCY = int(os.getenv("MCP_FETCH_CONCURRENCY", "8"))
+# Profilage : fraction des invocations profilées (0 = désactivé) et dossier des .prof
+PROFILE_RATE = float(os.getenv("MCP_PROFILE_RATE", "0"))
+PROFILE_DIR = os.getenv("MCP_PROFILE_DIR")
+# Outils d'administration (profilage) masqués aux agents par défaut
+ADMIN_TOOLS = os.getenv("MCP_ADMIN_TOOLS", "").lower() in ("1", "true", "yes")
+# Déploiement multi-processus : un fetcher publie les flux, les workers les lisent
+ROLE = os.getenv("MCP_ROLE", "standalone")  # standalone | fetcher | worker
+WORKERS = int(os.getenv("MCP_WORKERS", "1"))
+SNAPSHOT_DIR = os.getenv("MCP_SNAPSHOT_DIR") or snapshots.default_directory()
+# Démarrage à froid : dernières réponses amont conservées sur disque ("" désactive)
+WARM_CACHE_DIR = os.path.expanduser(
+    os.getenv(
+        "MCP_WARM_CACHE_DIR",
+        os.path.join(os.getenv("XDG_CACHE_HOME", "~/.cache"), "brest-mcp"),
+    )
+)
+WARM_CACHE_MAX_AGE = float(os.getenv("MCP_WARM_CACHE_MAX_AGE", "3600"))
+# Captures de tools/feed_recorder.py servies par /export?at=<epoch>
+HISTORY_DIR = os.getenv("MCP_HISTORY_DIR")
+STATIC_REFRESH_INTERVAL = 6 * 3600
+# Disjoncteur par flux amont : échecs consécutifs avant ouverture, pause maximale
+BREAKER_THRESHOLD = int(os.getenv("MCP_BREAKER_THRESHOLD", "3"))
+BREAKER_MAX_BACKOFF = float(os.getenv("MCP_BREAKER_MAX_BACKOFF", "300"))
+# Cadence adaptative : bornes de l'intervalle appris, veille des réseaux sans
+# véhicule et budget global de requêtes amont par minute (0 = illimité)
+ADAPTIVE_POLLING = os.getenv("MCP_ADAPTIVE_POLLING", "1").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+POLL_MIN_INTERVAL = float(os.getenv("MCP_POLL_MIN_INTERVAL", "5"))
+POLL_MAX_INTERVAL = float(os.getenv("MCP_POLL_MAX_INTERVAL", "900"))
+NIGHT_INTERVAL = float(os.getenv("MCP_NIGHT_INTERVAL", "300"))
+POLL_BUDGET = float(os.getenv("MCP_POLL_BUDGET", "0"))
+# Threads dédiés au décodage et à la transformation des flux, hors boucle asyncio
+CPU_WORKERS = int(os.getenv("MCP_CPU_WORKERS", "4"))
+FETCH_TIMEOUT = 10
 
 # Configuration du logging
 logging.basicConfig(
@@ -28,8 +107,164 @@ logging.basicConfig(
     handlers=[logging.StreamHandler(sys.stderr)],
 )
 
+# Métriques exposées sur /metrics (transport SSE)
+FETCH_LATENCY = REGISTRY.histogram(
+    "brest_upstream_fetch_seconds",
+    "Durée des requêtes HTTP vers les flux amont.",
+    ("network", "feed"),
+)
+FETCH_BYTES = REGISTRY.counter(
+    "brest_upstream_fetch_bytes_total",
+    "Octets reçus des flux amont.",
+    ("network", "feed"),
+)
+FETCH_ERRORS = REGISTRY.counter(
+    "brest_upstream_fetch_errors_total",
+    "Échecs de récupération des flux amont.",
+    ("network", "feed"),
+)
+PARSE_LATENCY = REGISTRY.histogram(
+    "brest_feed_parse_seconds",
+    "Durée du décodage protobuf des flux GTFS-RT.",
+    ("network", "feed"),
+)
+FEED_ENTITIES = REGISTRY.gauge(
+    "brest_feed_entities",
+    "Nombre d'entités du dernier flux GTFS-RT décodé.",
+    ("network", "feed"),
+)
+CACHE_REQUESTS = REGISTRY.counter(
+    "brest_cache_requests_total",
+    "Accès au cache des flux par résultat (hit, stale, miss, revalidated).",
+    ("feed", "result"),
+)
+FEED_UNCHANGED = REGISTRY.counter(
+    "brest_feed_unchanged_total",
+    "Réponses amont identiques à la précédente, ni décodées ni republiées "
+    "(match : content ou header).",
+    ("network", "feed", "match"),
+)
+POLL_INTERVAL = REGISTRY.gauge(
+    "brest_poll_interval_seconds",
+    "Délai avant la prochaine requête amont, selon la cadence apprise du flux.",
+    ("network", "feed"),
+)
+POLL_DEFERRED = REGISTRY.counter(
+    "brest_poll_deferred_total",
+    "Rafraîchissements différés faute de budget de requêtes amont.",
+    ("network", "feed"),
+)
+NETWORK_MEMORY = REGISTRY.gauge(
+    "brest_network_cache_bytes",
+    "Octets des réponses amont conservées en cache, par réseau.",
+    ("network",),
+)
+NETWORKS_ACTIVE = REGISTRY.gauge(
+    "brest_networks_active",
+    "Réseaux interrogés récemment (état en mémoire), sur l'ensemble configuré.",
+)
+CACHE_AGE = REGISTRY.gauge(
+    "brest_cache_age_seconds",
+    "Âge des données en cache au moment de la collecte.",
+    ("feed",),
+)
+CIRCUIT_OPEN = REGISTRY.gauge(
+    "brest_upstream_circuit_open",
+    "Disjoncteur ouvert (1) ou fermé (0) pour chaque flux amont.",
+    ("network", "feed"),
+)
+TOOL_LATENCY = REGISTRY.histogram(
+    "brest_tool_call_seconds",
+    "Durée des appels d'outils MCP.",
+    ("tool",),
+)
+TOOL_ERRORS = REGISTRY.counter(
+    "brest_tool_errors_total",
+    "Appels d'outils MCP terminés en erreur.",
+    ("tool",),
+)
+RESOURCE_LATENCY = REGISTRY.histogram(
+    "brest_resource_read_seconds",
+    "Durée des lectures de ressources MCP.",
+    ("resource",),
+)
+
+PROFILER = Profiler(rate=PROFILE_RATE, dump_dir=PROFILE_DIR)
+if PROFILE_DIR:
+    atexit.register(PROFILER.dump)
+
+
+# Fraîcheur des flux lus pendant l'invocation MCP en cours (None hors invocation)
+_feed_reads: ContextVar[Optional[Dict]] = ContextVar("feed_reads", default=None)
+
+
+class BrestFastMCP(FastMCP):
+    """FastMCP instrumenté : chaque appel d'outil et lecture de ressource est mesuré
+    et, si le profilage est actif, échantillonné (traitements du pool CPU sous
+    cProfile). La fraîcheur des flux consultés est ajoutée en dernier bloc de
+    chaque réponse."""
+
+    async def call_tool(self, name, arguments):
+        reads = _feed_reads.set({})
+        try:
+            with TOOL_LATENCY.time(tool=name), PROFILER.sample(f"tool:{name}"):
+                try:
+                    content = list(await super().call_tool(name, arguments))
+                except Exception:
+                    TOOL_ERRORS.inc(tool=name)
+                    raise
+            freshness = _feed_reads.get()
+        finally:
+            _feed_reads.reset(reads)
+        if freshness:
+            content.append(
+                TextContent(type="text", text=json.dumps({"freshness": freshness}))
+            )
+        return content
+
+    async def read_resource(self, uri):
+        label = self._resource_label(str(uri))
+        reads = _feed_reads.set({})
+        try:
+            with (
+                RESOURCE_LATENCY.time(resource=label),
+                PROFILER.sample(f"resource:{label}"),
+            ):
+                contents = list(await super().read_resource(uri))
+            freshness = _feed_reads.get()
+        finally:
+            _feed_reads.reset(reads)
+        if freshness:
+            contents.append(
+                ReadResourceContents(
+                    content=json.dumps({"freshness": freshness}),
+                    mime_type="application/json",
+                )
+            )
+        return contents
+
+    def sse_app(self, mount_path: Optional[str] = None):
+        return _closing_http_session(super().sse_app(mount_path))
+
+    def streamable_http_app(self):
+        return _closing_http_session(super().streamable_http_app())
+
+    async def run_stdio_async(self) -> None:
+        try:
+            await super().run_stdio_async()
+        finally:
+            await _close_http_session()
+
+    def _resource_label(self, uri: str) -> str:
+        """Ramène une URI à son gabarit pour borner la cardinalité des labels."""
+        for template in self._resource_manager.list_templates():
+            if template.matches(uri):
+                return template.uri_template
+        return uri if self._resource_manager._resources.get(uri) else "unknown"
+
+
 # Initialiser le serveur MCP avec le nom et les paramètres réseau spécifiés
-mcp = FastMCP(
+mcp = BrestFastMCP(
     "Brest-MCP-Server",
     host=HOST,
     port=PORT,
@@ -37,6 +272,49 @@ mcp = FastMCP(
     message_path="/messages/",
 )
 
+# Flux non GTFS-RT : JSON décodé, ou contenu brut pour le GTFS statique
+JSON_FEEDS = {"open_agenda", "weather_infoclimat"}
+STATIC_FEEDS = {"gtfs_static"}
+
+SNAPSHOTS = snapshots.SnapshotStore(SNAPSHOT_DIR)
+WARM_STORE = (
+    snapshots.SnapshotStore(WARM_CACHE_DIR)
+    if WARM_CACHE_DIR and ROLE == "standalone"
+    else None
+)
+_warm_checked: set = set()
+# Flux des réseaux autres que NETWORK, par (réseau, flux)
+_network_cache: Dict[tuple, Dict] = {}
+# Disjoncteurs et rafraîchissements en cours, par (réseau, flux)
+_breakers: Dict[tuple, CircuitBreaker] = {}
+_refresh_tasks: Dict[tuple, asyncio.Task] = {}
+# Cadence de chaque flux ; sans adaptation, intervalle fixe REFRESH_INTERVAL
+POLLER = (
+    polling.PollScheduler(
+        REFRESH_INTERVAL,
+        POLL_MIN_INTERVAL,
+        POLL_MAX_INTERVAL,
+        NIGHT_INTERVAL,
+        POLL_BUDGET,
+    )
+    if ADAPTIVE_POLLING
+    else polling.PollScheduler(
+        REFRESH_INTERVAL, REFRESH_INTERVAL, REFRESH_INTERVAL, 0, POLL_BUDGET
+    )
+)
+_cpu_pool = ThreadPoolExecutor(max_workers=CPU_WORKERS, thread_name_prefix="feed-cpu")
+# Session HTTP partagée, liée à la boucle asyncio qui l'a créée
+_http: Optional[tuple] = None
+# Fermetures des sessions de boucles précédentes
+_closing_sessions: set = set()
+# Sémaphore des requêtes amont simultanées, lié à sa boucle asyncio
+_fetch_semaphore: Optional[tuple] = None
+# Libération des réseaux inactifs : dernier passage et dernier signalement au
+# fetcher (mode worker), au plus une fois par minute
+SWEEP_INTERVAL = 60
+_last_sweep = 0.0
+_reported: Dict[str, float] = {}
+
 # Cache en mémoire pour les données GTFS-RT avec timestamps
 _cache = {
     "vehicle_positions": {"timestamp": 0, "data": None, "last_update": None},
@@ -47,9 +325,11 @@ _cache = {
     "gtfs_static": {"timestamp": 0, "data": None, "last_update": None},
 }
 
-# Configuration des URLs GTFS-RT pour différents réseaux bretons
-NETWORK_URLS = {
+# Réseaux bretons intégrés, utilisés sans MCP_NETWORKS_FILE
+_DEFAULT_NETWORKS = {
     "bibus": {
+        "name": "Bibus (Brest)",
+        "region": "bretagne",
         "vehicle_positions": os.getenv(
             "GTFS_VEHICLE_POSITIONS_URL",
             "https://proxy.transport.data.gouv.fr/resource/bibus-brest-gtfs-rt-vehicle-position",
@@ -76,77 +356,612 @@ NETWORK_URLS = {
         ),
     },
     "star": {
+        "name": "STAR (Rennes)",
+        "region": "bretagne",
         "vehicle_positions": "https://proxy.transport.data.gouv.fr/resource/star-rennes-gtfs-rt-vehicle-position",
         "trip_updates": "https://proxy.transport.data.gouv.fr/resource/star-rennes-gtfs-rt-trip-update",
         "service_alerts": "https://proxy.transport.data.gouv.fr/resource/star-rennes-gtfs-rt-alerts",
     },
     "tub": {
+        "name": "TUB (Saint-Brieuc)",
+        "region": "bretagne",
         "vehicle_positions": "https://proxy.transport.data.gouv.fr/resource/tub-saint-brieuc-gtfs-rt-vehicle-position",
         "trip_updates": "https://proxy.transport.data.gouv.fr/resource/tub-saint-brieuc-gtfs-rt-trip-update",
         "service_alerts": "https://proxy.transport.data.gouv.fr/resource/tub-saint-brieuc-gtfs-rt-alerts",
     },
 }
 
+NETWORKS = (
+    networks.load(NETWORKS_FILE, NETWORK_IDLE_TTL)
+    if NETWORKS_FILE
+    else networks.NetworkRegistry(_DEFAULT_NETWORKS, NETWORK_IDLE_TTL)
+)
+if NETWORK not in NETWORKS:
+    raise ValueError(f"Default network {NETWORK!r} is not in the network registry")
+# Le réseau par défaut n'est jamais libéré
+NETWORKS.pinned.add(NETWORK)
+NETWORK_URLS = NETWORKS.urls
+
+# Rejeu local (tools/feed_replay.py) : tous les flux pointent vers le serveur de rejeu
+FEED_REPLAY_URL = os.getenv("FEED_REPLAY_URL")
+if FEED_REPLAY_URL:
+    NETWORK_URLS = NETWORKS.urls = {
+        network: {
+            feed_type: f"{FEED_REPLAY_URL.rstrip('/')}/{network}/{feed_type}"
+            for feed_type in urls
+        }
+        for network, urls in NETWORK_URLS.items()
+    }
+
 # Mise à jour des variables d'environnement avec le réseau par défaut
 VEHICLE_POSITIONS_URL = os.getenv(
-    "GTFS_VEHICLE_POSITIONS_URL", NETWORK_URLS[NETWORK]["vehicle_positions"]
+    "GTFS_VEHICLE_POSITIONS_URL", NETWORK_URLS[NETWORK].get("vehicle_positions")
 )
 TRIP_UPDATES_URL = os.getenv(
-    "GTFS_TRIP_UPDATES_URL", NETWORK_URLS[NETWORK]["trip_updates"]
+    "GTFS_TRIP_UPDATES_URL", NETWORK_URLS[NETWORK].get("trip_updates")
 )
 SERVICE_ALERTS_URL = os.getenv(
-    "GTFS_SERVICE_ALERTS_URL", NETWORK_URLS[NETWORK]["service_alerts"]
+    "GTFS_SERVICE_ALERTS_URL", NETWORK_URLS[NETWORK].get("service_alerts")
 )
 
 
-def _fetch_feed(
-    feed_type: str, is_json: bool = False, is_static: bool = False
-) -> Optional[any]:
-    """Récupère un flux et le met en cache."""
+def _decode_feed(
+    network: str,
+    feed_type: str,
+    content,
+    is_json: bool = False,
+    is_static: bool = False,
+):
+    """Décode le contenu brut d'un flux selon son type."""
+    if is_static:
+        logging.info(f"OK {feed_type} - GTFS static file downloaded (not parsed)")
+        return content  # Fichier ZIP brut
+    if is_json:
+        data = json.loads(bytes(content))
+        logging.info(
+            f"OK {feed_type} - JSON data fetched ({len(data) if isinstance(data, list) else 'dict'})"
+        )
+        return data
+    feed = gtfs_realtime_pb2.FeedMessage()
+    with PARSE_LATENCY.time(network=network, feed=feed_type):
+        feed.ParseFromString(content)
+    FEED_ENTITIES.set(len(feed.entity), network=network, feed=feed_type)
+    logging.info(f"OK {network} {feed_type} - {len(feed.entity)} entities")
+    return feed
+
+
+async def _run_cpu(func, *args):
+    """Exécute un traitement CPU (décodage, transformation) hors de la boucle asyncio."""
+    return await asyncio.get_running_loop().run_in_executor(
+        _cpu_pool, PROFILER.wrap(func), *args
+    )
+
+
+def _http_session() -> "aiohttp.ClientSession":
+    """Session aiohttp partagée (pool de connexions) de la boucle en cours."""
+    import aiohttp  # import différé : hors du chemin de démarrage (~200 ms)
+
+    global _http
+    loop = asyncio.get_running_loop()
+    if _http is None or _http[0] is not loop or _http[1].closed:
+        if _http is not None:
+            _discard_http_session(*_http)
+        # Mêmes délais que requests (connexion, lecture) : pas de limite totale
+        # pour le téléchargement du GTFS statique
+        timeout = aiohttp.ClientTimeout(
+            sock_connect=FETCH_TIMEOUT, sock_read=FETCH_TIMEOUT
+        )
+        _http = (loop, aiohttp.ClientSession(timeout=timeout))
+    return _http[1]
+
+
+def _discard_http_session(loop, session) -> None:
+    """Ferme la session d'une boucle précédente, terminée sans l'avoir fermée."""
+    if session.closed:
+        return
+    if loop.is_running():
+        asyncio.run_coroutine_threadsafe(session.close(), loop)
+        return
+    # Boucle arrêtée ou fermée : aiohttp ferme alors ses connexions sans l'attendre
+    closing = asyncio.ensure_future(session.close())
+    _closing_sessions.add(closing)
+    closing.add_done_callback(_closing_sessions.discard)
+
+
+async def _close_http_session() -> None:
+    """Ferme la session aiohttp de la boucle en cours (arrêt du serveur)."""
+    global _http
+    if _http is not None and _http[0] is asyncio.get_running_loop():
+        session, _http = _http[1], None
+        await session.close()
+
+
+def _closing_http_session(app):
+    """Application Starlette qui ferme la session aiohttp à son arrêt (lifespan)."""
+    lifespan = app.router.lifespan_context
+
+    @contextlib.asynccontextmanager
+    async def closing(app):
+        async with lifespan(app) as state:
+            try:
+                yield state
+            finally:
+                await _close_http_session()
+
+    app.router.lifespan_context = closing
+    return app
+
+
+def _fetch_slots() -> asyncio.Semaphore:
+    """Borne les requêtes amont simultanées de la boucle en cours : avec des
+    dizaines de réseaux, un rafraîchissement groupé n'ouvre pas des centaines de
+    connexions à la fois."""
+    global _fetch_semaphore
+    loop = asyncio.get_running_loop()
+    if _fetch_semaphore is None or _fetch_semaphore[0] is not loop:
+        _fetch_semaphore = (loop, asyncio.Semaphore(FETCH_CONCURRENCY))
+    return _fetch_semaphore[1]
+
+
+def _note_activity(network: str) -> None:
+    """Marque le réseau actif et libère, au plus une fois par minute, l'état des
+    réseaux restés sans requête pendant NETWORK_IDLE_TTL secondes."""
+    global _last_sweep
+    if network not in NETWORKS:
+        return
     now = time.time()
-    cache = _cache[feed_type]
+    NETWORKS.touch(network, now)
+    if ROLE == "worker" and now - _reported.get(network, 0.0) >= SWEEP_INTERVAL:
+        # Le fetcher n'interroge que les réseaux signalés par les workers
+        _reported[network] = now
+        try:
+            SNAPSHOTS.mark_active(network)
+        except OSError as e:
+            logging.warning(f"Unable to report activity on {network}: {e}")
+    if now - _last_sweep >= SWEEP_INTERVAL:
+        _last_sweep = now
+        for idle in NETWORKS.idle(now):
+            _release_network(idle)
+
+
+def _release_network(network: str) -> None:
+    """Libère l'état d'un réseau : caches et index dérivés, moteurs d'intervalles
+    et de prévision, disjoncteurs et cadence apprise. Sa prochaine requête le
+    réactive comme au premier appel."""
+    for state in (_network_cache, _breakers, _published):
+        for key in [key for key in state if key[0] == network]:
+            if key not in _refresh_tasks:
+                del state[key]
+    _headway_engines.pop(network, None)
+    _predictors.pop(network, None)
+    _warm_checked.difference_update([key for key in _warm_checked if key[0] == network])
+    _reported.pop(network, None)
+    POLLER.forget(network)
+    SNAPSHOTS.forget(network)
+    NETWORKS.release(network)
+    NETWORK_MEMORY.set(0, network=network)
+    logging.info(f"Released idle network {network}")
+
+
+def _account(network: str, feed_type: str, size: int) -> None:
+    """Note la taille de la réponse en cache et, au-delà de NETWORK_MEMORY_MB,
+    libère les réseaux les moins récemment utilisés."""
+    NETWORKS.account(network, feed_type, size)
+    NETWORK_MEMORY.set(NETWORKS.memory(network), network=network)
+    budget = int(NETWORK_MEMORY_MB * 2**20)
+    for victim in NETWORKS.over_budget(budget, keep=network):
+        logging.warning(
+            f"Network cache over {NETWORK_MEMORY_MB:g} MB, releasing {victim}"
+        )
+        _release_network(victim)
+
 
-    if now - cache["timestamp"] < REFRESH_INTERVAL and cache["data"]:
-        logging.debug(f"Returning cached data for {feed_type}")
+async def _read_snapshot(network: str, feed_type: str, cache: Dict) -> Optional[any]:
+    """Mode worker : lit le flux publié par le fetcher, décodé une fois par version."""
+    snapshot = SNAPSHOTS.read(network, feed_type)
+    if snapshot is None:
+        CACHE_REQUESTS.inc(feed=feed_type, result="miss")
         return cache["data"]
+    if snapshot.version == cache.get("version"):
+        # Republié inchangé par le fetcher : seule la fraîcheur avance
+        cache["timestamp"] = snapshot.fetched_at
+        CACHE_REQUESTS.inc(feed=feed_type, result="hit")
+        return cache["data"]
+    data = await _run_cpu(
+        _decode_feed,
+        network,
+        feed_type,
+        snapshot.payload,
+        snapshot.kind == snapshots.KIND_JSON,
+        snapshot.kind == snapshots.KIND_RAW,
+    )
+    cache.update(
+        {
+            "data": data,
+            "timestamp": snapshot.fetched_at,
+            "last_update": datetime.fromtimestamp(snapshot.fetched_at).isoformat(),
+            "version": snapshot.version,
+        }
+    )
+    _account(network, feed_type, len(snapshot.payload))
+    CACHE_REQUESTS.inc(feed=feed_type, result="miss")
+    return data
 
+
+def _snapshot_kind(feed_type: str) -> int:
+    if feed_type in STATIC_FEEDS:
+        return snapshots.KIND_RAW
+    return snapshots.KIND_JSON if feed_type in JSON_FEEDS else snapshots.KIND_PROTOBUF
+
+
+async def _load_warm_snapshot(network: str, feed_type: str, cache: Dict) -> None:
+    """Reprend la dernière réponse conservée sur disque, si elle n'est pas trop
+    ancienne : le premier appel d'un serveur neuf n'attend pas l'amont."""
+    _warm_checked.add((network, feed_type))
     try:
-        url = NETWORK_URLS[NETWORK][feed_type]
-        logging.info(f"Fetching {feed_type} from {url}")
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()
-
-        if is_static:
-            data = response.content  # Fichier ZIP brut
-            logging.info(f"OK {feed_type} - GTFS static file downloaded (not parsed)")
-        elif is_json:
-            data = response.json()
+        snapshot = WARM_STORE.read(network, feed_type)
+        if snapshot is None or time.time() - snapshot.fetched_at > WARM_CACHE_MAX_AGE:
+            return
+        data = await _run_cpu(
+            _decode_feed,
+            network,
+            feed_type,
+            snapshot.payload,
+            snapshot.kind == snapshots.KIND_JSON,
+            snapshot.kind == snapshots.KIND_RAW,
+        )
+    except Exception as e:
+        logging.warning(f"Ignoring warm snapshot {network} {feed_type}: {str(e)}")
+        return
+    if cache["data"] is None:
+        cache.update(
+            {
+                "data": data,
+                "timestamp": snapshot.fetched_at,
+                "last_update": datetime.fromtimestamp(snapshot.fetched_at).isoformat(),
+                "version": cache.get("version", 0) + 1,
+                "signature": _feed_signature(
+                    snapshot.payload, snapshot.kind != snapshots.KIND_PROTOBUF
+                ),
+            }
+        )
+        _account(network, feed_type, len(snapshot.payload))
+        logging.info(f"Loaded warm snapshot {network} {feed_type} v{snapshot.version}")
+
+
+def _save_warm_snapshot(network: str, feed_type: str, content: bytes) -> None:
+    try:
+        WARM_STORE.publish(network, feed_type, content, _snapshot_kind(feed_type))
+    except OSError as e:
+        logging.warning(f"Unable to save warm snapshot {network} {feed_type}: {e}")
+
+
+def _cache_entry(network: str, feed_type: str) -> Dict:
+    """Entrée de cache d'un flux : `_cache` pour le réseau par défaut."""
+    if network == NETWORK and feed_type in _cache:
+        return _cache[feed_type]
+    return _network_cache.setdefault(
+        (network, feed_type), {"timestamp": 0, "data": None, "last_update": None}
+    )
+
+
+def _breaker(network: str, feed_type: str) -> CircuitBreaker:
+    key = (network, feed_type)
+    if key not in _breakers:
+        _breakers[key] = CircuitBreaker(
+            failure_threshold=BREAKER_THRESHOLD, max_delay=BREAKER_MAX_BACKOFF
+        )
+    return _breakers[key]
+
+
+async def _refresh_feed(
+    network: str, feed_type: str, is_json: bool = False, is_static: bool = False
+) -> Optional[any]:
+    """Interroge le flux amont et met à jour son cache ; None en cas d'échec."""
+    cache = _cache_entry(network, feed_type)
+    breaker = _breaker(network, feed_type)
+    try:
+        url = NETWORK_URLS[network][feed_type]
+        logging.info(f"Fetching {network} {feed_type} from {url}")
+        async with _fetch_slots():
+            with FETCH_LATENCY.time(network=network, feed=feed_type):
+                async with _http_session().get(url) as response:
+                    response.raise_for_status()
+                    content = await response.read()
+        FETCH_BYTES.inc(len(content), network=network, feed=feed_type)
+
+        if response.status == 304:
+            if cache["data"] is None:
+                raise ValueError("304 Not Modified without cached copy")
+            logging.info(f"Not modified {network} {feed_type}, keeping cached data")
+            CACHE_REQUESTS.inc(feed=feed_type, result="revalidated")
+            cache["timestamp"] = time.time()
+            breaker.record_success()
+            _observe_poll(network, feed_type, response, content, None)
+            return cache["data"]
+
+        signature = _feed_signature(content, is_json or is_static)
+        match = _unchanged(cache, signature)
+        if match:
+            # Même capture : décodage, index dérivés et invalidations évités
             logging.info(
-                f"OK {feed_type} - JSON data fetched ({len(data) if isinstance(data, list) else 'dict'})"
+                f"Unchanged {network} {feed_type} ({match}), keeping cached data"
             )
-        else:
-            feed = gtfs_realtime_pb2.FeedMessage()
-            feed.ParseFromString(response.content)
-            data = feed
-            logging.info(f"OK {feed_type} - {len(feed.entity)} entities")
-
-        cache["data"] = data
-        cache["timestamp"] = now
-        cache["last_update"] = datetime.now().isoformat()
+            FEED_UNCHANGED.inc(network=network, feed=feed_type, match=match)
+            cache["timestamp"] = time.time()
+            cache["unchanged"] = cache.get("unchanged", 0) + 1
+            breaker.record_success()
+            _observe_poll(network, feed_type, response, content, None)
+            return cache["data"]
+
+        data = await _run_cpu(
+            _decode_feed, network, feed_type, content, is_json, is_static
+        )
+        cache.update(
+            {
+                "data": data,
+                "timestamp": time.time(),
+                "last_update": datetime.now().isoformat(),
+                "version": cache.get("version", 0) + 1,
+                "signature": signature,
+            }
+        )
+        breaker.record_success()
+        _observe_poll(network, feed_type, response, content, signature)
+        _account(network, feed_type, len(content))
+        if WARM_STORE:
+            _cpu_pool.submit(_save_warm_snapshot, network, feed_type, content)
         return data
     except Exception as e:
-        logging.error(f"Error fetching {feed_type}: {str(e)}")
-        return cache["data"] if cache["data"] else None
+        logging.error(f"Error fetching {network} {feed_type}: {str(e) or repr(e)}")
+        FETCH_ERRORS.inc(network=network, feed=feed_type)
+        breaker.record_failure()
+        if breaker.state == OPEN:
+            logging.warning(
+                f"Circuit open for {network} {feed_type}, "
+                f"next attempt in {breaker.retry_in():.0f}s"
+            )
+        return None
+
+
+def _feed_signature(content: bytes, raw: bool) -> tuple:
+    """Empreinte du contenu et FeedHeader.timestamp (GTFS-RT seulement)."""
+    digest = hashlib.blake2b(content, digest_size=16).digest()
+    return digest, None if raw else _header_timestamp(content)
+
+
+def _header_span(content: bytes) -> Optional[tuple]:
+    """Position (début, fin) du FeedHeader sérialisé, None s'il n'est pas en tête."""
+    # Le header (champ 1) est sérialisé en premier : tag 0x0A puis longueur varint
+    if len(content) < 2 or content[0] != 0x0A:
+        return None
+    length, shift, position = 0, 0, 1
+    while position < len(content):
+        byte = content[position]
+        position += 1
+        length |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            break
+        shift += 7
+    return position, position + length
+
+
+def _header_timestamp(content: bytes) -> Optional[int]:
+    """FeedHeader.timestamp, lu sans décoder les entités du flux."""
+    span = _header_span(content)
+    if span is None:
+        return None
+    try:
+        header = gtfs_realtime_pb2.FeedHeader.FromString(
+            bytes(content[span[0] : span[1]])
+        )
+    except DecodeError:
+        return None
+    return header.timestamp or None
+
+
+def _has_entities(content: bytes) -> bool:
+    """Indique si un flux GTFS-RT contient au moins une entité (après le header)."""
+    span = _header_span(content)
+    return span is None or span[1] < len(content)
+
+
+def _observe_poll(
+    network: str, feed_type: str, response, content: bytes, signature
+) -> float:
+    """Intègre une réponse amont à la cadence apprise du flux et retourne le délai
+    avant la requête suivante. `signature` vaut None si la capture est inchangée."""
+    if feed_type in STATIC_FEEDS:
+        return STATIC_REFRESH_INTERVAL
+    changed = signature is not None
+    source = None
+    if changed:
+        # Horodatage de la capture amont : FeedHeader.timestamp, sinon Last-Modified
+        source = signature[1] or _last_modified(response.headers.get("Last-Modified"))
+        if feed_type == "vehicle_positions":
+            POLLER.set_idle(network, not _has_entities(content))
+    interval = POLLER.observe(
+        network, feed_type, changed, source, night=feed_type not in JSON_FEEDS
+    )
+    POLL_INTERVAL.set(interval, network=network, feed=feed_type)
+    return interval
+
+
+def _last_modified(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return email.utils.parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+def _unchanged(cache: Dict, signature: tuple) -> Optional[str]:
+    """`content` ou `header` si la réponse reprend la capture en cache, None sinon.
+
+    Un même FeedHeader.timestamp désigne la même capture du producteur, même si
+    le proxy l'a resérialisée autrement."""
+    previous = cache.get("signature")
+    if cache["data"] is None or previous is None:
+        return None
+    if signature[0] == previous[0]:
+        return "content"
+    if signature[1] is not None and signature[1] == previous[1]:
+        return "header"
+    return None
+
+
+def _start_refresh(
+    network: str, feed_type: str, is_json: bool, is_static: bool
+) -> asyncio.Task:
+    """Rafraîchissement du flux, partagé par tous les appels concurrents."""
+    key = (network, feed_type)
+    task = _refresh_tasks.get(key)
+    if task is None:
+        task = asyncio.create_task(
+            _refresh_feed(network, feed_type, is_json, is_static)
+        )
+        _refresh_tasks[key] = task
+        task.add_done_callback(lambda _: _refresh_tasks.pop(key, None))
+    return task
+
+
+def _max_age(network: str, feed_type: str) -> float:
+    """Durée de validité en cache : le GTFS statique change rarement et pèse lourd,
+    les autres flux suivent la cadence apprise de leur source."""
+    if feed_type in STATIC_FEEDS:
+        return STATIC_REFRESH_INTERVAL
+    return POLLER.interval(network, feed_type)
+
+
+def _record_read(network: str, feed_type: str, cache: Dict) -> None:
+    """Note la fraîcheur du flux lu pour la réponse MCP en cours."""
+    reads = _feed_reads.get()
+    if reads is None:
+        return
+    age = time.time() - cache["timestamp"] if cache["data"] is not None else None
+    reads[f"{network}/{feed_type}"] = {
+        # Change à chaque nouvelle donnée : clé de mémoïsation côté client
+        "version": cache.get("version"),
+        "lastUpdate": cache["last_update"],
+        "ageSeconds": round(age, 1) if age is not None else None,
+        "stale": age is None or age >= _max_age(network, feed_type),
+        "upstream": "snapshot"
+        if ROLE == "worker"
+        else _breaker(network, feed_type).state,
+    }
+
+
+async def _get_cached_feed(
+    network: str, feed_type: str, is_json: bool = False, is_static: bool = False
+) -> Optional[any]:
+    """Stale-while-revalidate : les données en cache sont servies immédiatement et
+    rafraîchies en arrière-plan lorsqu'elles ont expiré. Seul un cache vide attend
+    l'amont, et jamais lorsque le disjoncteur du flux est ouvert."""
+    _note_activity(network)
+    cache = _cache_entry(network, feed_type)
+    key = (network, feed_type)
+
+    if WARM_STORE and cache["data"] is None and key not in _warm_checked:
+        await _load_warm_snapshot(network, feed_type, cache)
+
+    if ROLE == "worker":
+        data = await _read_snapshot(network, feed_type, cache)
+    elif cache["data"] is not None:
+        data = cache["data"]
+        if time.time() - cache["timestamp"] < _max_age(network, feed_type):
+            logging.debug(f"Returning cached data for {network} {feed_type}")
+            CACHE_REQUESTS.inc(feed=feed_type, result="hit")
+        else:
+            CACHE_REQUESTS.inc(feed=feed_type, result="stale")
+            breaker = _breaker(network, feed_type)
+            if key not in _refresh_tasks and not breaker.retry_in():
+                if not POLLER.acquire():
+                    # Budget épuisé : la copie en cache reste servie
+                    POLL_DEFERRED.inc(network=network, feed=feed_type)
+                elif breaker.allow():
+                    _start_refresh(network, feed_type, is_json, is_static)
+    else:
+        CACHE_REQUESTS.inc(feed=feed_type, result="miss")
+        if key in _refresh_tasks or (
+            _breaker(network, feed_type).allow() and POLLER.acquire(force=True)
+        ):
+            # shield : l'annulation d'un appel n'interrompt pas le fetch partagé
+            task = _start_refresh(network, feed_type, is_json, is_static)
+            data = await asyncio.shield(task)
+        else:
+            data = None
+
+    _record_read(network, feed_type, cache)
+    return data
+
+
+async def _fetch_feed(
+    feed_type: str, is_json: bool = False, is_static: bool = False
+) -> Optional[any]:
+    """Récupère un flux du réseau par défaut via le cache."""
+    return await _get_cached_feed(NETWORK, feed_type, is_json, is_static)
+
+
+async def _parsed(feed_type: str, parser, network: str = NETWORK):
+    """Résultat de `parser` (liste ou index) sur le flux en cache, calculé une fois
+    par version du flux dans le pool CPU et partagé par les appels suivants."""
+    feed = await _get_cached_feed(network, feed_type)
+    if not feed:
+        return []
+    return await _derive(network, feed_type, feed, parser)
+
+
+async def _derive(network: str, feed_type: str, feed, parser):
+    """Mémoïsation de `_parsed` pour un flux déjà lu."""
+    cache = _cache_entry(network, feed_type)
+    derived = cache.get("derived")
+    if derived is None or derived[0] is not feed:
+        derived = cache["derived"] = (feed, {})
+    if parser not in derived[1]:
+        derived[1][parser] = asyncio.ensure_future(_run_cpu(parser, feed))
+    return await asyncio.shield(derived[1][parser])
+
+
+async def _fan_out(feed_type: str, parser) -> Dict[str, Optional[any]]:
+    """Applique `parser` au flux `feed_type` de chaque réseau, en parallèle.
+
+    Chaque réseau est servi par son propre cache (données périmées comprises) :
+    la durée totale est celle du réseau le plus lent et non leur somme. Un réseau
+    sans données ou en erreur vaut None."""
+
+    async def parse(network: str):
+        feed = await _get_cached_feed(network, feed_type)
+        return await _derive(network, feed_type, feed, parser) if feed else None
+
+    networks = [
+        network
+        for network in NETWORKS.in_region(REGION)
+        if feed_type in NETWORK_URLS[network]
+    ]
+    results = await asyncio.gather(
+        *(parse(network) for network in networks), return_exceptions=True
+    )
+    merged = {}
+    for network, result in zip(networks, results):
+        if isinstance(result, Exception):
+            logging.error(
+                f"Regional query failed for {network} {feed_type}: {result!r}"
+            )
+            result = None
+        merged[network] = result
+    return merged
 
 
-def _fetch_geographic_data() -> Optional[Dict]:
+async def _fetch_geographic_data() -> Optional[Dict]:
     """Récupère les données géographiques de la ville de Brest."""
     GEO_DATA_URL = "https://geo.brest-metropole.fr/portal/apps/sites/#/geopaysdebrest/pages/donnees"
     try:
         logging.info(f"Fetching geographic data from {GEO_DATA_URL}")
-        response = requests.get(GEO_DATA_URL, timeout=10)
-        response.raise_for_status()
-        data = response.json()  # Assurez-vous que l'API retourne du JSON
+        async with _http_session().get(GEO_DATA_URL) as response:
+            response.raise_for_status()
+            # Assurez-vous que l'API retourne du JSON
+            data = await response.json(content_type=None)
         logging.info(f"Successfully fetched geographic data with {len(data)} entries")
         return data
     except Exception as e:
@@ -154,28 +969,19 @@ def _fetch_geographic_data() -> Optional[Dict]:
         return None
 
 
-def _get_vehicle_positions_data() -> List[Dict]:
+async def _get_vehicle_positions_data() -> List[Dict]:
     """Récupère les positions de tous les véhicules."""
-    feed = _fetch_feed("vehicle_positions")
-    if feed:
-        return _parse_vehicle_positions(feed)
-    return []
+    return await _parsed("vehicle_positions", _parse_vehicle_positions)
 
 
-def _get_trip_updates_data() -> List[Dict]:
+async def _get_trip_updates_data() -> List[Dict]:
     """Récupère les mises à jour de tous les trajets."""
-    feed = _fetch_feed("trip_updates")
-    if feed:
-        return _parse_trip_updates(feed)
-    return []
+    return await _parsed("trip_updates", _parse_trip_updates)
 
 
-def _get_service_alerts_data() -> List[Dict]:
+async def _get_service_alerts_data() -> List[Dict]:
     """Récupère les alertes de service actives."""
-    feed = _fetch_feed("service_alerts")
-    if feed:
-        return _parse_service_alerts(feed)
-    return []
+    return await _parsed("service_alerts", _parse_service_alerts)
 
 
 def _parse_vehicle_positions(feed: gtfs_realtime_pb2.FeedMessage) -> List[Dict]:
@@ -338,39 +1144,39 @@ def _parse_weather_infoclimat(data: Dict) -> Dict:
 
 # Tools
 @mcp.tool("get_vehicles")
-def get_vehicle_positions():
+async def get_vehicle_positions():
     """Charge et retourne les positions de tous les véhicules en temps réel."""
     return {
         "status": "success",
-        "data": _get_vehicle_positions_data(),
+        "data": await _get_vehicle_positions_data(),
         "lastUpdate": _cache["vehicle_positions"]["last_update"],
     }
 
 
 @mcp.tool("get_trip_updates")
-def get_trip_updates():
+async def get_trip_updates():
     """Charge et retourne toutes les mises à jour des trajets en temps réel."""
     return {
         "status": "success",
-        "data": _get_trip_updates_data(),
+        "data": await _get_trip_updates_data(),
         "lastUpdate": _cache["trip_updates"]["last_update"],
     }
 
 
 @mcp.tool("get_service_alerts")
-def get_service_alerts():
+async def get_service_alerts():
     """Charge et retourne toutes les alertes de service actives en temps réel."""
     return {
         "status": "success",
-        "data": _get_service_alerts_data(),
+        "data": await _get_service_alerts_data(),
         "lastUpdate": _cache["service_alerts"]["last_update"],
     }
 
 
 @mcp.tool("get_events")
-def get_open_agenda_events():
+async def get_open_agenda_events():
     """Récupère les événements Open Agenda pour Brest."""
-    data = _fetch_feed("open_agenda", is_json=True)
+    data = await _fetch_feed("open_agenda", is_json=True)
     return {
         "status": "success",
         "data": _parse_open_agenda(data) if data else [],
@@ -379,9 +1185,9 @@ def get_open_agenda_events():
 
 
 @mcp.tool("get_weather_forecast")
-def get_weather_forecast():
+async def get_weather_forecast():
     """Récupère les prévisions météo pour Brest."""
-    data = _fetch_feed("weather_infoclimat", is_json=True)
+    data = await _fetch_feed("weather_infoclimat", is_json=True)
     return {
         "status": "success",
         "data": _parse_weather_infoclimat(data) if data else {},
@@ -390,9 +1196,9 @@ def get_weather_forecast():
 
 
 @mcp.tool("get_vehicle")
-def get_vehicle(vehicle_id: str):
+async def get_vehicle(vehicle_id: str):
     """Retourne les informations du véhicule spécifié par son identifiant."""
-    vehicles = _get_vehicle_positions_data()
+    vehicles = await _get_vehicle_positions_data()
     for v in vehicles:
         if str(v.get("vehicle_id")) == str(vehicle_id):
             return v
@@ -400,9 +1206,9 @@ def get_vehicle(vehicle_id: str):
 
 
 @mcp.tool("get_trip_update")
-def get_trip_update(trip_id: str):
+async def get_trip_update(trip_id: str):
     """Retourne les informations de mise à jour du trajet spécifié."""
-    trips = _get_trip_updates_data()
+    trips = await _get_trip_updates_data()
     for t in trips:
         if t.get("trip_id") == trip_id:
             return t
@@ -410,9 +1216,9 @@ def get_trip_update(trip_id: str):
 
 
 @mcp.tool("get_alert")
-def get_alert(alert_id: str):
+async def get_alert(alert_id: str):
     """Retourne les détails de l'alerte de service spécifiée."""
-    alerts = _get_service_alerts_data()
+    alerts = await _get_service_alerts_data()
     for a in alerts:
         if a.get("alert_id") == alert_id:
             return a
@@ -420,50 +1226,96 @@ def get_alert(alert_id: str):
 
 
 @mcp.tool("count_vehicles")
-def count_vehicles():
+async def count_vehicles():
     """Retourne le nombre de véhicules actuellement suivis."""
-    vehicles = _get_vehicle_positions_data()
+    vehicles = await _get_vehicle_positions_data()
     return len(vehicles)
 
 
 @mcp.tool("count_alerts")
-def count_alerts():
+async def count_alerts():
     """Retourne le nombre d'alertes de service actives."""
-    alerts = _get_service_alerts_data()
+    alerts = await _get_service_alerts_data()
     return len(alerts)
 
 
 @mcp.tool("count_events")
-def count_events():
+async def count_events():
     """Retourne le nombre d'événements Open Agenda disponibles."""
-    data = _fetch_feed("open_agenda", is_json=True)
+    data = await _fetch_feed("open_agenda", is_json=True)
     events = _parse_open_agenda(data) if data else []
     return len(events)
 
 
 @mcp.tool("find_trips_by_route")
-def find_trips_by_route(route_id: str):
+async def find_trips_by_route(route_id: str):
     """Liste les identifiants des trajets en cours pour la ligne donnée."""
-    trips = _get_trip_updates_data()
-    return [t["trip_id"] for t in trips if t.get("route_id") == route_id]
+    index = await _parsed("trip_updates", _index_trips_by_route)
+    return list(index[route_id]["trip_ids"]) if route_id in index else []
+
+
+_NO_DELAYS = {"averageDelay": 0, "maxDelay": 0, "minDelay": 0, "delayedStops": 0}
+
+
+def _index_trips_by_route(feed: gtfs_realtime_pb2.FeedMessage) -> Dict[str, Dict]:
+    """Trajets et statistiques de retard par ligne, construits en une passe."""
+    totals: Dict[str, List] = {}
+    for entity in feed.entity:
+        if not entity.HasField("trip_update"):
+            continue
+        tu = entity.trip_update
+        route = totals.get(tu.trip.route_id)
+        if route is None:
+            # trajets, somme, nombre, max, min, arrêts en retard
+            route = totals[tu.trip.route_id] = [[], 0, 0, None, None, 0]
+        route[0].append(tu.trip.trip_id)
+        for stu in tu.stop_time_update:
+            delay = (
+                stu.arrival.delay
+                if stu.HasField("arrival") and stu.arrival.HasField("delay")
+                else 0
+            )
+            route[1] += delay
+            route[2] += 1
+            route[3] = delay if route[3] is None else max(route[3], delay)
+            route[4] = delay if route[4] is None else min(route[4], delay)
+            route[5] += delay > 180
+    return {
+        route_id: {
+            "trip_ids": trip_ids,
+            "stops": count,
+            "delays": {
+                "averageDelay": total / count if count else 0,
+                "maxDelay": max_delay if count else 0,
+                "minDelay": min_delay if count else 0,
+                "delayedStops": delayed,
+            },
+        }
+        for route_id, (
+            trip_ids,
+            total,
+            count,
+            max_delay,
+            min_delay,
+            delayed,
+        ) in totals.items()
+    }
 
 
 @mcp.tool("find_vehicles_by_route")
-def find_vehicles_by_route(route_id: str) -> List[Dict]:
+async def find_vehicles_by_route(route_id: str) -> List[Dict]:
     """Trouve tous les véhicules sur une ligne spécifique."""
-    vehicles = []
-    feed = _fetch_feed("vehicle_positions")
-    if not feed:
-        return vehicles
+    index = await _parsed("vehicle_positions", _index_vehicles_by_route)
+    return index.get(route_id, []) if index else []
+
 
+def _index_vehicles_by_route(feed: gtfs_realtime_pb2.FeedMessage) -> Dict[str, List]:
+    """Véhicules du flux regroupés par ligne, construit en une passe."""
+    index: Dict[str, List] = {}
     for entity in feed.entity:
         if entity.HasField("vehicle"):
             vp = entity.vehicle
-            if (
-                vp.HasField("trip")
-                and vp.trip.HasField("route_id")
-                and vp.trip.route_id == route_id
-            ):
+            if vp.HasField("trip") and vp.trip.HasField("route_id"):
                 vehicle_info = {
                     "vehicle_id": vp.vehicle.id
                     if vp.vehicle.HasField("id")
@@ -484,92 +1336,330 @@ def find_vehicles_by_route(route_id: str) -> List[Dict]:
                     else None,
                     "timestamp": vp.timestamp if vp.HasField("timestamp") else None,
                 }
-                vehicles.append(vehicle_info)
-    return vehicles
+                index.setdefault(vp.trip.route_id, []).append(vehicle_info)
+    return index
 
 
 @mcp.tool("find_alerts_by_route")
-def find_alerts_by_route(route_id: str) -> List[Dict]:
+async def find_alerts_by_route(route_id: str) -> List[Dict]:
     """Trouve toutes les alertes pour une ligne spécifique."""
-    alerts = []
-    feed = _fetch_feed("service_alerts")
-    if not feed:
-        return alerts
+    index = await _parsed("service_alerts", _index_alerts_by_route)
+    return index.get(route_id, []) if index else []
+
 
+def _index_alerts_by_route(feed: gtfs_realtime_pb2.FeedMessage) -> Dict[str, List]:
+    """Alertes du flux regroupées par ligne concernée, construit en une passe."""
+    index: Dict[str, List] = {}
     for entity in feed.entity:
         if entity.HasField("alert"):
             alert = entity.alert
-            for informed_entity in alert.informed_entity:
-                if (
-                    informed_entity.HasField("route_id")
-                    and informed_entity.route_id == route_id
-                ):
-                    alert_info = {
-                        "id": entity.id,
-                        "effect": alert.effect,
-                        "header": alert.header_text.translation[0].text
-                        if alert.header_text.translation
-                        else None,
-                        "description": alert.description_text.translation[0].text
-                        if alert.description_text.translation
-                        else None,
-                        "start": alert.active_period[0].start
-                        if alert.active_period
-                        else None,
-                        "end": alert.active_period[0].end
-                        if alert.active_period
-                        else None,
-                    }
-                    alerts.append(alert_info)
-                    break
-    return alerts
+            route_ids = {
+                informed_entity.route_id
+                for informed_entity in alert.informed_entity
+                if informed_entity.HasField("route_id")
+            }
+            if not route_ids:
+                continue
+            alert_info = {
+                "id": entity.id,
+                "effect": alert.effect,
+                "header": alert.header_text.translation[0].text
+                if alert.header_text.translation
+                else None,
+                "description": alert.description_text.translation[0].text
+                if alert.description_text.translation
+                else None,
+                "start": alert.active_period[0].start if alert.active_period else None,
+                "end": alert.active_period[0].end if alert.active_period else None,
+            }
+            for route_id in route_ids:
+                index.setdefault(route_id, []).append(alert_info)
+    return index
 
 
 @mcp.tool("find_events_by_date")
-def find_events_by_date(date: str):
+async def find_events_by_date(date: str):
     """Filtre les événements Open Agenda par date (format YYYY-MM-DD)."""
-    data = _fetch_feed("open_agenda", is_json=True)
+    data = await _fetch_feed("open_agenda", is_json=True)
     events = _parse_open_agenda(data) if data else []
     return [e for e in events if e.get("start_time", "").startswith(date)]
 
 
 @mcp.tool("get_weather_by_timestamp")
-def get_weather_by_timestamp(timestamp: str):
+async def get_weather_by_timestamp(timestamp: str):
     """Récupère les prévisions météo pour un timestamp spécifique (format ISO)."""
-    data = _fetch_feed("weather_infoclimat", is_json=True)
+    data = await _fetch_feed("weather_infoclimat", is_json=True)
     forecasts = _parse_weather_infoclimat(data) if data else {}
     return forecasts.get(timestamp, None)
 
 
 @mcp.tool("get_route_delays")
-def get_route_delays(route_id: str) -> Dict:
+async def get_route_delays(route_id: str) -> Dict:
     """Calcule les statistiques de retard pour une ligne spécifique."""
-    trips = _get_trip_updates_data()
-    route_trips = [trip for trip in trips if trip.get("route_id") == route_id]
-    delays = [
-        stop.get("arrival_delay", 0)
-        for trip in route_trips
-        for stop in trip.get("stop_time_updates", [])
+    index = await _parsed("trip_updates", _index_trips_by_route)
+    return dict(index[route_id]["delays"] if route_id in index else _NO_DELAYS)
+
+
+@mcp.tool("get_region_vehicle_counts")
+async def get_region_vehicle_counts() -> Dict:
+    """Compte les véhicules en circulation sur chaque réseau breton (Bibus, STAR,
+    TUB), au total et par ligne."""
+    counts = await _fan_out("vehicle_positions", _count_vehicles)
+    networks = {network: count for network, count in counts.items() if count}
+    return {
+        "total": sum(count["vehicles"] for count in networks.values()),
+        "networks": networks,
+        "unavailable": [network for network, count in counts.items() if count is None],
+    }
+
+
+def _count_vehicles(feed: gtfs_realtime_pb2.FeedMessage) -> Dict:
+    """Nombre de véhicules du flux, au total et par ligne, en une passe."""
+    total = 0
+    by_route: Dict[str, int] = {}
+    for entity in feed.entity:
+        if entity.HasField("vehicle"):
+            total += 1
+            vp = entity.vehicle
+            if vp.HasField("trip") and vp.trip.HasField("route_id"):
+                by_route[vp.trip.route_id] = by_route.get(vp.trip.route_id, 0) + 1
+    return {
+        "vehicles": total,
+        "routes": len(by_route),
+        "byRoute": dict(sorted(by_route.items(), key=lambda item: -item[1])),
+    }
+
+
+@mcp.tool("get_region_worst_delays")
+async def get_region_worst_delays(limit: int = 10) -> Dict:
+    """Classe les lignes les plus en retard, tous réseaux bretons confondus
+    (retard moyen à l'arrivée, en secondes)."""
+    stats = await _fan_out("trip_updates", _index_trips_by_route)
+    routes = [
+        {
+            "network": network,
+            "route_id": route_id,
+            **route["delays"],
+            "averageDelay": round(route["delays"]["averageDelay"], 1),
+            "trips": len(route["trip_ids"]),
+        }
+        for network, by_route in stats.items()
+        if by_route is not None
+        for route_id, route in by_route.items()
+        if route["stops"]
+    ]
+    routes.sort(key=lambda route: route["averageDelay"], reverse=True)
+    return {
+        "data": routes[: max(limit, 0)],
+        "routesCompared": len(routes),
+        "unavailable": [
+            network for network, by_route in stats.items() if by_route is None
+        ],
+    }
+
+
+@mcp.tool("get_region_alerts")
+async def get_region_alerts() -> Dict:
+    """Liste les alertes de service actives en ce moment sur tous les réseaux
+    bretons."""
+    alerts = await _fan_out("service_alerts", _parse_service_alerts)
+    now = time.time()
+    data = [
+        {"network": network, **alert}
+        for network, network_alerts in alerts.items()
+        if network_alerts is not None
+        for alert in network_alerts
+        if _is_alert_active(alert, now)
     ]
     return {
-        "averageDelay": sum(delays) / len(delays) if delays else 0,
-        "maxDelay": max(delays) if delays else 0,
-        "minDelay": min(delays) if delays else 0,
-        "delayedStops": len([d for d in delays if d > 180]),
+        "data": data,
+        "count": len(data),
+        "unavailable": [network for network, items in alerts.items() if items is None],
+    }
+
+
+def _is_alert_active(alert: Dict, now: float) -> bool:
+    """Alerte sans période ou dont une période couvre `now` (0 = non borné)."""
+    periods = alert.get("active_periods")
+    if not periods:
+        return True
+    return any(
+        (not period["start"] or period["start"] <= now)
+        and (not period["end"] or now <= period["end"])
+        for period in periods
+    )
+
+
+@mcp.tool("get_route_headways")
+async def get_route_headways(route_id: str, network: str = NETWORK) -> Dict:
+    """Intervalles entre les véhicules d'une ligne, par sens : véhicules dans
+    l'ordre du tracé, écart avec le précédent en mètres et en secondes, et
+    paires trop rapprochées (train de bus)."""
+    engine = await _headway_engine(network)
+    if engine is None:
+        return {
+            "status": "error",
+            "message": f"Tracés GTFS indisponibles pour le réseau {network}",
+        }
+    data = engine.route(route_id)
+    return {
+        "status": "success",
+        "network": network,
+        "route_id": route_id,
+        "data": data,
+        "bunched": sum(item["bunched"] for item in data),
+    }
+
+
+@mcp.tool("get_bunching_alerts")
+async def get_bunching_alerts(network: str = NETWORK) -> Dict:
+    """Liste les véhicules qui roulent en train de bus (collés au véhicule qui
+    les précède sur la même ligne), toutes lignes du réseau confondues."""
+    engine = await _headway_engine(network)
+    if engine is None:
+        return {
+            "status": "error",
+            "message": f"Tracés GTFS indisponibles pour le réseau {network}",
+        }
+    alerts = engine.bunching()
+    alerts.sort(key=lambda alert: alert["gapMeters"])
+    return {
+        "status": "success",
+        "network": network,
+        "data": alerts,
+        "count": len(alerts),
+    }
+
+
+# Moteur d'intervalles de chaque réseau, lié à la version de ses tracés
+_headway_engines: Dict[str, "headways.HeadwayEngine"] = {}
+
+
+async def _headway_engine(network: str) -> Optional["headways.HeadwayEngine"]:
+    """Moteur d'intervalles du réseau, à jour de la dernière capture des positions.
+
+    Les tracés du GTFS statique sont indexés une fois par version du ZIP, et
+    chaque capture vehicle_positions n'est intégrée qu'une fois (mémoïsation par
+    version de flux, dans le pool CPU). None sans GTFS statique pour le réseau."""
+    if "gtfs_static" not in NETWORK_URLS.get(network, {}):
+        return None
+    static = await _get_cached_feed(network, "gtfs_static", is_static=True)
+    if not static:
+        return None
+    shapes = await _derive(network, "gtfs_static", static, headways.ShapeIndex.from_zip)
+    engine = _headway_engines.get(network)
+    if engine is None or engine.shapes is not shapes:
+        engine = _headway_engines[network] = headways.HeadwayEngine(shapes)
+    feed = await _get_cached_feed(network, "vehicle_positions")
+    if feed:
+        await _derive(network, "vehicle_positions", feed, engine.update)
+    return engine
+
+
+@mcp.tool("predict_vehicle")
+async def predict_vehicle(vehicle_id: str, network: str = NETWORK) -> Dict:
+    """Estime la position actuelle d'un véhicule entre deux rafraîchissements du
+    flux, et ses prochaines heures d'arrivée corrigées de la tendance du retard."""
+    predictor = await _predictor(network)
+    if predictor is None:
+        return {"status": "error", "message": f"Réseau {network} non trouvé"}
+    engine = await _headway_engine(network)
+    prediction = predictor.vehicle(vehicle_id, time.time(), engine)
+    if prediction is None:
+        return {"status": "error", "message": f"Véhicule {vehicle_id} non trouvé"}
+    return {"status": "success", "network": network, "data": prediction}
+
+
+@mcp.tool("get_stop_arrivals")
+async def get_stop_arrivals(
+    stop_id: str, network: str = NETWORK, limit: int = 10
+) -> Dict:
+    """Prochains passages prévus à un arrêt, corrigés de la tendance du retard de
+    chaque course."""
+    predictor = await _predictor(network)
+    if predictor is None:
+        return {"status": "error", "message": f"Réseau {network} non trouvé"}
+    arrivals = predictor.stop(stop_id, time.time(), limit)
+    return {
+        "status": "success",
+        "network": network,
+        "stop_id": stop_id,
+        "data": arrivals,
+        "count": len(arrivals),
+    }
+
+
+# Prévisions de chaque réseau, alimentées capture après capture
+_predictors: Dict[str, "predictions.ArrivalPredictor"] = {}
+
+
+async def _predictor(network: str) -> Optional["predictions.ArrivalPredictor"]:
+    """Prévisions du réseau, à jour des dernières captures vehicle_positions et
+    trip_updates (chaque capture n'est intégrée qu'une fois, dans le pool CPU)."""
+    if network not in NETWORK_URLS:
+        return None
+    predictor = _predictors.get(network)
+    if predictor is None:
+        predictor = _predictors[network] = predictions.ArrivalPredictor()
+    vehicles, trips = await asyncio.gather(
+        _get_cached_feed(network, "vehicle_positions"),
+        _get_cached_feed(network, "trip_updates"),
+    )
+    if vehicles:
+        await _derive(network, "vehicle_positions", vehicles, predictor.update_vehicles)
+    if trips:
+        await _derive(network, "trip_updates", trips, predictor.update_trips)
+    return predictor
+
+
+@mcp.tool("search")
+async def search_text(query: str, network: str = NETWORK, limit: int = 10) -> Dict:
+    """Recherche plein texte dans les alertes de service (toutes traductions) et
+    les événements Open Agenda du réseau, sans tenir compte des accents ni des
+    pluriels (« travaux », « Recouvrance », « deviation »...). Résultats classés
+    par pertinence."""
+    urls = NETWORK_URLS.get(network)
+    if urls is None:
+        return {"status": "error", "message": f"Réseau {network} non trouvé"}
+    if not search.analyze(query):
+        return {"status": "error", "message": "Requête vide"}
+
+    async def index(feed_type: str, builder, is_json: bool = False):
+        if feed_type not in urls:
+            return None
+        feed = await _get_cached_feed(network, feed_type, is_json)
+        # Index reconstruit une fois par capture, dans le pool CPU
+        return await _derive(network, feed_type, feed, builder) if feed else None
+
+    indexes = await asyncio.gather(
+        index("service_alerts", search.index_alerts),
+        index("open_agenda", search.index_events, is_json=True),
+    )
+    results = []
+    for found in indexes:
+        if found is not None:
+            results.extend(found.search(query, limit))
+    results.sort(key=lambda result: (-len(result["matched"]), -result["score"]))
+    return {
+        "status": "success",
+        "network": network,
+        "query": query,
+        "data": results[: max(limit, 0)],
+        "count": min(len(results), max(limit, 0)),
     }
 
 
 # Resources
 @mcp.resource("gtfs://vehicles")
-def vehicles_resource() -> Dict:
+async def vehicles_resource() -> Dict:
     """Liste tous les véhicules actifs."""
-    return get_vehicle_positions()
+    return await get_vehicle_positions()
 
 
 @mcp.resource("gtfs://vehicle/{vehicle_id}")
-def vehicle_resource(vehicle_id: str) -> Dict:
+async def vehicle_resource(vehicle_id: str) -> Dict:
     """Détails d'un véhicule spécifique."""
-    vehicle = get_vehicle(vehicle_id)
+    vehicle = await get_vehicle(vehicle_id)
     return {
         "status": "success" if vehicle else "error",
         "data": vehicle or "Vehicle not found",
@@ -577,9 +1667,9 @@ def vehicle_resource(vehicle_id: str) -> Dict:
 
 
 @mcp.resource("gtfs://trip/{trip_id}")
-def trip_resource(trip_id: str) -> Dict:
+async def trip_resource(trip_id: str) -> Dict:
     """Détails d'un trajet spécifique."""
-    trip = get_trip_update(trip_id)
+    trip = await get_trip_update(trip_id)
     return {
         "status": "success" if trip else "error",
         "data": trip or "Trip not found",
@@ -588,9 +1678,9 @@ def trip_resource(trip_id: str) -> Dict:
 
 
 @mcp.resource("gtfs://alert/{alert_id}")
-def alert_resource(alert_id: str) -> Dict:
+async def alert_resource(alert_id: str) -> Dict:
     """Détails d'une alerte spécifique."""
-    alert = get_alert(alert_id)
+    alert = await get_alert(alert_id)
     return {
         "status": "success" if alert else "error",
         "data": alert or "Alert not found",
@@ -599,59 +1689,98 @@ def alert_resource(alert_id: str) -> Dict:
 
 
 @mcp.resource("gtfs://route/{route_id}")
-def route_resource(route_id: str) -> Dict:
+async def route_resource(route_id: str) -> Dict:
     """État d'une ligne spécifique."""
-    vehicles = find_vehicles_by_route(route_id)
-    alerts = find_alerts_by_route(route_id)
-    delays = get_route_delays(route_id)
+    table = await _route_table()
+    state = table.get(route_id) or _route_state([], [], None)
     return {
         "status": "success",
         "data": {
             "route_id": route_id,
-            "vehicles": vehicles,
-            "alerts": alerts,
-            "delays": delays,
-            "statistics": {"vehicle_count": len(vehicles), "alert_count": len(alerts)},
+            **state,
             "timestamp": datetime.now().isoformat(),
         },
     }
 
 
+# Table des états de ligne et index de flux dont elle est issue
+_route_states: Dict = {"sources": None, "routes": {}}
+
+
+async def _route_table() -> Dict[str, Dict]:
+    """États de toutes les lignes (véhicules, alertes, retards, compteurs),
+    reconstruits lorsqu'un des trois flux change de version."""
+    sources = await asyncio.gather(
+        _parsed("vehicle_positions", _index_vehicles_by_route),
+        _parsed("service_alerts", _index_alerts_by_route),
+        _parsed("trip_updates", _index_trips_by_route),
+    )
+    current = _route_states["sources"]
+    if current is None or any(a is not b for a, b in zip(current, sources)):
+        vehicles, alerts, trips = (source or {} for source in sources)
+        routes = {
+            route_id: _route_state(
+                vehicles.get(route_id, []),
+                alerts.get(route_id, []),
+                trips.get(route_id),
+            )
+            for route_id in vehicles.keys() | alerts.keys() | trips.keys()
+        }
+        _route_states.update({"sources": sources, "routes": routes})
+    return _route_states["routes"]
+
+
+def _route_state(vehicles: List, alerts: List, trips: Optional[Dict]) -> Dict:
+    return {
+        "vehicles": vehicles,
+        "alerts": alerts,
+        "delays": dict(trips["delays"] if trips else _NO_DELAYS),
+        "statistics": {"vehicle_count": len(vehicles), "alert_count": len(alerts)},
+    }
+
+
 @mcp.resource("gtfs://network/stats")
-def network_stats_resource() -> Dict:
+async def network_stats_resource() -> Dict:
     """Statistiques du réseau."""
-    return {"status": "success", "data": _get_network_statistics()}
+    return {"status": "success", "data": await _get_network_statistics()}
 
 
 @mcp.resource("gtfs://networks")
-def available_networks_resource() -> Dict:
-    """Liste tous les réseaux disponibles."""
-    networks = []
-    for network, urls in NETWORK_URLS.items():
-        networks.append(
-            {
-                "id": network,
-                "name": {
-                    "bibus": "Bibus (Brest)",
-                    "star": "STAR (Rennes)",
-                    "tub": "TUB (Saint-Brieuc)",
-                }.get(network, network),
-                "urls": urls,
-            }
-        )
-    return {"status": "success", "data": networks, "count": len(networks)}
+async def available_networks_resource() -> Dict:
+    """Liste tous les réseaux disponibles, avec leur activité et la mémoire
+    occupée par leurs flux en cache."""
+    now = time.time()
+    data = [NETWORKS.describe(network, now) for network in NETWORK_URLS]
+    return {
+        "status": "success",
+        "data": data,
+        "count": len(data),
+        "active": sum(network["active"] for network in data),
+    }
 
 
 @mcp.resource("gtfs://network/{network}/vehicles")
-def network_vehicles_resource(network: str) -> Dict:
+async def network_vehicles_resource(network: str) -> Dict:
     """Liste tous les véhicules d'un réseau spécifique."""
-    feed = _get_network_feed(network, "vehicle_positions")
+    feed = await _get_network_feed(network, "vehicle_positions")
     if not feed:
         return {
             "status": "error",
             "message": f"Réseau {network} non trouvé ou données indisponibles",
         }
+    vehicles = await _derive(
+        network, "vehicle_positions", feed, _parse_network_vehicles
+    )
+    return {
+        "status": "success",
+        "network": network,
+        "data": vehicles,
+        "count": len(vehicles),
+        "timestamp": datetime.now().isoformat(),
+    }
 
+
+def _parse_network_vehicles(feed: gtfs_realtime_pb2.FeedMessage) -> List[Dict]:
     vehicles = []
     for entity in feed.entity:
         if entity.HasField("vehicle"):
@@ -678,25 +1807,19 @@ def network_vehicles_resource(network: str) -> Dict:
                 "timestamp": vp.timestamp if vp.HasField("timestamp") else None,
             }
             vehicles.append(vehicle_info)
-    return {
-        "status": "success",
-        "network": network,
-        "data": vehicles,
-        "count": len(vehicles),
-        "timestamp": datetime.now().isoformat(),
-    }
+    return vehicles
 
 
 @mcp.resource("gtfs://network/{network}/trip-updates")
-def network_trip_updates_resource(network: str) -> Dict:
+async def network_trip_updates_resource(network: str) -> Dict:
     """Liste toutes les mises à jour de trajets d'un réseau spécifique."""
-    feed = _get_network_feed(network, "trip_updates")
+    feed = await _get_network_feed(network, "trip_updates")
     if not feed:
         return {
             "status": "error",
             "message": f"Réseau {network} non trouvé ou données indisponibles",
         }
-    trips = _parse_trip_updates(feed)
+    trips = await _derive(network, "trip_updates", feed, _parse_trip_updates)
     return {
         "status": "success",
         "network": network,
@@ -707,15 +1830,15 @@ def network_trip_updates_resource(network: str) -> Dict:
 
 
 @mcp.resource("gtfs://network/{network}/alerts")
-def network_alerts_resource(network: str) -> Dict:
+async def network_alerts_resource(network: str) -> Dict:
     """Liste toutes les alertes d'un réseau spécifique."""
-    feed = _get_network_feed(network, "service_alerts")
+    feed = await _get_network_feed(network, "service_alerts")
     if not feed:
         return {
             "status": "error",
             "message": f"Réseau {network} non trouvé ou données indisponibles",
         }
-    alerts = _parse_service_alerts(feed)
+    alerts = await _derive(network, "service_alerts", feed, _parse_service_alerts)
     return {
         "status": "success",
         "network": network,
@@ -726,21 +1849,21 @@ def network_alerts_resource(network: str) -> Dict:
 
 
 @mcp.resource("gtfs://events")
-def events_resource():
+async def events_resource():
     """Ressource pour les événements Open Agenda."""
-    return get_open_agenda_events()
+    return await get_open_agenda_events()
 
 
 @mcp.resource("gtfs://weather")
-def weather_resource():
+async def weather_resource():
     """Ressource pour les prévisions météo."""
-    return get_weather_forecast()
+    return await get_weather_forecast()
 
 
 @mcp.resource("gtfs://static")
-def gtfs_static_resource():
+async def gtfs_static_resource():
     """Ressource pour les données GTFS statiques (ZIP brut)."""
-    data = _fetch_feed("gtfs_static", is_static=True)
+    data = await _fetch_feed("gtfs_static", is_static=True)
     return {
         "status": "success",
         "data": "Raw ZIP file available (not parsed)",
@@ -750,9 +1873,9 @@ def gtfs_static_resource():
 
 
 @mcp.resource("gtfs://network/health")
-def network_health_resource() -> Dict:
+async def network_health_resource() -> Dict:
     """Vue d'ensemble de la santé du réseau."""
-    stats = _get_network_statistics()
+    stats = await _get_network_statistics()
     return {
         "status": "success",
         "data": {
@@ -761,15 +1884,25 @@ def network_health_resource() -> Dict:
             "on_time_performance": stats["onTimePerformance"],
             "alerts_active": stats["routesWithAlerts"],
             "average_delay": stats["averageDelay"],
+            # Réponses amont identiques à la précédente, ignorées sans décodage, et
+            # cadence d'interrogation apprise de chaque flux
+            "feeds": {
+                feed_type: {
+                    "version": _cache[feed_type].get("version"),
+                    "unchangedFetches": _cache[feed_type].get("unchanged", 0),
+                    **POLLER.snapshot(NETWORK, feed_type),
+                }
+                for feed_type in ("vehicle_positions", "trip_updates", "service_alerts")
+            },
             "timestamp": datetime.now().isoformat(),
         },
     }
 
 
 @mcp.resource("geo://brest")
-def geographic_data_resource() -> Dict:
+async def geographic_data_resource() -> Dict:
     """Ressource pour les données géographiques de Brest."""
-    data = _fetch_geographic_data()
+    data = await _fetch_geographic_data()
     if data:
         return {
             "status": "success",
@@ -785,20 +1918,25 @@ def geographic_data_resource() -> Dict:
 
 
 # Fonctions utilitaires
-def _get_network_statistics() -> Dict:
+async def _get_network_statistics() -> Dict:
     """Calcule des statistiques sur l'état du réseau."""
-    vehicles = _get_vehicle_positions_data()
-    trips = _get_trip_updates_data()
+    vehicles, trips, alerts = await asyncio.gather(
+        _get_vehicle_positions_data(),
+        _get_trip_updates_data(),
+        _get_service_alerts_data(),
+    )
+    return await _run_cpu(_compute_network_statistics, vehicles, trips, alerts)
+
+
+def _compute_network_statistics(
+    vehicles: List[Dict], trips: List[Dict], alerts: List[Dict]
+) -> Dict:
     return {
         "totalVehicles": len(vehicles),
         "vehiclesByStatus": _count_vehicles_by_status(vehicles),
         "averageDelay": _calculate_average_delay(trips),
         "routesWithAlerts": len(
-            set(
-                alert.get("route_id")
-                for alert in _get_service_alerts_data()
-                if alert.get("route_id")
-            )
+            set(alert.get("route_id") for alert in alerts if alert.get("route_id"))
         ),
         "onTimePerformance": _calculate_on_time_performance(trips),
     }
@@ -835,34 +1973,279 @@ def _calculate_on_time_performance(trips: List[Dict], threshold: int = 180) -> f
     return (on_time / total * 100) if total > 0 else 100
 
 
-def _get_network_feed(
+async def _get_network_feed(
     network: str, feed_type: str
 ) -> Optional[gtfs_realtime_pb2.FeedMessage]:
     """Récupère un flux GTFS-RT pour un réseau spécifique."""
-    if network not in NETWORK_URLS:
+    if feed_type not in NETWORK_URLS.get(network, {}):
         return None
+    return await _get_cached_feed(network, feed_type)
+
+
+@mcp.custom_route("/metrics", methods=["GET"])
+async def metrics_endpoint(request: Request) -> PlainTextResponse:
+    """Expose les métriques au format texte de Prometheus."""
+    now = time.time()
+    for feed_type, cache in _cache.items():
+        if cache["data"] is not None:
+            CACHE_AGE.set(now - cache["timestamp"], feed=feed_type)
+    for (network, feed_type), breaker in list(_breakers.items()):
+        CIRCUIT_OPEN.set(int(breaker.state == OPEN), network=network, feed=feed_type)
+    NETWORKS_ACTIVE.set(len(NETWORKS.active(now)))
+    return PlainTextResponse(
+        REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
+@mcp.custom_route("/export/{network}/{feed_type}", methods=["GET"])
+async def export_endpoint(request: Request):
+    """Capture d'un flux en colonnes (?format=ndjson|arrow|parquet), actuelle ou
+    historique (?at=<epoch>, captures de MCP_HISTORY_DIR), envoyée par blocs."""
+    network = request.path_params["network"]
+    feed_type = request.path_params["feed_type"]
+    output = request.query_params.get("format", "ndjson")
+    if feed_type not in export.EXTRACTORS or feed_type not in NETWORK_URLS.get(
+        network, {}
+    ):
+        return PlainTextResponse(f"Unknown feed {network}/{feed_type}", 404)
+    if output not in export.FORMATS:
+        return PlainTextResponse(
+            f"Unknown format {output}, expected {', '.join(export.FORMATS)}", 400
+        )
+    extract, schema = export.EXTRACTORS[feed_type]
+    at = request.query_params.get("at")
+    if at is None:
+        feed = await _get_cached_feed(network, feed_type)
+        if not feed:
+            return PlainTextResponse(f"No data for {network}/{feed_type}", 503)
+        # Colonnes extraites une fois par version du flux, comme les index
+        columns = await _derive(network, feed_type, feed, extract)
+        captured_at = _cache_entry(network, feed_type)["timestamp"]
+    else:
+        try:
+            at = float(at)
+        except ValueError:
+            return PlainTextResponse(f"Invalid timestamp {at}", 400)
+        if not HISTORY_DIR:
+            return PlainTextResponse("MCP_HISTORY_DIR is not configured", 404)
+        capture = await _run_cpu(_history().lookup, network, feed_type, at)
+        if capture is None:
+            return PlainTextResponse(
+                f"No capture of {network}/{feed_type} before {at}", 404
+            )
+        captured_at, content = capture
+        feed = await _run_cpu(_decode_feed, network, feed_type, content)
+        columns = await _run_cpu(extract, feed)
+
     try:
-        url = NETWORK_URLS[network][feed_type]
-        logging.info(f"Fetching {feed_type} from {network} at {url}")
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()
-        feed = gtfs_realtime_pb2.FeedMessage()
-        feed.ParseFromString(response.content)
-        logging.info(
-            f"Successfully fetched {network} {feed_type} with {len(feed.entity)} entities"
+        chunks = export.encode_chunks(columns, schema, output)
+        first = await _run_cpu(next, chunks, None)
+    except RuntimeError as e:  # pyarrow absent
+        return PlainTextResponse(str(e), 501)
+
+    async def stream():
+        chunk = first
+        while chunk is not None:
+            if chunk:
+                yield chunk
+            # Chaque bloc est encodé hors de la boucle asyncio
+            chunk = await _run_cpu(next, chunks, None)
+
+    return StreamingResponse(
+        stream(),
+        media_type=export.FORMATS[output],
+        headers={
+            "X-Feed-Rows": str(export.row_count(columns)),
+            "X-Captured-At": datetime.fromtimestamp(captured_at).isoformat(),
+        },
+    )
+
+
+_history_store: Optional["export.History"] = None
+
+
+def _history() -> "export.History":
+    global _history_store
+    if _history_store is None:
+        _history_store = export.History(HISTORY_DIR)
+    return _history_store
+
+
+@mcp.custom_route("/debug/profiles", methods=["GET"])
+async def profiles_endpoint(request: Request) -> PlainTextResponse:
+    """Rapport des invocations profilées (?target=tool:get_vehicles&limit=30)."""
+    return PlainTextResponse(
+        PROFILER.report(
+            request.query_params.get("target"),
+            int(request.query_params.get("limit", "20")),
         )
-        return feed
+    )
+
+
+# Outils d'administration
+def profiling_configure(rate: float) -> Dict:
+    """Règle la fraction d'invocations profilées (0 désactive, 1 profile tout)."""
+    PROFILER.rate = max(0.0, min(1.0, rate))
+    return {"status": "success", "rate": PROFILER.rate, "samples": PROFILER.summary()}
+
+
+def profiling_report(target: str = "", limit: int = 20, dump: bool = False) -> Dict:
+    """Retourne les fonctions les plus coûteuses par outil ou ressource profilé."""
+    return {
+        "status": "success",
+        "rate": PROFILER.rate,
+        "samples": PROFILER.summary(),
+        "report": PROFILER.report(target or None, limit),
+        "files": PROFILER.dump() if dump else [],
+    }
+
+
+if ADMIN_TOOLS:
+    mcp.add_tool(profiling_configure, name="profiling_configure")
+    mcp.add_tool(profiling_report, name="profiling_report")
+
+
+# Déploiement multi-processus
+# Fetcher : version et signature de la dernière publication, par (réseau, flux)
+_published: Dict[tuple, Dict] = {}
+
+
+async def _publish_feed(
+    network: str, feed_type: str, url: str, fetched_at: float
+) -> float:
+    """Récupère un flux et publie sa réponse brute en instantané ; retourne le
+    délai avant la requête suivante."""
+    breaker = _breaker(network, feed_type)
+    if not breaker.allow():
+        return max(breaker.retry_in(), POLL_MIN_INTERVAL)
+    try:
+        async with _fetch_slots():
+            with FETCH_LATENCY.time(network=network, feed=feed_type):
+                async with _http_session().get(url) as response:
+                    response.raise_for_status()
+                    content = await response.read()
+        FETCH_BYTES.inc(len(content), network=network, feed=feed_type)
+        breaker.record_success()
+        if response.status == 304:
+            # Contenu inchangé : les workers ne mettent à jour que sa fraîcheur
+            SNAPSHOTS.refresh(network, feed_type, fetched_at)
+            return _observe_poll(network, feed_type, response, content, None)
+        kind = _snapshot_kind(feed_type)
+        signature = _feed_signature(content, kind != snapshots.KIND_PROTOBUF)
+        key = (network, feed_type)
+        match = _unchanged(_published.get(key, {"data": None}), signature)
+        if match:
+            FEED_UNCHANGED.inc(network=network, feed=feed_type, match=match)
+            SNAPSHOTS.touch(network, feed_type, content, kind, fetched_at)
+            logging.info(f"Unchanged {network} {feed_type} ({match}), not republished")
+            return _observe_poll(network, feed_type, response, content, None)
+        version = SNAPSHOTS.publish(network, feed_type, content, kind, fetched_at)
+        _published[key] = {"data": version, "signature": signature}
+        _account(network, feed_type, len(content))
+        logging.info(f"Published {network} {feed_type} v{version}")
+        return _observe_poll(network, feed_type, response, content, signature)
     except Exception as e:
-        logging.error(f"Error fetching {network} {feed_type}: {str(e)}")
-        return None
+        logging.error(f"Error fetching {network} {feed_type}: {str(e) or repr(e)}")
+        FETCH_ERRORS.inc(network=network, feed=feed_type)
+        breaker.record_failure()
+        return max(breaker.retry_in(), POLL_MIN_INTERVAL)
+
+
+async def _run_fetcher() -> None:
+    """Interroge chaque flux amont à sa cadence apprise et publie ses réponses pour
+    les workers. Les flux les plus en retard passent en premier lorsque le budget
+    de requêtes est limité. Seuls les réseaux actifs sont interrogés : le réseau
+    par défaut et ceux que les workers ont servis récemment."""
+    logging.info(f"Fetcher publishing snapshots to {SNAPSHOT_DIR}")
+    due: Dict[tuple, float] = {}
+    running: Dict[tuple, asyncio.Task] = {}
+
+    async def poll(network: str, feed_type: str, url: str, started: float) -> None:
+        try:
+            delay = await _publish_feed(network, feed_type, url, started)
+        finally:
+            running.pop((network, feed_type), None)
+        due[(network, feed_type)] = time.time() + delay
+
+    try:
+        while True:
+            now = time.time()
+            for network, reported_at in SNAPSHOTS.active_networks().items():
+                if network in NETWORKS:
+                    NETWORKS.touch(network, reported_at)
+            for network in NETWORKS.idle(now):
+                _release_network(network)
+                for key in [key for key in due if key[0] == network]:
+                    del due[key]
+            feeds = [
+                (network, feed_type, url)
+                for network in NETWORKS.active(now)
+                for feed_type, url in NETWORK_URLS[network].items()
+            ]
+            waiting = sorted(
+                (due.get((network, feed_type), 0.0), network, feed_type, url)
+                for network, feed_type, url in feeds
+                if (network, feed_type) not in running
+            )
+            for deadline, network, feed_type, url in waiting:
+                if deadline > now:
+                    break
+                if not POLLER.acquire():
+                    POLL_DEFERRED.inc(network=network, feed=feed_type)
+                    continue
+                running[(network, feed_type)] = asyncio.create_task(
+                    poll(network, feed_type, url, now)
+                )
+            upcoming = [deadline for deadline, *_ in waiting if deadline > now]
+            pause = min(upcoming, default=now + 1.0) - now
+            await asyncio.sleep(min(max(pause, POLLER.token_delay(), 0.2), 5.0))
+    finally:
+        await _close_http_session()
+
+
+def _run_workers(transport: str) -> None:
+    """Lance un fetcher et WORKERS serveurs MCP sur les ports PORT à PORT+WORKERS-1."""
+    script = os.path.abspath(__file__)
+    env = {**os.environ, "MCP_SNAPSHOT_DIR": SNAPSHOT_DIR, "MCP_WORKERS": "1"}
+    processes = [
+        subprocess.Popen([sys.executable, script], env={**env, "MCP_ROLE": "fetcher"})
+    ]
+    for index in range(WORKERS):
+        worker_env = {
+            **env,
+            "MCP_ROLE": "worker",
+            "MCP_TRANSPORT": transport,
+            "MCP_PORT": str(PORT + index),
+        }
+        processes.append(subprocess.Popen([sys.executable, script], env=worker_env))
+    logging.info(
+        f"Started 1 fetcher and {WORKERS} workers on ports {PORT}-{PORT + WORKERS - 1}"
+    )
+    try:
+        while all(process.poll() is None for process in processes):
+            time.sleep(1)
+        logging.error("A worker process exited, stopping the others")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait()
 
 
 if __name__ == "__main__":
-    transport = os.getenv("MCP_TRANSPORT", "sse")
+    # Les clients stdio lancent `python src/server.py stdio`
+    transport = sys.argv[1] if len(sys.argv) > 1 else os.getenv("MCP_TRANSPORT", "sse")
     if transport == "tcp":
         logging.info("Transport 'tcp' non supporté, utilisation de 'sse' à la place.")
         transport = "sse"
-    logging.info(
-        f"Starting Brest MCP Server with transport: {transport} on {HOST}:{PORT}"
-    )
-    mcp.run(transport=transport)
+    if ROLE == "fetcher":
+        asyncio.run(_run_fetcher())
+    elif ROLE == "standalone" and WORKERS > 1:
+        _run_workers(transport)
+    else:
+        logging.info(
+            f"Starting Brest MCP Server ({ROLE}) with transport: {transport} on {HOST}:{PORT}"
+        )
+        mcp.run(transport=transport)
@@ -0,0 +1,165 @@
+"""Instantanés versionnés des flux amont, partagés entre processus via des fichiers mmap.
+
+Un unique processus « fetcher » interroge les flux et publie chaque réponse
+brute dans `<dossier>/<réseau>/<flux>.snap` (écriture atomique par renommage).
+Les processus « worker » projettent ces fichiers en mémoire et ne décodent un
+flux que lorsque sa version change : la charge amont ne dépend plus du nombre
+de workers et les octets bruts sont partagés via le cache de pages.
+"""
+
+import mmap
+import os
+import struct
+import tempfile
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+# magic, version de l'instantané, date de récupération, type de contenu, taille
+_HEADER = struct.Struct("<4sQdBQ")
+_MAGIC = b"BMS1"
+
+KIND_PROTOBUF = 0
+KIND_JSON = 1
+KIND_RAW = 2
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    version: int
+    fetched_at: float
+    kind: int
+    payload: memoryview
+
+
+def default_directory() -> str:
+    """Mémoire partagée si disponible (/dev/shm), dossier temporaire sinon."""
+    base = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    return os.path.join(base, "brest-mcp")
+
+
+class SnapshotStore:
+    """Lecture et écriture des instantanés d'un dossier partagé."""
+
+    def __init__(self, directory: str):
+        self.directory = Path(directory)
+        self._versions: Dict[Tuple[str, str], int] = {}
+        self._mapped: Dict[Tuple[str, str], Tuple[tuple, Snapshot]] = {}
+
+    def _path(self, network: str, feed_type: str) -> Path:
+        return self.directory / network / f"{feed_type}.snap"
+
+    def mark_active(self, network: str, now: Optional[float] = None) -> None:
+        """Signale au fetcher qu'un worker sert ce réseau (date du marqueur)."""
+        marker = self.directory / ".active" / network
+        marker.parent.mkdir(parents=True, exist_ok=True)
+        marker.touch()
+        if now is not None:
+            os.utime(marker, (now, now))
+
+    def active_networks(self) -> Dict[str, float]:
+        """Date de dernière activité signalée par les workers, par réseau."""
+        try:
+            entries = list(os.scandir(self.directory / ".active"))
+        except FileNotFoundError:
+            return {}
+        return {entry.name: entry.stat().st_mtime for entry in entries}
+
+    def forget(self, network: str) -> None:
+        """Libère les projections mémoire des flux d'un réseau inactif."""
+        for key in [key for key in self._mapped if key[0] == network]:
+            del self._mapped[key]
+        for key in [key for key in self._versions if key[0] == network]:
+            del self._versions[key]
+
+    def publish(
+        self,
+        network: str,
+        feed_type: str,
+        payload: bytes,
+        kind: int,
+        fetched_at: Optional[float] = None,
+    ) -> int:
+        """Publie une nouvelle version d'un flux et retourne son numéro."""
+        return self._write(network, feed_type, payload, kind, fetched_at, 1)
+
+    def touch(
+        self,
+        network: str,
+        feed_type: str,
+        payload: bytes,
+        kind: int,
+        fetched_at: Optional[float] = None,
+    ) -> int:
+        """Republie un contenu inchangé sous la même version, avec sa nouvelle date
+        de récupération : les workers mettent à jour sa fraîcheur sans le décoder."""
+        return self._write(network, feed_type, payload, kind, fetched_at, 0)
+
+    def refresh(
+        self, network: str, feed_type: str, fetched_at: Optional[float] = None
+    ) -> Optional[int]:
+        """Met à jour la seule date de récupération de la dernière version (réponse
+        304 de l'amont, sans contenu) ; None si le flux n'a jamais été publié."""
+        current = self.read(network, feed_type)
+        if current is None:
+            return None
+        return self._write(
+            network, feed_type, current.payload, current.kind, fetched_at, 0
+        )
+
+    def _write(
+        self,
+        network: str,
+        feed_type: str,
+        payload: bytes,
+        kind: int,
+        fetched_at: Optional[float],
+        increment: int,
+    ) -> int:
+        path = self._path(network, feed_type)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        key = (network, feed_type)
+        if key not in self._versions:
+            current = self.read(network, feed_type)
+            self._versions[key] = current.version if current else 0
+        version = self._versions[key] + increment
+        header = _HEADER.pack(
+            _MAGIC, version, fetched_at or time.time(), kind, len(payload)
+        )
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as tmp:
+                tmp.write(header)
+                tmp.write(payload)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        self._versions[key] = version
+        return version
+
+    def read(self, network: str, feed_type: str) -> Optional[Snapshot]:
+        """Dernière version publiée, sans copie du contenu (vue sur le mmap)."""
+        path = self._path(network, feed_type)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        signature = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        key = (network, feed_type)
+        mapped = self._mapped.get(key)
+        if mapped and mapped[0] == signature:
+            return mapped[1]
+        if stat.st_size < _HEADER.size:
+            return None
+        with open(path, "rb") as snapshot_file:
+            mapping = mmap.mmap(snapshot_file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, fetched_at, kind, length = _HEADER.unpack_from(mapping)
+        if magic != _MAGIC:
+            raise ValueError(f"Invalid snapshot file {path}")
+        payload = memoryview(mapping)[_HEADER.size : _HEADER.size + length]
+        snapshot = Snapshot(version, fetched_at, kind, payload)
+        # Le renommage atomique laisse l'ancien mmap valide pour ses lecteurs
+        self._mapped[key] = (signature, snapshot)
+        return snapshot
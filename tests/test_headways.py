@@ -0,0 +1,237 @@
+"""Projection sur les tracés, intervalles et trains de bus (headways.py)."""
+
+import io
+import threading
+import zipfile
+from array import array
+
+import pytest
+from google.transit import gtfs_realtime_pb2
+
+from headways import BUNCHING_DISTANCE, HeadwayEngine, Shape, ShapeIndex
+
+
+def make_shape(shape_id, points):
+    return Shape(
+        shape_id, array("d", (x for x, _ in points)), array("d", (y for _, y in points))
+    )
+
+
+# Ligne droite de 10 km vers l'est ; retour par une rue parallèle à 20 m au nord
+LINE = make_shape("line", [(0, 0), (10000, 0)])
+BACK = make_shape("back", [(10000, 20), (0, 20)])
+# Aller-retour dans la même rue : même tronçon parcouru dans les deux sens
+LOOP = make_shape("loop", [(0, 0), (1000, 0), (1000, 20), (0, 20)])
+
+
+@pytest.fixture
+def index():
+    return ShapeIndex(
+        {"line": LINE, "back": BACK},
+        {},
+        {("A", 0): "line", ("A", 1): "back"},
+        1.0,
+    )
+
+
+def snapshot(index, vehicles, timestamp=1000):
+    """Capture vehicle_positions : (id, route, sens, abscisse sur son tracé)."""
+    feed = gtfs_realtime_pb2.FeedMessage()
+    feed.header.gtfs_realtime_version = "2.0"
+    feed.header.timestamp = timestamp
+    for vehicle_id, route_id, direction_id, distance in vehicles:
+        shape = index.shapes[index.shape_for("", route_id, direction_id)]
+        latitude, longitude = index.to_degrees(*shape.point_at(distance))
+        entity = feed.entity.add()
+        entity.id = vehicle_id
+        vp = entity.vehicle
+        vp.trip.trip_id = f"trip-{vehicle_id}"
+        vp.trip.route_id = route_id
+        vp.trip.direction_id = direction_id
+        vp.position.latitude = latitude
+        vp.position.longitude = longitude
+        vp.timestamp = timestamp
+    return feed
+
+
+def test_project_returns_distance_offset_and_segment():
+    shape = make_shape("l", [(0, 0), (1000, 0), (1000, 1000)])
+    distance, offset, segment = shape.project(500, 10)
+    assert distance == pytest.approx(500)
+    assert offset == pytest.approx(10)
+    assert segment == 0
+    assert shape.project(1010, 400)[0] == pytest.approx(1400)
+    assert shape.point_at(1500) == pytest.approx((1000, 500))
+
+
+def test_project_clamps_to_shape_ends():
+    assert LINE.project(-50, 0)[:2] == pytest.approx((0, 50))
+    assert LINE.project(10200, 0)[0] == pytest.approx(10000)
+    assert LINE.point_at(-10) == (0, 0)
+    assert LINE.point_at(20000) == (10000, 0)
+
+
+def test_project_far_from_grid_scans_every_segment():
+    distance, offset, _ = LINE.project(5000, 2000)
+    assert distance == pytest.approx(5000)
+    assert offset == pytest.approx(2000)
+
+
+def test_hint_disambiguates_a_street_used_both_ways():
+    # Même point, à mi-chemin de l'aller et du retour
+    assert LOOP.project(500, 10, hint=0)[0] == pytest.approx(500)
+    assert LOOP.project(500, 10, hint=2)[0] == pytest.approx(1520)
+
+
+def test_shape_index_from_zip_falls_back_to_most_frequent_route_shape():
+    content = io.BytesIO()
+    with zipfile.ZipFile(content, "w") as archive:
+        archive.writestr(
+            "shapes.txt",
+            "﻿shape_id,shape_pt_lat,shape_pt_lon,shape_pt_sequence\n"
+            "s1,48.0,-4.0,2\ns1,48.0,-4.01,1\ns2,48.0,-4.0,1\ns2,48.01,-4.0,2\n",
+        )
+        archive.writestr(
+            "trips.txt",
+            "route_id,trip_id,direction_id,shape_id\n"
+            "A,t1,0,s1\nA,t2,0,s1\nA,t3,0,s2\nA,t4,1,s2\nA,t5,1,missing\n",
+        )
+    index = ShapeIndex.from_zip(content.getvalue())
+    assert set(index.shapes) == {"s1", "s2"}
+    # Points triés par shape_pt_sequence : le tracé va vers l'est
+    assert index.shapes["s1"].xs[0] < index.shapes["s1"].xs[1]
+    assert index.shape_for("t3", "A", 0) == "s2"
+    assert index.shape_for("unknown", "A", 0) == "s1"
+    assert index.shape_for("t5", "A", 1) == "s2"
+    assert index.shape_for("unknown", "B", 0) is None
+
+
+def test_shape_index_without_shapes_is_empty():
+    content = io.BytesIO()
+    with zipfile.ZipFile(content, "w") as archive:
+        archive.writestr("trips.txt", "route_id,trip_id\n")
+    assert ShapeIndex.from_zip(content.getvalue()).shapes == {}
+
+
+def test_headways_are_ordered_from_the_leading_vehicle(index):
+    engine = HeadwayEngine(index)
+    engine.update(
+        snapshot(
+            index, [("v1", "A", 0, 1000), ("v2", "A", 0, 5000), ("v3", "A", 0, 3000)]
+        )
+    )
+    [item] = engine.route("A")
+    assert [vehicle["vehicle_id"] for vehicle in item["vehicles"]] == ["v2", "v3", "v1"]
+    assert [
+        (headway["leader_id"], headway["vehicle_id"], headway["gapMeters"])
+        for headway in item["headways"]
+    ] == [("v2", "v3", 2000), ("v3", "v1", 2000)]
+    assert item["bunched"] == 0
+
+
+def test_directions_are_reported_separately(index):
+    engine = HeadwayEngine(index)
+    engine.update(
+        snapshot(
+            index, [("v1", "A", 0, 1000), ("v2", "A", 1, 1000), ("v3", "A", 1, 4000)]
+        )
+    )
+    items = engine.route("A")
+    assert [(item["direction_id"], item["shape_id"]) for item in items] == [
+        (0, "line"),
+        (1, "back"),
+    ]
+    assert items[0]["headways"] == []
+    assert items[1]["headways"][0]["gapMeters"] == 3000
+
+
+def test_headway_seconds_use_the_observed_speed(index):
+    engine = HeadwayEngine(index)
+    engine.update(snapshot(index, [("v1", "A", 0, 1000), ("v2", "A", 0, 4000)], 1000))
+    engine.update(snapshot(index, [("v1", "A", 0, 1300), ("v2", "A", 0, 4300)], 1030))
+    [item] = engine.route("A")
+    assert item["speed"] == 10.0
+    assert item["headways"][0]["headwaySeconds"] == 300
+
+
+def test_bunching_by_distance_and_by_ratio(index):
+    engine = HeadwayEngine(index)
+    engine.update(
+        snapshot(
+            index,
+            [
+                ("v1", "A", 0, 1000),
+                ("v2", "A", 0, 3000),
+                ("v3", "A", 0, 5000),
+                ("v4", "A", 0, 7000),
+                # 300 m derrière v4 : moins du quart de l'intervalle médian (2 km)
+                ("v5", "A", 0, 6700),
+                # Moins de BUNCHING_DISTANCE derrière v1
+                ("v6", "A", 0, 1000 - BUNCHING_DISTANCE + 50),
+            ],
+        )
+    )
+    pairs = {(alert["leader_id"], alert["vehicle_id"]) for alert in engine.bunching()}
+    assert pairs == {("v4", "v5"), ("v1", "v6")}
+    assert engine.route("A")[0]["bunched"] == 2
+
+
+def test_no_bunching_at_the_terminus(index):
+    engine = HeadwayEngine(index)
+    engine.update(
+        snapshot(
+            index,
+            [
+                ("v1", "A", 0, 200),
+                ("v2", "A", 0, 100),
+                ("v3", "A", 0, 9900),
+                ("v4", "A", 0, 9850),
+            ],
+        )
+    )
+    assert engine.bunching() == []
+
+
+def test_vehicles_leaving_the_feed_are_dropped(index):
+    engine = HeadwayEngine(index)
+    engine.update(snapshot(index, [("v1", "A", 0, 1000), ("v2", "A", 0, 1100)]))
+    assert len(engine.bunching()) == 1
+    engine.update(snapshot(index, [("v1", "A", 0, 1000)], 1030))
+    assert engine.bunching() == []
+    assert len(engine.route("A")[0]["vehicles"]) == 1
+    engine.update(snapshot(index, [], 1060))
+    assert engine.route("A") == []
+    assert engine.locate("v1", 1060, 90) is None
+
+
+def test_locate_advances_along_the_shape_within_the_horizon(index):
+    engine = HeadwayEngine(index)
+    engine.update(snapshot(index, [("v1", "A", 0, 1000)], 1000))
+    engine.update(snapshot(index, [("v1", "A", 0, 1300)], 1030))
+    located = engine.locate("v1", 1040, 90)
+    assert located["distance"] == 1400
+    assert located["elapsed"] == 10
+    # Extrapolation bornée par l'horizon, puis par la longueur du tracé
+    assert engine.locate("v1", 2000, 90)["distance"] == 1300 + 10 * 90
+    engine.update(snapshot(index, [("v1", "A", 0, 9950)], 1060))
+    assert engine.locate("v1", 1090, 90)["distance"] == 10000
+
+
+def test_reads_do_not_wait_for_a_running_update(index):
+    engine = HeadwayEngine(index)
+    engine.update(snapshot(index, [("v1", "A", 0, 1000), ("v2", "A", 0, 1100)]))
+    results = []
+
+    def read():
+        results.append(
+            (engine.route("A"), engine.bunching(), engine.locate("v1", 1000, 90))
+        )
+
+    # Une mise à jour en cours dans le pool CPU tient le verrou des mises à jour
+    with engine._updating:
+        reader = threading.Thread(target=read)
+        reader.start()
+        reader.join(timeout=1)
+        assert not reader.is_alive()
+    route, bunching, located = results[0]
+    assert len(route) == 1 and len(bunching) == 1 and located["distance"] == 1000
@@ -0,0 +1,180 @@
+"""Cadence apprise des flux, essais en retard et budget de requêtes (polling.py)."""
+
+import pytest
+
+from polling import LAG_RECOVERY, UNTIMED_POLLS, FeedCadence, PollScheduler
+
+
+class Clock:
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def test_period_and_lag_are_learned_from_source_timestamps():
+    cadence = FeedCadence()
+    cadence.observe(100, True, 90)
+    assert cadence.period is None
+    assert cadence.lag == 10
+    cadence.observe(130, True, 120)
+    assert cadence.period == 30
+    assert cadence.timestamped
+
+
+def test_lag_is_a_lower_envelope():
+    cadence = FeedCadence()
+    for now, source in ((100, 90), (130, 120)):
+        cadence.observe(now, True, source)
+    # Réponse plus tardive que d'habitude : le délai remonte lentement
+    cadence.observe(165, True, 150)
+    assert cadence.lag == pytest.approx(10 + LAG_RECOVERY * 5)
+    # Réponse plus rapide : adoptée immédiatement
+    cadence.observe(186, True, 180)
+    assert cadence.lag == 6
+
+
+def test_lag_may_be_negative_when_the_source_clock_is_ahead():
+    cadence = FeedCadence()
+    cadence.observe(100, True, 105)
+    cadence.observe(130, True, 135)
+    assert cadence.lag == -5
+    assert cadence.period == 30
+
+
+def test_missed_updates_do_not_stretch_the_period():
+    cadence = FeedCadence()
+    for now, source in ((100, 90), (130, 120), (160, 150)):
+        cadence.observe(now, True, source)
+    # Deux mises à jour intermédiaires manquées (panne, budget)
+    cadence.observe(250, True, 240)
+    assert cadence.period == pytest.approx(30)
+
+
+def test_unchanged_responses_count_as_misses():
+    cadence = FeedCadence()
+    cadence.observe(100, True, 90)
+    cadence.observe(110, False, None)
+    cadence.observe(120, False, None)
+    assert cadence.misses == 2
+    assert cadence.source == 90
+    cadence.observe(130, True, 120)
+    assert cadence.misses == 0
+
+
+def test_untimed_updates_are_placed_between_two_polls():
+    cadence = FeedCadence()
+    cadence.observe(100, True, None)
+    cadence.observe(130, False, None)
+    cadence.observe(160, True, None)
+    assert cadence.source == 145
+    assert cadence.period == 45
+    assert not cadence.timestamped
+
+
+def test_unknown_period_backs_off_from_the_default_interval():
+    scheduler = PollScheduler(30)
+    assert scheduler.interval("bibus", "vehicle_positions") == 30
+    assert scheduler.observe("bibus", "open_agenda", True, None, now=0) == 30
+    assert scheduler.observe("bibus", "open_agenda", False, None, now=30) == 45
+    assert scheduler.observe("bibus", "open_agenda", False, None, now=75) == 67.5
+
+
+def test_next_poll_is_just_after_the_expected_update():
+    scheduler = PollScheduler(30)
+    scheduler.observe("bibus", "vehicle_positions", True, 90, now=100)
+    interval = scheduler.observe("bibus", "vehicle_positions", True, 120, now=130)
+    # source 120 + période 30 + délai 10 + marge 1
+    assert interval == 31
+    assert scheduler.interval("bibus", "vehicle_positions") == 31
+
+
+def test_late_updates_are_retried_with_backoff_up_to_one_period():
+    scheduler = PollScheduler(30, min_interval=5)
+    scheduler.observe("bibus", "vehicle_positions", True, 90, now=100)
+    scheduler.observe("bibus", "vehicle_positions", True, 120, now=130)
+    intervals = []
+    now = 161.0
+    for _ in range(6):
+        intervals.append(
+            scheduler.observe("bibus", "vehicle_positions", False, None, now=now)
+        )
+        now += intervals[-1]
+    assert intervals == [5, 7.5, 11.25, 16.875, 25.3125, 30]
+
+
+def test_untimed_feeds_are_polled_several_times_per_period():
+    scheduler = PollScheduler(30)
+    scheduler.observe("bibus", "open_agenda", True, None, now=0)
+    scheduler.observe("bibus", "open_agenda", False, None, now=600)
+    interval = scheduler.observe("bibus", "open_agenda", True, None, now=1200)
+    # Mise à jour estimée à 900 : période de 900 s
+    assert interval == 900 / UNTIMED_POLLS
+
+
+def test_intervals_stay_within_bounds():
+    scheduler = PollScheduler(30, min_interval=5, max_interval=900)
+    scheduler.observe("bibus", "weather_infoclimat", True, 0, now=10)
+    assert (
+        scheduler.observe("bibus", "weather_infoclimat", True, 10800, now=10810) == 900
+    )
+    scheduler.observe("bibus", "vehicle_positions", True, 0, now=1)
+    assert scheduler.observe("bibus", "vehicle_positions", True, 2, now=3) == 5
+
+
+def test_idle_networks_are_polled_at_the_night_interval():
+    scheduler = PollScheduler(30, night_interval=300)
+    scheduler.set_idle("bibus", True)
+    assert scheduler.is_idle("bibus")
+    assert (
+        scheduler.observe("bibus", "vehicle_positions", True, 0, 1, night=True) == 300
+    )
+    # Les flux sans veille (agenda, météo) gardent leur cadence
+    assert scheduler.observe("bibus", "open_agenda", True, None, 1) == 30
+    scheduler.set_idle("bibus", False)
+    assert (
+        scheduler.observe("bibus", "vehicle_positions", True, 30, 31, night=True) < 300
+    )
+
+
+def test_token_bucket_limits_requests_per_minute():
+    clock = Clock()
+    scheduler = PollScheduler(budget=60, clock=clock)
+    assert all(scheduler.acquire() for _ in range(60))
+    assert not scheduler.acquire()
+    assert scheduler.token_delay() == pytest.approx(1)
+    # Cache vide : la requête passe à découvert et retarde les suivantes
+    assert scheduler.acquire(force=True)
+    assert scheduler.token_delay() == pytest.approx(2)
+    clock.now = 2
+    assert scheduler.acquire()
+    assert not scheduler.acquire()
+
+
+def test_token_bucket_refills_up_to_the_budget():
+    clock = Clock()
+    scheduler = PollScheduler(budget=10, clock=clock)
+    for _ in range(10):
+        scheduler.acquire()
+    clock.now = 3600
+    assert sum(scheduler.acquire() for _ in range(20)) == 10
+
+
+def test_no_budget_means_no_limit():
+    scheduler = PollScheduler(budget=0)
+    assert all(scheduler.acquire() for _ in range(1000))
+    assert scheduler.token_delay() == 0
+
+
+def test_forget_drops_a_network():
+    scheduler = PollScheduler(30)
+    scheduler.observe("star", "vehicle_positions", True, 90, now=100)
+    scheduler.observe("star", "vehicle_positions", True, 120, now=130)
+    scheduler.observe("bibus", "vehicle_positions", True, 90, now=100)
+    scheduler.set_idle("star", True)
+    scheduler.forget("star")
+    assert scheduler.interval("star", "vehicle_positions") == 30
+    assert scheduler.snapshot("star", "vehicle_positions")["periodSeconds"] is None
+    assert not scheduler.is_idle("star")
+    assert scheduler.snapshot("bibus", "vehicle_positions")["lagSeconds"] == 10
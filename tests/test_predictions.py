@@ -0,0 +1,183 @@
+"""Tendance du retard, heures d'arrivée prévues et positions estimées (predictions.py)."""
+
+from collections import deque
+
+import pytest
+from google.transit import gtfs_realtime_pb2
+
+from predictions import (
+    MAX_DRIFT,
+    MAX_EXTRAPOLATION,
+    MAX_TREND,
+    ArrivalPredictor,
+    _drift,
+    _trend,
+)
+
+
+def trip_updates(timestamp, stops, trip_id="T1", vehicle_id="V1"):
+    """Capture trip_updates d'une course : (arrêt, heure ou None, retard ou None)."""
+    feed = gtfs_realtime_pb2.FeedMessage()
+    feed.header.gtfs_realtime_version = "2.0"
+    feed.header.timestamp = timestamp
+    entity = feed.entity.add()
+    entity.id = trip_id
+    tu = entity.trip_update
+    tu.trip.trip_id = trip_id
+    tu.trip.route_id = "A"
+    tu.vehicle.id = vehicle_id
+    tu.timestamp = timestamp
+    for sequence, (stop_id, time, delay) in enumerate(stops, 1):
+        stu = tu.stop_time_update.add()
+        stu.stop_id = stop_id
+        stu.stop_sequence = sequence
+        if time is not None:
+            stu.arrival.time = time
+        if delay is not None:
+            stu.arrival.delay = delay
+    return feed
+
+
+def vehicle_positions(timestamp, bearing=None, speed=None):
+    feed = gtfs_realtime_pb2.FeedMessage()
+    feed.header.gtfs_realtime_version = "2.0"
+    feed.header.timestamp = timestamp
+    entity = feed.entity.add()
+    entity.id = "V1"
+    vp = entity.vehicle
+    vp.trip.trip_id = "T1"
+    vp.trip.route_id = "A"
+    vp.position.latitude = 48.39
+    vp.position.longitude = -4.49
+    if bearing is not None:
+        vp.position.bearing = bearing
+    if speed is not None:
+        vp.position.speed = speed
+    vp.timestamp = timestamp
+    return feed
+
+
+def test_trend_needs_enough_history():
+    assert _trend(deque([(0, 0)])) == 0.0
+    assert _trend(deque([(0, 0), (10, 5)])) == 0.0
+    assert _trend(deque([(0, 0), (30, 6), (60, 12)])) == pytest.approx(0.2)
+
+
+def test_trend_is_clamped():
+    assert _trend(deque([(0, 0), (20, 200)])) == MAX_TREND
+    assert _trend(deque([(0, 200), (20, 0)])) == -MAX_TREND
+
+
+def test_drift_is_bounded_in_horizon_and_seconds():
+    assert _drift(0.1, 60) == pytest.approx(6)
+    # Passage déjà dû : aucune dérive
+    assert _drift(0.1, -60) == 0.0
+    # Une tendance bruitée n'est pas extrapolée sur une heure
+    assert _drift(0.1, 3600) == pytest.approx(30)
+    assert _drift(MAX_TREND, 3600) == MAX_DRIFT
+    assert _drift(-MAX_TREND, 3600) == -MAX_DRIFT
+
+
+def test_arrivals_follow_the_delay_trend():
+    predictor = ArrivalPredictor()
+    predictor.update_trips(trip_updates(1000, [("S1", 1100, 0), ("S2", 1300, 0)]))
+    predictor.update_trips(trip_updates(1030, [("S1", 1106, 6), ("S2", 1306, 6)]))
+    trip = predictor._trips["T1"]
+    assert trip["delay"] == 6
+    assert trip["delayTrend"] == pytest.approx(0.2)
+    # 76 s puis 276 s avant le passage, à 0.2 s de retard en plus par seconde
+    assert [arrival["predicted_arrival"] for arrival in trip["arrivals"]] == [
+        1121,
+        1361,
+    ]
+    assert [arrival["delay"] for arrival in trip["arrivals"]] == [21, 61]
+
+
+def test_far_arrivals_are_not_shifted_by_a_noisy_trend():
+    predictor = ArrivalPredictor()
+    predictor.update_trips(trip_updates(1000, [("S1", 5000, 0)]))
+    predictor.update_trips(trip_updates(1020, [("S1", 5100, 100)]))
+    [arrival] = predictor._trips["T1"]["arrivals"]
+    assert arrival["reported_arrival"] == 5100
+    assert arrival["predicted_arrival"] == 5100 + MAX_DRIFT
+
+
+def test_out_of_order_captures_do_not_enter_the_history():
+    predictor = ArrivalPredictor()
+    predictor.update_trips(trip_updates(1000, [("S1", 1100, 0)]))
+    predictor.update_trips(trip_updates(1030, [("S1", 1130, 30)]))
+    predictor.update_trips(trip_updates(1010, [("S1", 1100, 0)]))
+    assert [sample[0] for sample in predictor._delays["T1"]] == [1000, 1030]
+
+
+def test_delay_only_updates_are_kept_without_a_time():
+    predictor = ArrivalPredictor()
+    predictor.update_trips(
+        trip_updates(1000, [("S1", 1100, 60), ("S2", None, 90), ("S3", None, None)])
+    )
+    arrivals = predictor._trips["T1"]["arrivals"]
+    assert [arrival["stop_id"] for arrival in arrivals] == ["S1", "S2"]
+    assert arrivals[1]["predicted_arrival"] is None
+    assert arrivals[1]["delay"] == 90
+    # L'index par arrêt, trié par heure, ne contient que les arrivées datées
+    assert predictor.stop("S2", 0) == []
+    predictor.update_vehicles(vehicle_positions(1000))
+    next_arrivals = predictor.vehicle("V1", 1200)["nextArrivals"]
+    assert [arrival["stop_id"] for arrival in next_arrivals] == ["S2"]
+
+
+def test_stop_arrivals_are_sorted_and_upcoming():
+    predictor = ArrivalPredictor()
+    feed = trip_updates(1000, [("S1", 1300, 0)], trip_id="T1")
+    feed.entity.extend(trip_updates(1000, [("S1", 1200, 0)], trip_id="T2").entity)
+    feed.entity.extend(trip_updates(1000, [("S1", 1100, 0)], trip_id="T3").entity)
+    predictor.update_trips(feed)
+    assert [arrival["trip_id"] for arrival in predictor.stop("S1", 1000)] == [
+        "T3",
+        "T2",
+        "T1",
+    ]
+    assert [arrival["trip_id"] for arrival in predictor.stop("S1", 1150)] == [
+        "T2",
+        "T1",
+    ]
+    assert len(predictor.stop("S1", 1000, limit=1)) == 1
+    assert predictor.stop("unknown", 1000) == []
+
+
+def test_finished_trips_are_forgotten():
+    predictor = ArrivalPredictor()
+    predictor.update_trips(trip_updates(1000, [("S1", 1100, 0)]))
+    predictor.update_trips(trip_updates(1030, [("S1", 1200, 0)], trip_id="T2"))
+    assert set(predictor._delays) == {"T2"}
+    assert [arrival["trip_id"] for arrival in predictor.stop("S1", 0)] == ["T2"]
+
+
+def test_vehicle_position_follows_bearing_and_speed():
+    predictor = ArrivalPredictor()
+    predictor.update_vehicles(vehicle_positions(1000, bearing=90, speed=10))
+    predicted = predictor.vehicle("V1", 1010)
+    assert predicted["method"] == "heading"
+    assert predicted["latitude"] == pytest.approx(48.39)
+    assert predicted["longitude"] > -4.49
+    # Au-delà de MAX_EXTRAPOLATION, le véhicule n'avance plus
+    far = predictor.vehicle("V1", 1000 + 10 * MAX_EXTRAPOLATION)
+    assert far["extrapolatedSeconds"] == MAX_EXTRAPOLATION
+    assert (
+        far["longitude"]
+        == predictor.vehicle("V1", 1000 + MAX_EXTRAPOLATION)["longitude"]
+    )
+
+
+def test_vehicle_without_heading_stays_at_its_last_position():
+    predictor = ArrivalPredictor()
+    predictor.update_vehicles(vehicle_positions(1000))
+    predicted = predictor.vehicle("V1", 1030)
+    assert predicted["method"] == "last_position"
+    last = predicted["lastPosition"]
+    assert (predicted["latitude"], predicted["longitude"]) == (
+        round(last["latitude"], 6),
+        round(last["longitude"], 6),
+    )
+    assert predicted["ageSeconds"] == 30
+    assert predictor.vehicle("unknown", 1030) is None
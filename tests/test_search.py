@@ -0,0 +1,192 @@
+"""Normalisation, racinisation et classement BM25 (search.py)."""
+
+import pytest
+from google.transit import gtfs_realtime_pb2
+
+from search import (
+    MAX_EXPANSIONS,
+    SearchIndex,
+    analyze,
+    fold,
+    index_alerts,
+    index_events,
+    stem,
+)
+
+
+def index(*documents, weights=None):
+    """Index de documents (id, textes par champ)."""
+    weights = weights or {"header": 3.0, "description": 1.0}
+    return SearchIndex(
+        (({"id": doc_id}, fields) for doc_id, fields in documents), weights
+    )
+
+
+def ids(results):
+    return [result["id"] for result in results]
+
+
+def test_fold_removes_case_accents_and_ligatures():
+    assert fold("Déviée à CŒUR ÉCLATÉ") == "deviee a coeur eclate"
+    assert fold("l’arrêt") == "l'arret"
+
+
+@pytest.mark.parametrize(
+    "words",
+    [
+        ("travaux", "travail"),
+        ("déviation", "dévié", "déviée", "Déviées"),
+        ("perturbation", "perturbations", "perturbé"),
+        ("réduit", "réduite"),
+        ("sportif", "sportive"),
+        ("dangereux", "dangereuse"),
+        ("journal", "journaux"),
+        ("arrêt", "arrêts"),
+    ],
+)
+def test_inflections_share_a_stem(words):
+    assert len({analyze(word) for word in words}) == 1
+
+
+@pytest.mark.parametrize(
+    "first, second",
+    [("ligne", "lieu"), ("arrêt", "arrière"), ("travaux", "trajet"), ("gare", "gaz")],
+)
+def test_unrelated_words_keep_distinct_stems(first, second):
+    assert analyze(first) != analyze(second)
+
+
+def test_short_words_and_numbers_are_not_stemmed():
+    assert stem("bus") == "bus"
+    assert stem("2024") == "2024"
+    assert stem("tess") == "tess"
+
+
+def test_analyze_drops_stopwords_and_punctuation():
+    assert analyze("Travaux sur la ligne A, arrêt Recouvrance") == (
+        "trava",
+        "lign",
+        "arret",
+        "recouvranc",
+    )
+    assert analyze(None) == ()
+    assert analyze("") == ()
+
+
+def test_query_matches_regardless_of_accents_and_inflection():
+    search = index(("d1", {"header": ["Arrêts déviés"], "description": []}))
+    assert ids(search.search("arret deviation")) == ["d1"]
+    assert search.search("arret deviation")[0]["matched"] == ["arret", "devi"]
+
+
+def test_unknown_terms_expand_by_prefix():
+    search = index(
+        ("d1", {"header": ["Recouvrance"], "description": []}),
+        ("d2", {"header": ["Recteur"], "description": []}),
+    )
+    assert ids(search.search("recouv")) == ["d1"]
+    assert set(ids(search.search("rec"))) == {"d1", "d2"}
+    # Préfixe trop court : aucune expansion
+    assert search.search("re") == []
+
+
+def test_prefix_expansion_is_bounded():
+    search = index(
+        *(
+            (f"d{i}", {"header": [f"station{i:03d}"], "description": []})
+            for i in range(MAX_EXPANSIONS + 5)
+        )
+    )
+    assert len(search.search("station", limit=100)) == MAX_EXPANSIONS
+
+
+def test_documents_matching_more_terms_rank_first():
+    search = index(
+        ("tram", {"header": ["Tram tram tram tram"], "description": []}),
+        ("both", {"header": ["Bus"], "description": ["Tram et bus perturbés"]}),
+    )
+    assert ids(search.search("tram bus")) == ["both", "tram"]
+
+
+def test_header_weighs_more_than_description():
+    search = index(
+        ("description", {"header": ["Information"], "description": ["Grève"]}),
+        ("header", {"header": ["Grève"], "description": ["Information"]}),
+    )
+    assert ids(search.search("grève")) == ["header", "description"]
+
+
+def test_shorter_documents_rank_higher_for_the_same_frequency():
+    search = index(
+        ("long", {"header": ["Grève"], "description": ["un deux trois quatre cinq"]}),
+        ("short", {"header": ["Grève"], "description": []}),
+    )
+    results = search.search("grève")
+    assert ids(results) == ["short", "long"]
+    assert results[0]["score"] > results[1]["score"]
+
+
+def test_rare_terms_score_higher():
+    search = index(
+        ("d1", {"header": ["Travaux Siam"], "description": []}),
+        ("d2", {"header": ["Travaux Jaurès"], "description": []}),
+        ("d3", {"header": ["Travaux Jaurès"], "description": []}),
+    )
+    scores = {result["id"]: result["score"] for result in search.search("siam travaux")}
+    assert scores["d1"] > scores["d2"] == scores["d3"]
+
+
+def test_limit_and_empty_queries():
+    search = index(
+        *((f"d{i}", {"header": ["Bus"], "description": []}) for i in range(5))
+    )
+    assert len(search.search("bus", limit=2)) == 2
+    assert search.search("bus", limit=-1) == []
+    assert search.search("le la les") == []
+    assert len(index()) == 0
+    assert index().search("bus") == []
+
+
+def test_index_alerts_covers_every_translation():
+    feed = gtfs_realtime_pb2.FeedMessage()
+    feed.header.gtfs_realtime_version = "2.0"
+    entity = feed.entity.add()
+    entity.id = "a1"
+    alert = entity.alert
+    for language, text in (("en", "Roadworks"), ("fr", "Travaux")):
+        translation = alert.header_text.translation.add()
+        translation.language = language
+        translation.text = text
+    alert.informed_entity.add().route_id = "A"
+    feed.entity.add().id = "vehicle-only"
+    search = index_alerts(feed)
+    assert len(search) == 1
+    [result] = search.search("roadworks")
+    assert result["header"] == "Travaux"
+    assert result["routes"] == ["A"]
+    assert ids(search.search("travail")) == ["a1"]
+
+
+def test_index_events_reads_multilingual_fields():
+    search = index_events(
+        {
+            "events": [
+                {
+                    "uid": 1,
+                    "title": {"fr": "Fête de la musique", "en": "Music day"},
+                    "description": {"fr": "Concerts gratuits"},
+                    "location": {"name": "Place de la Liberté", "address": "Brest"},
+                    "timings": [
+                        {"begin": "2025-06-21T18:00", "end": "2025-06-21T23:00"}
+                    ],
+                },
+                {"uid": 2, "title": "Marché de Noël"},
+            ]
+        }
+    )
+    [result] = search.search("liberte concert")
+    assert result["id"] == 1
+    assert result["title"] == "Fête de la musique"
+    assert result["start_time"] == "2025-06-21T18:00"
+    assert ids(search.search("music")) == [1]
+    assert ids(search.search("noel")) == [2]
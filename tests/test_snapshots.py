@@ -0,0 +1,32 @@
+"""Publication et relecture des instantanés partagés (snapshots.py)."""
+
+from snapshots import KIND_JSON, KIND_PROTOBUF, SnapshotStore
+
+
+def test_publish_increments_the_version(tmp_path):
+    store = SnapshotStore(tmp_path)
+    assert store.publish("bibus", "vehicle_positions", b"v1", KIND_PROTOBUF, 10) == 1
+    assert store.publish("bibus", "vehicle_positions", b"v2", KIND_PROTOBUF, 20) == 2
+    snapshot = SnapshotStore(tmp_path).read("bibus", "vehicle_positions")
+    assert (snapshot.version, snapshot.fetched_at) == (2, 20)
+    assert bytes(snapshot.payload) == b"v2"
+
+
+def test_touch_keeps_the_version_and_updates_the_date(tmp_path):
+    store = SnapshotStore(tmp_path)
+    store.publish("bibus", "open_agenda", b"{}", KIND_JSON, 10)
+    assert store.touch("bibus", "open_agenda", b"{}", KIND_JSON, 40) == 1
+    snapshot = store.read("bibus", "open_agenda")
+    assert (snapshot.version, snapshot.fetched_at) == (1, 40)
+
+
+def test_refresh_only_updates_the_date(tmp_path):
+    store = SnapshotStore(tmp_path)
+    assert store.refresh("bibus", "trip_updates", 10) is None
+    store.publish("bibus", "trip_updates", b"capture", KIND_PROTOBUF, 10)
+    reader = SnapshotStore(tmp_path)
+    assert reader.read("bibus", "trip_updates").fetched_at == 10
+    assert store.refresh("bibus", "trip_updates", 70) == 1
+    snapshot = reader.read("bibus", "trip_updates")
+    assert (snapshot.version, snapshot.fetched_at) == (1, 70)
+    assert (snapshot.kind, bytes(snapshot.payload)) == (KIND_PROTOBUF, b"capture")
@@ -1,22 +1,28 @@
 import asyncio
+import time
 from typing import Optional
 from contextlib import AsyncExitStack
 
 from mcp import ClientSession, StdioServerParameters
 from mcp.client.stdio import stdio_client
 
-from anthropic import Anthropic
+from anthropic import AsyncAnthropic
 from dotenv import load_dotenv
 
 load_dotenv()  # load environment variables from .env
 
+MODEL = "claude-3-5-sonnet-20241022"
+# Model turns allowed to request tools before the answer is returned as is
+MAX_TOOL_ROUNDS = 5
+
 
 class MCPClient:
     def __init__(self):
         # Initialize session and client objects
         self.session: Optional[ClientSession] = None
         self.exit_stack = AsyncExitStack()
-        self.anthropic = Anthropic()
+        self.anthropic = AsyncAnthropic()
+        self.tools: list = []
 
     async def connect_to_server(self, server_script_path: str):
         """Connect to an MCP server
@@ -48,59 +54,91 @@ class MCPClient:
         response = await self.session.list_tools()
         tools = response.tools
         print("\nConnected to server with tools:", [tool.name for tool in tools])
-
-    async def process_query(self, query: str) -> str:
-        """Process a query using Claude and available tools"""
-        messages = [{"role": "user", "content": query}]
-
-        response = await self.session.list_tools()
-        available_tools = [
+        # Listed once for the whole session
+        self.tools = [
             {
                 "name": tool.name,
                 "description": tool.description,
                 "input_schema": tool.inputSchema,
             }
-            for tool in response.tools
+            for tool in tools
         ]
 
-        # Initial Claude API call
-        response = self.anthropic.messages.create(
-            model="claude-3-5-sonnet-20241022",
-            max_tokens=1000,
-            messages=messages,
-            tools=available_tools,
-        )
+    async def call_tool(self, content) -> tuple[dict, float]:
+        """Run one tool_use block, return its tool_result block and duration"""
+        started = time.perf_counter()
+        try:
+            result = await self.session.call_tool(content.name, content.input)
+            blocks = [
+                {"type": "text", "text": item.text}
+                for item in result.content
+                if item.type == "text"
+            ]
+            is_error = result.isError
+        except Exception as e:
+            blocks = [{"type": "text", "text": f"Tool call failed: {e}"}]
+            is_error = True
+        tool_result = {
+            "type": "tool_result",
+            "tool_use_id": content.id,
+            "content": blocks,
+            "is_error": is_error,
+        }
+        return tool_result, time.perf_counter() - started
 
-        # Process response and handle tool calls
-        tool_results = []
+    async def process_query(self, query: str) -> str:
+        """Process a query using Claude and available tools"""
+        messages = [{"role": "user", "content": query}]
         final_text = []
-
-        for content in response.content:
-            if content.type == "text":
-                final_text.append(content.text)
-            elif content.type == "tool_use":
-                tool_name = content.name
-                tool_args = content.input
-
-                # Execute tool call
-                result = await self.session.call_tool(tool_name, tool_args)
-                tool_results.append({"call": tool_name, "result": result})
-                final_text.append(f"[Calling tool {tool_name} with args {tool_args}]")
-
-                # Continue conversation with tool results
-                if hasattr(content, "text") and content.text:
-                    messages.append({"role": "assistant", "content": content.text})
-                messages.append({"role": "user", "content": result.content})
-
-                # Get next response from Claude
-                response = self.anthropic.messages.create(
-                    model="claude-3-5-sonnet-20241022",
-                    max_tokens=1000,
-                    messages=messages,
+        timings = []
+        started = time.perf_counter()
+
+        for round_number in range(1, MAX_TOOL_ROUNDS + 2):
+            model_started = time.perf_counter()
+            response = await self.anthropic.messages.create(
+                model=MODEL,
+                max_tokens=1000,
+                messages=messages,
+                tools=self.tools,
+            )
+            timings.append(
+                f"model #{round_number}: {time.perf_counter() - model_started:.2f}s"
+            )
+
+            tool_uses = []
+            for content in response.content:
+                if content.type == "text":
+                    final_text.append(content.text)
+                elif content.type == "tool_use":
+                    tool_uses.append(content)
+                    final_text.append(
+                        f"[Calling tool {content.name} with args {content.input}]"
+                    )
+            if response.stop_reason != "tool_use" or round_number > MAX_TOOL_ROUNDS:
+                break
+
+            # Independent calls of the same turn run concurrently on the session
+            tools_started = time.perf_counter()
+            results = await asyncio.gather(
+                *(self.call_tool(content) for content in tool_uses)
+            )
+            timings.append(
+                f"tools #{round_number}: {time.perf_counter() - tools_started:.2f}s ("
+                + ", ".join(
+                    f"{content.name} {duration:.2f}s"
+                    for content, (_, duration) in zip(tool_uses, results)
                 )
+                + ")"
+            )
 
-                final_text.append(response.content[0].text)
+            # All results go back in a single follow-up message
+            messages.append({"role": "assistant", "content": response.content})
+            messages.append(
+                {"role": "user", "content": [tool_result for tool_result, _ in results]}
+            )
 
+        timings.append(f"total: {time.perf_counter() - started:.2f}s")
+        final_text.append("\n[Timing] " + " | ".join(timings))
         return "\n".join(final_text)
 
     async def chat_loop(self):
@@ -110,7 +148,8 @@ class MCPClient:
 
         while True:
             try:
-                query = input("\nQuery: ").strip()
+                # Read in a thread so the session stays serviced while waiting
+                query = (await asyncio.to_thread(input, "\nQuery: ")).strip()
 
                 if query.lower() == "quit":
                     break
@@ -1,62 +1,58 @@
 # Create server parameters for stdio connection
 import asyncio
-from mcp import ClientSession, StdioServerParameters
-from mcp.client.stdio import stdio_client
+import os
+import sys
 
-from langchain_mcp_adapters.tools import load_mcp_tools
 from langgraph.prebuilt import create_react_agent
 from langchain_openai import AzureChatOpenAI
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "agent"))
+from mcp_pool import MCPSessionPool  # noqa: E402
 
-async def process_query(query: str):
-    server_params = StdioServerParameters(
-        command="python",
-        # Make sure to update to the full absolute path to your math_server.py file
-        args=["src/server.py"],
-    )
 
-    async with stdio_client(server_params) as (read, write):
-        async with ClientSession(read, write) as session:
-            # Initialize the connection
-            await session.initialize()
+async def process_query(agent, query: str):
+    # Create and run the agent
+    agent_response = await agent.ainvoke({"messages": query})
+    print(agent_response)
+    return agent_response
 
-            # Get tools
-            tools = await load_mcp_tools(session)
-            model = AzureChatOpenAI(azure_deployment="gpt-4o-mini")  # Azure deployment name
-            # Create and run the agent
-            agent = create_react_agent(model, tools)
-            agent_response = await agent.ainvoke({"messages": query})
-            print(agent_response)
-            return agent_response
 
-
-async def chat_loop():
+async def chat_loop(server_script: str):
     """Run an interactive chat loop"""
+    # One server subprocess, tool list and agent for the whole loop: the pool
+    # restarts the server and retries the call if the session drops
+    pool = MCPSessionPool("stdio", size=1, server_script=server_script)
+    tools = await pool.get_tools()
+    model = AzureChatOpenAI(azure_deployment="gpt-4o-mini")  # Azure deployment name
+    agent = create_react_agent(model, tools)
+
     print("\nMCP Client Started!")
     print("Type your queries or 'quit' to exit.")
 
-    while True:
-        try:
-            query = input("\nQuery: ").strip()
+    try:
+        while True:
+            try:
+                # Read in a thread so the session stays serviced while waiting
+                query = (await asyncio.to_thread(input, "\nQuery: ")).strip()
 
-            if query.lower() == "quit":
-                break
+                if query.lower() == "quit":
+                    break
 
-            response = await process_query(query)
-            print("\n" + response["messages"][-1].content)
+                response = await process_query(agent, query)
+                print("\n" + response["messages"][-1].content)
 
-        except Exception as e:
-            print(f"\nError: {str(e)}")
+            except Exception as e:
+                print(f"\nError: {str(e)}")
+    finally:
+        await pool.close()
 
 
 async def main():
     if len(sys.argv) < 2:
         print("Usage: python client.py <path_to_server_script>")
         sys.exit(1)
-    await chat_loop()
+    await chat_loop(sys.argv[1])
 
 
 if __name__ == "__main__":
-    import sys
-
     asyncio.run(main())
@@ -0,0 +1,97 @@
+"""Enregistre les réponses des flux amont (GTFS-RT, Open Agenda, météo) sur disque.
+
+Chaque réponse est horodatée dans `index.jsonl` ; les corps sont stockés une
+seule fois par contenu (`<réseau>/<flux>/<sha256>.bin`). Le dossier produit est
+rejoué par `tools/feed_replay.py`.
+
+Usage :
+    uv run python tools/feed_recorder.py captures/ --interval 30 --duration 3600
+    uv run python tools/feed_recorder.py captures/ --networks bibus --feeds vehicle_positions
+"""
+
+import argparse
+import hashlib
+import json
+import sys
+import time
+from pathlib import Path
+
+import requests
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.server import NETWORK_URLS
+
+# Le GTFS statique (ZIP de plusieurs Mo) n'évolue pas pendant un enregistrement
+DEFAULT_EXCLUDED_FEEDS = {"gtfs_static"}
+RECORDED_HEADERS = ("content-type", "last-modified", "etag", "cache-control")
+
+
+def record_once(session: requests.Session, out: Path, targets: list, index) -> None:
+    """Interroge chaque flux une fois et ajoute les réponses à l'index."""
+    for network, feed_type, url in targets:
+        started = time.time()
+        entry = {"t": started, "network": network, "feed_type": feed_type}
+        try:
+            response = session.get(url, timeout=10)
+            body = response.content
+            digest = hashlib.sha256(body).hexdigest()
+            path = out / network / feed_type / f"{digest}.bin"
+            if not path.exists():
+                path.parent.mkdir(parents=True, exist_ok=True)
+                path.write_bytes(body)
+            entry.update(
+                {
+                    "status": response.status_code,
+                    "elapsed_ms": round((time.time() - started) * 1000, 1),
+                    "size": len(body),
+                    "sha256": digest,
+                    "file": str(path.relative_to(out)),
+                    "headers": {
+                        name: response.headers[name]
+                        for name in RECORDED_HEADERS
+                        if name in response.headers
+                    },
+                }
+            )
+            print(f"{network}/{feed_type}: {response.status_code} {len(body)} bytes")
+        except requests.RequestException as e:
+            entry.update({"status": None, "error": str(e)})
+            print(f"{network}/{feed_type}: {e}", file=sys.stderr)
+        index.write(json.dumps(entry) + "\n")
+        index.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("out", type=Path, help="dossier de capture")
+    parser.add_argument("--networks", nargs="+", default=list(NETWORK_URLS))
+    parser.add_argument("--feeds", nargs="+", help="types de flux (défaut : tous)")
+    parser.add_argument("--interval", type=float, default=30, help="secondes")
+    parser.add_argument("--duration", type=float, help="secondes (défaut : infini)")
+    args = parser.parse_args()
+
+    targets = [
+        (network, feed_type, url)
+        for network in args.networks
+        for feed_type, url in NETWORK_URLS[network].items()
+        if (
+            feed_type in args.feeds
+            if args.feeds
+            else feed_type not in DEFAULT_EXCLUDED_FEEDS
+        )
+    ]
+    args.out.mkdir(parents=True, exist_ok=True)
+    deadline = time.time() + args.duration if args.duration else None
+    with requests.Session() as session, open(args.out / "index.jsonl", "a") as index:
+        while deadline is None or time.time() < deadline:
+            started = time.time()
+            record_once(session, args.out, targets, index)
+            time.sleep(max(0.0, args.interval - (time.time() - started)))
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        pass
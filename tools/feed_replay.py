@@ -0,0 +1,177 @@
+"""Rejoue des flux enregistrés par `tools/feed_recorder.py` via HTTP.
+
+Le serveur expose `GET /<réseau>/<flux>` et sert, pour chaque requête, la
+dernière capture antérieure à l'horloge virtuelle du rejeu. L'horloge démarre
+à la première capture et avance à `--speed` fois le temps réel. Latence,
+erreurs 503 et réponses 304 peuvent être injectées (tirages reproductibles
+avec `--seed`).
+
+Pour y brancher le serveur MCP :
+    FEED_REPLAY_URL=http://localhost:8765 uv run python src/server.py
+
+Usage :
+    uv run python tools/feed_replay.py captures/ --speed 10 --loop
+    uv run python tools/feed_replay.py captures/ --latency-ms 200 --error-rate 0.05
+"""
+
+import argparse
+import bisect
+import json
+import random
+import threading
+import time
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+
+class Replay:
+    """Captures d'un dossier, indexées par (réseau, flux) et triées par date."""
+
+    def __init__(self, root: Path, speed: float, loop: bool):
+        self.root = root
+        self.speed = speed
+        self.loop = loop
+        self.captures: dict[tuple[str, str], list[dict]] = {}
+        with open(root / "index.jsonl") as index:
+            for line in index:
+                entry = json.loads(line)
+                if entry.get("status") != 200:
+                    continue
+                key = (entry["network"], entry["feed_type"])
+                self.captures.setdefault(key, []).append(entry)
+        for entries in self.captures.values():
+            entries.sort(key=lambda e: e["t"])
+        times = [e["t"] for entries in self.captures.values() for e in entries]
+        if not times:
+            raise SystemExit(f"No successful capture in {root / 'index.jsonl'}")
+        self.first, self.last = min(times), max(times)
+        self.started = time.monotonic()
+
+    def virtual_time(self) -> float:
+        elapsed = (time.monotonic() - self.started) * self.speed
+        span = self.last - self.first
+        if self.loop and span > 0:
+            elapsed %= span
+        return self.first + elapsed
+
+    def lookup(self, network: str, feed_type: str) -> dict | None:
+        entries = self.captures.get((network, feed_type))
+        if not entries:
+            return None
+        times = [e["t"] for e in entries]
+        position = bisect.bisect_right(times, self.virtual_time())
+        return entries[max(0, position - 1)]
+
+
+class Faults:
+    """Latence, erreurs et 304 injectés, tirés d'un générateur partagé."""
+
+    def __init__(self, args: argparse.Namespace):
+        self.latency = args.latency_ms / 1000
+        self.jitter = args.jitter_ms / 1000
+        self.error_rate = args.error_rate
+        self.not_modified_rate = args.not_modified_rate
+        self._random = random.Random(args.seed)
+        self._lock = threading.Lock()
+
+    def draw(self) -> tuple[float, float]:
+        with self._lock:
+            delay = self.latency + self._random.uniform(0, self.jitter)
+            return delay, self._random.random()
+
+
+def make_handler(replay: Replay, faults: Faults):
+    class ReplayHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.rstrip("/") == "":
+                return self._send_json(
+                    {
+                        "feeds": sorted("/".join(key) for key in replay.captures),
+                        "virtual_time": replay.virtual_time(),
+                        "first": replay.first,
+                        "last": replay.last,
+                    }
+                )
+            parts = self.path.split("?")[0].strip("/").split("/")
+            entry = replay.lookup(*parts) if len(parts) == 2 else None
+            if entry is None:
+                return self.send_error(404, "Unknown feed")
+
+            delay, draw = faults.draw()
+            time.sleep(delay)
+            if draw < faults.error_rate:
+                return self.send_error(503, "Injected error")
+            etag = f'"{entry["sha256"]}"'
+            if (
+                draw < faults.error_rate + faults.not_modified_rate
+                or self.headers.get("If-None-Match") == etag
+            ):
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.end_headers()
+                return
+
+            body = (replay.root / entry["file"]).read_bytes()
+            headers = entry.get("headers", {})
+            self.send_response(200)
+            self.send_header(
+                "Content-Type", headers.get("content-type", "application/octet-stream")
+            )
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header(
+                "Last-Modified",
+                headers.get("last-modified", formatdate(entry["t"], usegmt=True)),
+            )
+            self.send_header("ETag", etag)
+            self.send_header("X-Replay-Captured-At", str(entry["t"]))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _send_json(self, payload: dict):
+            body = json.dumps(payload).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return ReplayHandler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("captures", type=Path, help="dossier produit par feed_recorder")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--speed", type=float, default=1.0, help="accélération")
+    parser.add_argument("--loop", action="store_true", help="reboucle à la fin")
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="part de 503")
+    parser.add_argument(
+        "--not-modified-rate", type=float, default=0.0, help="part de 304"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    replay = Replay(args.captures, args.speed, args.loop)
+    server = ThreadingHTTPServer(
+        (args.host, args.port), make_handler(replay, Faults(args))
+    )
+    print(
+        f"Replaying {len(replay.captures)} feeds at {args.speed}x on "
+        f"http://{args.host}:{args.port} "
+        f"(FEED_REPLAY_URL=http://{args.host}:{args.port})"
+    )
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
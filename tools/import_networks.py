@@ -0,0 +1,133 @@
+"""Génère un registre de réseaux (TOML) à partir du catalogue transport.data.gouv.fr.
+
+Chaque jeu de données qui publie au moins une ressource GTFS-RT devient un
+réseau, identifié par le slug du jeu de données. Les flux sont repérés par les
+fonctionnalités détectées par la plateforme (`features`) ou, à défaut, par le
+titre et l'URL de la ressource ; un flux GTFS-RT combiné est utilisé pour
+chacun des types qu'il contient. Le fichier produit est lu par le serveur via
+`MCP_NETWORKS_FILE`.
+
+Le catalogue ne donne pas la région d'un jeu de données : `--region` s'applique
+à tous les réseaux importés et n'est donc accepté qu'avec `--match`. Les
+identifiants importés sont des slugs de jeux de données ; `NETWORK` doit
+désigner l'un d'eux (ils sont listés sur la sortie d'erreur).
+
+Usage :
+    uv run python tools/import_networks.py > networks.toml
+    uv run python tools/import_networks.py --region bretagne --match rennes brest
+    MCP_NETWORKS_FILE=networks.toml NETWORK=<identifiant> uv run python src/server.py
+"""
+
+import argparse
+import json
+import re
+import sys
+
+import requests
+
+DATASETS_URL = "https://transport.data.gouv.fr/api/datasets"
+REALTIME_FEEDS = ("vehicle_positions", "trip_updates", "service_alerts")
+# Mots-clés des titres et URLs de ressources sans `features`
+KEYWORDS = {
+    "vehicle_positions": ("vehicle", "position"),
+    "trip_updates": ("trip", "update"),
+    "service_alerts": ("alert",),
+}
+
+
+def realtime_feeds(resource: dict) -> list:
+    """Types de flux GTFS-RT d'une ressource."""
+    features = [
+        feature for feature in resource.get("features") or [] if feature in KEYWORDS
+    ]
+    if features:
+        return features
+    text = f"{resource.get('title', '')} {resource.get('url', '')}".lower()
+    return [
+        feed_type
+        for feed_type, words in KEYWORDS.items()
+        if any(word in text for word in words)
+    ]
+
+
+def network_entry(dataset: dict, static: bool) -> dict:
+    """URLs des flux d'un jeu de données (vide s'il n'a pas de GTFS-RT)."""
+    entry = {}
+    for resource in dataset.get("resources") or []:
+        format_ = (resource.get("format") or "").lower()
+        url = resource.get("url")
+        if not url:
+            continue
+        if format_ == "gtfs-rt":
+            for feed_type in realtime_feeds(resource):
+                entry.setdefault(feed_type, url)
+        elif format_ == "gtfs" and static:
+            entry.setdefault("gtfs_static", url)
+    if not any(feed_type in entry for feed_type in REALTIME_FEEDS):
+        return {}
+    return entry
+
+
+def network_id(dataset: dict) -> str:
+    slug = dataset.get("slug") or str(dataset.get("id", ""))
+    return re.sub(r"[^a-z0-9-]+", "-", slug.lower()).strip("-")
+
+
+def to_toml(networks: dict) -> str:
+    """Tables `[networks.<id>]` ; les chaînes JSON sont des chaînes TOML valides."""
+    lines = []
+    for network, entry in networks.items():
+        lines.append(f"[networks.{json.dumps(network)}]")
+        for key, value in entry.items():
+            lines.append(f"{key} = {json.dumps(value, ensure_ascii=False)}")
+        lines.append("")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default=DATASETS_URL)
+    parser.add_argument(
+        "--match",
+        nargs="*",
+        default=[],
+        help="ne garder que les jeux de données dont le titre ou le slug contient "
+        "l'un de ces mots",
+    )
+    parser.add_argument(
+        "--region",
+        help="région associée aux réseaux importés (tous : à combiner avec --match)",
+    )
+    parser.add_argument(
+        "--no-static", action="store_true", help="ne pas inclure le GTFS statique"
+    )
+    args = parser.parse_args()
+    if args.region and not args.match:
+        parser.error("--region applies to every imported network: use it with --match")
+
+    response = requests.get(args.url, timeout=60)
+    response.raise_for_status()
+    datasets = response.json()
+    words = [word.lower() for word in args.match]
+    networks = {}
+    for dataset in datasets:
+        title = dataset.get("title") or ""
+        identifier = network_id(dataset)
+        if words and not any(word in f"{title} {identifier}".lower() for word in words):
+            continue
+        entry = network_entry(dataset, static=not args.no_static)
+        if not entry or not identifier:
+            continue
+        metadata = {"name": title or identifier}
+        if args.region:
+            metadata["region"] = args.region
+        networks[identifier] = {**metadata, **entry}
+    print(to_toml(networks), end="")
+    print(
+        f"{len(networks)} networks with GTFS-RT feeds: {', '.join(networks)}",
+        file=sys.stderr,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""Générateur de charge pour le transport SSE du serveur MCP.
+
+Ouvre N sessions MCP concurrentes sur `/sse` et rejoue un mélange réaliste
+d'appels d'outils et de lectures de ressources, puis affiche le débit et les
+latences p50/p95/p99 par opération. Plusieurs valeurs de `--sessions`
+enchaînent des paliers pour repérer le point de saturation.
+
+Usage :
+    uv run python tools/load_test.py --url http://localhost:3001/sse --sessions 1 10 50
+    uv run python tools/load_test.py --duration 60 --think-ms 200 --json results.json
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+
+from mcp import ClientSession
+from mcp.client.sse import sse_client
+
+# Poids relatifs des opérations d'une session d'agent typique
+DEFAULT_MIX = {
+    "tool:get_vehicles": 3,
+    "tool:get_vehicle": 4,
+    "tool:get_route_delays": 3,
+    "resource:gtfs://vehicles": 1,
+    "resource:gtfs://route/{route_id}": 2,
+    "resource:gtfs://network/stats": 1,
+}
+
+
+def percentile(samples: list[float], q: float) -> float:
+    """Percentile par rang le plus proche (samples triés)."""
+    if not samples:
+        return 0.0
+    rank = max(0, min(len(samples) - 1, round(q / 100 * len(samples)) - 1))
+    return samples[rank]
+
+
+async def discover(url: str) -> tuple[list[str], list[str]]:
+    """Récupère des identifiants de véhicules et de lignes réels."""
+    async with sse_client(url) as (read, write):
+        async with ClientSession(read, write) as session:
+            await session.initialize()
+            result = await session.call_tool("get_vehicles", {})
+    vehicles = json.loads(result.content[0].text).get("data", [])
+    vehicle_ids = [str(v["vehicle_id"]) for v in vehicles if v.get("vehicle_id")]
+    route_ids = sorted({v["route_id"] for v in vehicles if v.get("route_id")})
+    if not vehicle_ids or not route_ids:
+        raise SystemExit("The server returned no vehicle, nothing to replay")
+    return vehicle_ids, route_ids
+
+
+async def run_operation(session: ClientSession, op: str, rng, vehicles, routes):
+    kind, name = op.split(":", 1)
+    if kind == "resource":
+        return await session.read_resource(name.format(route_id=rng.choice(routes)))
+    arguments = {}
+    if name == "get_vehicle":
+        arguments = {"vehicle_id": rng.choice(vehicles)}
+    elif name == "get_route_delays":
+        arguments = {"route_id": rng.choice(routes)}
+    result = await session.call_tool(name, arguments)
+    if result.isError:
+        raise RuntimeError(result.content[0].text if result.content else "tool error")
+    return result
+
+
+async def client(
+    url: str, worker: int, args, vehicles, routes, deadline: float, samples: dict
+):
+    rng = random.Random(args.seed + worker)
+    ops, weights = zip(*args.mix.items())
+    async with sse_client(url, timeout=30) as (read, write):
+        async with ClientSession(read, write) as session:
+            await session.initialize()
+            while time.perf_counter() < deadline:
+                op = rng.choices(ops, weights)[0]
+                started = time.perf_counter()
+                try:
+                    await run_operation(session, op, rng, vehicles, routes)
+                    samples.setdefault(op, []).append(time.perf_counter() - started)
+                except Exception:
+                    samples.setdefault(f"{op} (error)", []).append(
+                        time.perf_counter() - started
+                    )
+                if args.think_ms:
+                    await asyncio.sleep(rng.expovariate(1000 / args.think_ms))
+
+
+async def run_step(url: str, sessions: int, args, vehicles, routes) -> dict:
+    samples: dict[str, list[float]] = {}
+    started = time.perf_counter()
+    deadline = started + args.duration
+    results = await asyncio.gather(
+        *(
+            client(url, n, args, vehicles, routes, deadline, samples)
+            for n in range(sessions)
+        ),
+        return_exceptions=True,
+    )
+    elapsed = time.perf_counter() - started
+    failed = [r for r in results if isinstance(r, BaseException)]
+    report = {"sessions": sessions, "failed_sessions": len(failed), "ops": {}}
+    for op, latencies in sorted(samples.items()):
+        latencies.sort()
+        report["ops"][op] = {
+            "count": len(latencies),
+            "throughput": len(latencies) / elapsed,
+            "p50_ms": percentile(latencies, 50) * 1000,
+            "p95_ms": percentile(latencies, 95) * 1000,
+            "p99_ms": percentile(latencies, 99) * 1000,
+        }
+    total = sum(len(latencies) for latencies in samples.values())
+    report["throughput"] = total / elapsed
+    return report
+
+
+def print_report(report: dict):
+    print(
+        f"\n== {report['sessions']} sessions - {report['throughput']:.1f} ops/s"
+        f" ({report['failed_sessions']} failed sessions)"
+    )
+    print(
+        f"{'operation':<42} {'count':>7} {'ops/s':>8} {'p50':>9} {'p95':>9} {'p99':>9}"
+    )
+    for op, stats in report["ops"].items():
+        print(
+            f"{op:<42} {stats['count']:>7} {stats['throughput']:>8.1f}"
+            f" {stats['p50_ms']:>7.1f}ms {stats['p95_ms']:>7.1f}ms"
+            f" {stats['p99_ms']:>7.1f}ms"
+        )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://localhost:3001/sse")
+    parser.add_argument("--sessions", nargs="+", type=int, default=[10])
+    parser.add_argument(
+        "--duration", type=float, default=30, help="secondes par palier"
+    )
+    parser.add_argument("--think-ms", type=float, default=0, help="pause moyenne")
+    parser.add_argument("--mix", type=json.loads, default=DEFAULT_MIX)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", dest="json_path", help="écrit les rapports en JSON")
+    args = parser.parse_args()
+
+    vehicles, routes = await discover(args.url)
+    reports = []
+    for sessions in args.sessions:
+        report = await run_step(args.url, sessions, args, vehicles, routes)
+        print_report(report)
+        reports.append(report)
+    if args.json_path:
+        with open(args.json_path, "w") as output:
+            json.dump(reports, output, indent=2)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())